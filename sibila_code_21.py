@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
 import os
 import time
@@ -10,8 +11,45 @@ from fpdf import FPDF
 from typing import Dict, List, Any, Optional, Tuple, Callable
 import hashlib
 import uuid
+import gzip
+import tempfile
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from collections import Counter, OrderedDict
 from streamlit_option_menu import option_menu
 import re
+import sys
+import bisect
+import copy
+import functools
+import importlib.util
+import heapq
+import math
+import unicodedata
+import weakref
+import zipfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Codec JSON nativo (opcional): leitura/gravação do catálogo bem mais rápidas que o json padrão
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Parquet (opcional): cache colunar das tabelas derivadas do catálogo (ver CacheColunar).
+# Usado só através do pandas (to_parquet/read_parquet): basta saber se está instalado
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# Trava de arquivo entre processos (fcntl no Linux/macOS, msvcrt no Windows)
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
 
 # ==========================================
 # IMPORTS PARA ANÁLISE AVANÇADA (Humanidades Digitais)
@@ -48,7 +86,6 @@ except ImportError:
     PYVIS_AVAILABLE = False
 
 try:
-    from collections import Counter
     import string
     
     # Tentativa de usar NLTK (conforme solicitado no plano avançado)
@@ -147,6 +184,47 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FILE_PATH = os.path.join(BASE_DIR, 'catalogo_sibila.json')
 DIARIO_PATH = os.path.join(BASE_DIR, 'diario_sibila.json')
 BACKUP_DIR = os.path.join(BASE_DIR, 'backups')
+# Diário de operações (write-ahead journal) do catálogo: uma linha JSON por inserção/edição/exclusão
+JOURNAL_PATH = os.path.join(BASE_DIR, 'catalogo_sibila.journal.jsonl')
+# Compactação: o journal é dobrado no snapshot quando passa deste tamanho
+# (ou de metade do tamanho do snapshot, o que for maior)
+JOURNAL_MIN_COMPACT_BYTES = 256 * 1024
+# Histórico de versões (BackupStore): uma cópia completa a cada N versões, deltas no meio
+BACKUP_KEYFRAME_INTERVALO = 50
+# Cache de resultados de busca: entradas por sessão e no nível compartilhado do processo
+CACHE_RESULTADOS_SESSAO = 32
+CACHE_RESULTADOS_COMPARTILHADO = 256
+# Máximo de opções materializadas numa lista de seleção (o resto vem pelo filtro digitado)
+LIMITE_OPCOES_SELECAO = 200
+# Checkboxes criados por vez numa grade de filtros (o restante via busca / "mostrar mais")
+LIMITE_OPCOES_GRADE = 40
+# Motor de armazenamento: "json" (snapshot + journal, padrão), "sqlite" (banco embutido) ou
+# "shards" (um arquivo por revista). Nos dois últimos o catalogo_sibila.json continua sendo
+# o formato de importação/exportação.
+STORAGE_ENGINE = os.environ.get('SIBILA_STORAGE', 'json').strip().lower()
+DB_PATH = os.path.join(BASE_DIR, 'catalogo_sibila.db')
+# Modo "shards": um arquivo por revista + manifesto
+SHARDS_DIR = os.path.join(BASE_DIR, 'catalogo_revistas')
+# Cache colunar (Parquet) das tabelas derivadas, uma pasta por versão dos dados
+CACHE_COLUNAR_DIR = os.path.join(BASE_DIR, 'cache_colunar')
+# Índices de busca derivados do catálogo (reconstruíveis a qualquer momento)
+INDICES_DIR = os.path.join(BASE_DIR, 'indices')
+INDICE_TEXTO_PATH = os.path.join(INDICES_DIR, 'texto.json')
+# O texto.json não é regravado a cada gravação do catálogo: quem carrega uma versão nova
+# reindexa o que mudou e só regrava o arquivo quando a diferença chega a este nº de registros
+INDICE_TEXTO_DEFASAGEM_MAX = 25
+# Buscas salvas (consultas nomeadas) com os resultados mantidos a cada gravação
+BUSCAS_SALVAS_PATH = os.path.join(BASE_DIR, 'buscas_salvas.json')
+# Totais por revista dos relatórios, ajustados registro a registro a cada gravação
+RELATORIOS_PATH = os.path.join(INDICES_DIR, 'relatorios.json')
+# ZIPs da exportação em lote dos relatórios (e o progresso do trabalho em andamento)
+EXPORTACOES_DIR = os.path.join(BASE_DIR, 'exportacoes')
+# Código de saída de exportar-relatorios quando o ZIP foi gravado mas algum relatório falhou
+EXPORTACAO_PARCIAL = 3
+# Trava consultiva para gravações concorrentes (várias instâncias sobre o mesmo diretório)
+LOCK_PATH = os.path.join(BASE_DIR, 'catalogo_sibila.lock')
+# Trava à parte para os derivados marcados com a versão dos dados (buscas salvas, totais dos relatórios)
+LOCK_DERIVADOS_PATH = os.path.join(BASE_DIR, 'catalogo_sibila.derivados.lock')
 LOGO_PATH = os.path.join(BASE_DIR, 'NELIC.png')  # Arquivo de Logo
 
 # Estilos CSS
@@ -460,198 +538,3530 @@ class DataModule:
         "Urbanismo", "URSS", "Uruguai", "Utopia", "Vanguarda", "Verdade", "Vestibular", "Viagem", "Violência"
     ]])))
 
-    LISTA_ICONOGRAFIA = [
-        "Cartografia", "Fac-símile", "Foto", "Fotograma", "Gráfico/Tabela",
-        "HQ/Charge", "Ilustração", "Publicidade", "Reprodução"
-    ]
+    LISTA_ICONOGRAFIA = [
+        "Cartografia", "Fac-símile", "Foto", "Fotograma", "Gráfico/Tabela",
+        "HQ/Charge", "Ilustração", "Publicidade", "Reprodução"
+    ]
+
+    TIPOS_TEXTUAIS = {
+        "APRESENTAÇÃO": ["Sem especificação", "Literatura"],
+        "ARTES PLÁSTICAS": ["Sem especificação"],
+        "CAPA": ["Sem especificação"],
+        "CARTAS DO LEITOR": ["Sem especificação"],
+        "CHARGE": ["Sem especificação"],
+        "CORRESPONDÊNCIA(S)": ["Sem especificação"],
+        "DEBATE": ["Sem especificação"],
+        "DEPOIMENTO": ["Sem especificação", "Literatura"],
+        "EDITORIAL": ["Sem especificação", "Literatura"],
+        "ENSAIO": [
+            "Sem especificação", "Antropologia", "Arquitetura", "Bibliologia", "Ciência",
+            "Comunicação", "Cultura", "Economia", "Educação", "Esporte", "Filosofia",
+            "Fotográfico", "História", "Linguística", "Literatura", "Política",
+            "Psicanálise", "Psicologia", "Sociologia", "Teologia"
+        ],
+        "ENTREVISTA": ["Sem especificação", "Literatura"],
+        "FICÇÃO": ["Sem especificação"],
+        "HQ": ["Sem especificação"],
+        "HQ/CHARGE": ["Sem especificação"],
+        "INFORME": ["Sem especificação", "Literatura"],
+        "POEMA(S)": ["Sem especificação"],
+        "REPORTAGEM": ["Sem especificação", "Literatura"],
+        "RESENHA": [
+            "Sem especificação", "Antropologia", "Arquitetura", "Bibliologia", "Ciência",
+            "Comunicação", "Cultura", "Economia", "Educação", "Filosofia", "História",
+            "Linguística", "Literatura", "Política", "Psicanálise", "Psicologia", "Sociologia"
+        ],
+        "VARIEDADES": ["Sem especificação"]
+    }
+
+    # Campos de nomes pessoais/coletivos: formatação ABNT em vez de Title Case
+    CAMPOS_NOME_PESSOAL = {
+        'autores_colaboradores', 'autores_citados', 'tradutores', 'entidade_coletiva', 'nome_pessoal_como_assunto'
+    }
+
+    @staticmethod
+    def normalizar_texto(val: str | list) -> str | list:
+        """Normaliza texto genérico (palavras-chave etc.) para Title Case."""
+        if isinstance(val, list):
+            return [i.strip().title() for i in val if str(i).strip()]
+        if isinstance(val, str):
+            return val.strip().title()
+        return val
+
+    @staticmethod
+    def format_nome_abnt(nome: str | None) -> str:
+        """
+        Normaliza nomes pessoais segundo ABNT.
+        Ex.: 'Bonvicino, Régis' -> 'BONVICINO, Régis'
+        """
+        if nome is None:
+            return ""
+        if not isinstance(nome, str):
+            nome = str(nome)
+        s = " ".join(nome.strip().split())
+        if not s:
+            return ""
+        if "," in s:
+            ult, resto = s.split(",", 1)
+            return f"{ult.strip().upper()}, {resto.strip()}" if resto.strip() else ult.strip().upper()
+        partes = s.split()
+        if len(partes) >= 2:
+            sobrenome = partes[-1].upper()
+            prenomes = " ".join(partes[:-1])
+            return f"{sobrenome}, {prenomes}"
+        return s.upper()
+
+    @staticmethod
+    def parse_multiline(texto: str | None) -> list[str]:
+        if texto is None:
+            return []
+        if not isinstance(texto, str):
+            texto = str(texto)
+        # Split only on newlines to preserve commas in ABNT format names
+        linhas = texto.split('\n')
+        return [l.strip() for l in linhas if l.strip()]
+
+    @staticmethod
+    def normalizar_lista_autores(texto: str | list) -> list[str]:
+        nomes = DataModule.parse_multiline(texto)
+        return [DataModule.format_nome_abnt(n) for n in nomes]
+
+    @staticmethod
+    def get_normalized_series(df: pd.DataFrame, col: str) -> pd.Series:
+        """
+        Explode coluna, remove vazios. Para campos de autor, aplica formatação ABNT
+        sem rebaixar para Title Case (preserva SOBRENOME em CAIXA ALTA).
+        """
+        if col not in df.columns:
+            return pd.Series(dtype='object')
+        versao = PersistenceModule.versao_canonica(df)
+        if versao is not None and col in CacheColunar.TABELA_DO_CAMPO and col != 'iconografias':
+            # O próprio DataFrame de load_dataframe: usa a tabela longa já pronta, com o
+            # índice das linhas de origem (como o explode abaixo). A de iconografias guarda
+            # só o tipo de cada item, não o item inteiro, e fica de fora
+            tabela = PersistenceModule.relation_table(CacheColunar.TABELA_DO_CAMPO[col], versao)
+            return pd.Series(tabela['valor'].to_numpy(), index=df.index[tabela['linha'].to_numpy()], name=col)
+        s = (
+            df.explode(col)[col]
+            .dropna()
+            .astype(str)
+            .str.strip()
+            .replace('', pd.NA)
+            .dropna()
+        )
+        if col in DataModule.CAMPOS_NOME_PESSOAL:
+            s = s.apply(DataModule.format_nome_abnt)
+        return s
+
+# ==========================================
+# CODEC JSON
+# ==========================================
+
+class JsonCodec:
+    """
+    Serialização JSON do catálogo, journal e histórico de versões.
+
+    Usa orjson quando instalado e a biblioteca padrão caso contrário
+    (SIBILA_JSON_CODEC=stdlib força a padrão). As gravações internas saem
+    compactas; a indentação fica para o que é lido por pessoas (pretty=True:
+    downloads da aba EXPORTAR, diário). Ambos geram UTF-8 sem escapes ASCII,
+    então os arquivos são intercambiáveis entre os dois caminhos.
+    """
+    NOME = 'orjson' if ORJSON_AVAILABLE and os.environ.get('SIBILA_JSON_CODEC', 'auto') != 'stdlib' else 'stdlib'
+
+    @staticmethod
+    def dumps(obj, pretty=False, codec=None):
+        """Serializa para bytes UTF-8."""
+        if (codec or JsonCodec.NOME) == 'orjson':
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+            except TypeError:
+                pass  # Tipos que o orjson recusa (ex.: chaves não-texto): segue pela biblioteca padrão
+        if pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def loads(dados, codec=None):
+        """Lê bytes ou str."""
+        if (codec or JsonCodec.NOME) == 'orjson':
+            try:
+                return orjson.loads(dados)
+            except orjson.JSONDecodeError:
+                pass  # NaN/Infinity gravados pelo json padrão: a biblioteca padrão aceita
+        if isinstance(dados, bytes):
+            dados = dados.decode('utf-8')
+        return json.loads(dados)
+
+# ==========================================
+# GRAVAÇÃO SEGURA DE ARQUIVOS
+# ==========================================
+
+def sincronizar_diretorio(diretorio):
+    """fsync do diretório, para que criações/renomeações sobrevivam a uma queda de energia."""
+    if os.name == 'nt':
+        return  # No Windows não há fsync de diretório; o os.replace já é atômico
+    fd = os.open(diretorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def gravar_arquivo_atomico(caminho, conteudo):
+    """
+    Grava `conteudo` (str ou bytes) em `caminho` sem nunca expor um arquivo
+    parcial: escreve num temporário no mesmo diretório, faz fsync, renomeia
+    por cima do destino (os.replace é atômico) e faz fsync do diretório.
+    Leitores concorrentes veem o arquivo antigo inteiro ou o novo inteiro.
+    """
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    dados = conteudo.encode('utf-8') if isinstance(conteudo, str) else conteudo
+    modo = os.stat(caminho).st_mode & 0o777 if os.path.exists(caminho) else 0o644
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(caminho) + '.', suffix='.tmp', dir=diretorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, modo)
+        os.replace(tmp, caminho)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    sincronizar_diretorio(diretorio)
+
+def anexar_arquivo(caminho, texto):
+    """Anexa `texto` ao fim do arquivo e faz fsync antes de retornar."""
+    novo = not os.path.exists(caminho)
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+    if novo:
+        sincronizar_diretorio(os.path.dirname(os.path.abspath(caminho)))
+
+_bloqueio_local = threading.local()
+
+@contextmanager
+def _trava_arquivo(caminho):
+    """Trava exclusiva sobre `caminho`, entre processos e entre threads; reentrante na mesma thread."""
+    profundidades = _bloqueio_local.__dict__.setdefault('profundidades', {})
+    if profundidades.get(caminho, 0):
+        profundidades[caminho] += 1
+        try:
+            yield
+        finally:
+            profundidades[caminho] -= 1
+        return
+    with open(caminho, 'a+') as f:
+        if FCNTL_AVAILABLE:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        profundidades[caminho] = 1
+        try:
+            yield
+        finally:
+            profundidades[caminho] = 0
+            if FCNTL_AVAILABLE:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def bloqueio_escrita():
+    """
+    Trava das gravações do catálogo. Cobre a leitura do estado atual, a
+    gravação (journal, banco ou fragmentos) e o que precisa andar na mesma
+    ordem dela: o histórico (BackupStore) e o índice de registros em memória.
+    Índices e totais derivados são atualizados depois de soltá-la.
+    """
+    return _trava_arquivo(LOCK_PATH)
+
+def bloqueio_derivados():
+    """
+    Trava dos derivados marcados com a versão dos dados (buscas salvas, totais
+    dos relatórios): serializa o ler-alterar-gravar de cada arquivo sem segurar
+    as gravações do catálogo. Pode ser tomada dentro de bloqueio_escrita, nunca
+    o contrário.
+    """
+    return _trava_arquivo(LOCK_DERIVADOS_PATH)
+
+class ConflitoEdicao(Exception):
+    """Outra sessão gravou o mesmo registro e as alterações não puderam ser mescladas."""
+    def __init__(self, reg_id, campos=None, motivo=None):
+        self.reg_id = reg_id
+        self.campos = list(campos or [])
+        detalhe = motivo or (
+            f"campos alterados nas duas sessões: {', '.join(self.campos)}" if self.campos
+            else "a versão editada não é mais a atual"
+        )
+        super().__init__(f"O registro {reg_id} foi alterado por outra sessão ({detalhe}).")
+
+# ==========================================
+# HISTÓRICO DE VERSÕES (BACKUPS)
+# ==========================================
+
+class BackupStore:
+    """
+    Histórico de versões do catálogo em BACKUP_DIR, endereçado por conteúdo.
+
+    Cada gravação vira uma versão cujo identificador é o hash do estado
+    (ordem dos registros + hash de cada um): estados idênticos caem no
+    mesmo objeto. Os registros são identificados por
+    IndiceRegistros.chave_ocorrencia, de modo que `_id`s repetidos não se
+    fundem. A maioria das versões guarda só o delta em relação à anterior
+    (registros inseridos/alterados e chaves excluídas), comprimido com
+    gzip; a cada BACKUP_KEYFRAME_INTERVALO versões grava-se uma cópia
+    completa, o que limita a cadeia percorrida numa restauração.
+
+        backups/objetos/<aa>/<versao>.json.gz   conteúdo de cada versão
+        backups/versoes.jsonl                   listagem (uma linha por gravação)
+        backups/estado_atual.json               chaves e hashes de uma versão-base
+        backups/estado_deltas.jsonl             alterações do estado desde a base
+
+    O estado também fica em memória; uma gravação comum só anexa uma linha
+    a estado_deltas.jsonl, e a base é regravada junto com as cópias completas.
+    """
+
+    @staticmethod
+    def _hash_registro(rec):
+        return hashlib.sha1(json.dumps(rec, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _hash_estado(ordem, hashes):
+        h = hashlib.sha256()
+        for reg_id in ordem:
+            h.update(f"{reg_id}:{hashes[reg_id]}\n".encode('utf-8'))
+        return h.hexdigest()
+
+    @staticmethod
+    def _caminho_objeto(versao):
+        return os.path.join(BACKUP_DIR, 'objetos', versao[:2], versao + '.json.gz')
+
+    @staticmethod
+    def _gravar_objeto(versao, conteudo):
+        """Grava o objeto da versão; devolve os bytes gravados (0 se já existia)."""
+        caminho = BackupStore._caminho_objeto(versao)
+        if os.path.exists(caminho):
+            return 0
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        dados = gzip.compress(JsonCodec.dumps(conteudo))
+        gravar_arquivo_atomico(caminho, dados)
+        return len(dados)
+
+    @staticmethod
+    def _ler_objeto(versao):
+        with open(BackupStore._caminho_objeto(versao), 'rb') as f:
+            return JsonCodec.loads(gzip.decompress(f.read()))
+
+    @staticmethod
+    def _ordem_seguinte(ordem, anteriores, removidos, alterados):
+        """Ordem implícita após um delta: as chaves anteriores sem as removidas, e as novas no fim."""
+        return [c for c in ordem if c not in removidos] + [
+            c for c in alterados if c not in anteriores or c in removidos
+        ]
+
+    @staticmethod
+    def _caminhos_estado():
+        return os.path.join(BACKUP_DIR, 'estado_atual.json'), os.path.join(BACKUP_DIR, 'estado_deltas.jsonl')
+
+    @staticmethod
+    def _assinatura_estado():
+        assinatura = []
+        for caminho in BackupStore._caminhos_estado():
+            try:
+                info = os.stat(caminho)
+                assinatura.append((info.st_mtime_ns, info.st_size, info.st_ino))
+            except FileNotFoundError:
+                assinatura.append(None)
+        return tuple(assinatura)
+
+    @staticmethod
+    @st.cache_resource
+    def _memoria_estado():
+        """Último estado lido ou gravado pelo processo e a assinatura dos arquivos a que corresponde."""
+        return {'assinatura': None, 'estado': None}
+
+    @staticmethod
+    def _carregar_estado():
+        """
+        Estado da última versão: estado_atual.json mais as linhas de estado_deltas.jsonl
+        da mesma série. Não é relido enquanto os dois arquivos não mudam.
+        """
+        memoria = BackupStore._memoria_estado()
+        assinatura = BackupStore._assinatura_estado()
+        if memoria['assinatura'] == assinatura:
+            return memoria['estado']
+
+        caminho, caminho_deltas = BackupStore._caminhos_estado()
+        estado = None
+        if os.path.exists(caminho):
+            with open(caminho, 'rb') as f:
+                estado = JsonCodec.loads(f.read())
+            estado['deltas'] = 0
+            if estado.get('serie') and os.path.exists(caminho_deltas):
+                with open(caminho_deltas, 'r', encoding='utf-8') as f:
+                    for linha in f:
+                        try:
+                            delta = json.loads(linha)
+                        except json.JSONDecodeError:
+                            # Linha cortada por uma queda: a próxima gravação refaz a base
+                            estado['deltas'] = BACKUP_KEYFRAME_INTERVALO
+                            break
+                        # Linhas de outra série sobram de uma base regravada antes de o arquivo ser apagado
+                        if delta.get('serie') != estado['serie'] or delta.get('base') != estado['versao']:
+                            continue
+                        removidos = set(delta['removidos'])
+                        ordem = delta.get('ordem') or BackupStore._ordem_seguinte(
+                            estado['ordem'], estado['hashes'], removidos, delta['hashes']
+                        )
+                        for c in removidos:
+                            estado['hashes'].pop(c, None)
+                        estado['hashes'].update(delta['hashes'])
+                        estado.update(
+                            versao=delta['versao'], profundidade=delta['profundidade'],
+                            ordem=ordem, deltas=estado['deltas'] + 1,
+                        )
+        memoria.update(assinatura=assinatura, estado=estado)
+        return estado
+
+    @staticmethod
+    def _salvar_estado(anterior, estado, alterados, removidos, ordem_explicita):
+        """
+        Anexa a alteração a estado_deltas.jsonl ou, a cada cópia completa (e quando o
+        arquivo de deltas fica longo), regrava a base numa série nova.
+        """
+        caminho, caminho_deltas = BackupStore._caminhos_estado()
+        if (anterior is None or not anterior.get('serie') or estado['profundidade'] == 0
+                or anterior['deltas'] + 1 >= BACKUP_KEYFRAME_INTERVALO):
+            estado['serie'] = uuid.uuid4().hex
+            estado['deltas'] = 0
+            base = {k: estado[k] for k in ('versao', 'profundidade', 'serie', 'ordem', 'hashes')}
+            gravar_arquivo_atomico(caminho, JsonCodec.dumps(base))
+            if os.path.exists(caminho_deltas):
+                os.remove(caminho_deltas)
+        else:
+            estado['serie'] = anterior['serie']
+            estado['deltas'] = anterior['deltas'] + 1
+            linha = {
+                'serie': estado['serie'], 'base': anterior['versao'], 'versao': estado['versao'],
+                'profundidade': estado['profundidade'], 'hashes': alterados, 'removidos': removidos,
+            }
+            if ordem_explicita:
+                linha['ordem'] = estado['ordem']
+            anexar_arquivo(caminho_deltas, json.dumps(linha, ensure_ascii=False) + "\n")
+        BackupStore._memoria_estado().update(assinatura=BackupStore._assinatura_estado(), estado=estado)
+
+    @staticmethod
+    def registrar(registros=None, upserts=(), deletes=()):
+        """
+        Registra a versão resultante de uma gravação. Com `registros` (catálogo inteiro,
+        gravação em lote) o delta é calculado contra a versão anterior; senão, `upserts`
+        e `deletes` descrevem a alteração com a semântica do journal (upsert substitui a
+        última ocorrência do `_id`, exclusão remove todas). Devolve o id da versão, ou
+        None se nada mudou.
+        """
+        estado = BackupStore._carregar_estado()
+        if estado is None and registros is None:
+            # Primeira versão do histórico sem versão inicial (catálogo vazio antes da
+            # gravação, ver PersistenceModule._registrar_versao_inicial): catálogo completo
+            registros = PersistenceModule.load_data()
+
+        if registros is not None:
+            ordem = list(IndiceRegistros.chaves_ocorrencia(registros))
+            hashes = {c: BackupStore._hash_registro(r) for c, r in zip(ordem, registros)}
+            anteriores = estado['hashes'] if estado is not None else {}
+            alteracoes = [(c, r) for c, r in zip(ordem, registros) if anteriores.get(c) != hashes[c]]
+            removidos = [c for c in estado['ordem'] if c not in hashes] if estado is not None else []
+        else:
+            hashes = dict(estado['hashes'])
+            removidos = []
+            for reg_id in deletes:
+                for k in range(IndiceRegistros.ultima_ocorrencia(hashes, str(reg_id)), 0, -1):
+                    chave = IndiceRegistros.chave_ocorrencia(reg_id, k)
+                    del hashes[chave]
+                    removidos.append(chave)
+            excluidos = set(removidos)
+            ordem = [c for c in estado['ordem'] if c not in excluidos]
+            alteracoes = []
+            for rec in upserts:
+                reg_id = str(rec.get('_id'))
+                chave = IndiceRegistros.chave_ocorrencia(reg_id, max(IndiceRegistros.ultima_ocorrencia(hashes, reg_id), 1))
+                if chave not in hashes:
+                    ordem.append(chave)
+                hashes[chave] = BackupStore._hash_registro(rec)
+                alteracoes.append((chave, rec))
+
+        versao = BackupStore._hash_estado(ordem, hashes)
+        if estado is not None and versao == estado['versao']:
+            return None
+
+        alterados = {c: hashes[c] for c, _ in alteracoes}
+        # A ordem só é gravada quando difere de "anteriores sem os excluídos + novos no fim"
+        ordem_explicita = estado is not None and ordem != BackupStore._ordem_seguinte(
+            estado['ordem'], estado['hashes'], set(removidos), alterados
+        )
+        profundidade = 0 if estado is None else estado['profundidade'] + 1
+        if os.path.exists(BackupStore._caminho_objeto(versao)):
+            # Estado já visto: reaproveita o objeto existente (e a profundidade da cadeia dele)
+            profundidade = BackupStore._ler_objeto(versao).get('profundidade', 0)
+            conteudo = None
+        elif profundidade == 0 or profundidade >= BACKUP_KEYFRAME_INTERVALO:
+            if registros is None:
+                registros = PersistenceModule.load_data()
+            profundidade = 0
+            conteudo = {'tipo': 'completo', 'profundidade': 0, 'registros': registros}
+        else:
+            # `chaves` (alinhada a `upserts`) e `deletes` em chaves de ocorrência; objetos
+            # antigos, sem `chaves`, guardam `_id`s
+            conteudo = {
+                'tipo': 'delta', 'profundidade': profundidade, 'base': estado['versao'],
+                'upserts': [r for _, r in alteracoes], 'chaves': [c for c, _ in alteracoes],
+                'deletes': removidos,
+            }
+            if ordem_explicita:
+                conteudo['ordem'] = ordem
+
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        tamanho = BackupStore._gravar_objeto(versao, conteudo) if conteudo is not None else 0
+        entrada = {
+            'versao': versao,
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'tipo': conteudo['tipo'] if conteudo is not None else 'repetida',
+            'registros': len(ordem),
+            'alterados': len(alteracoes),
+            'excluidos': len(removidos),
+            'bytes': tamanho,
+        }
+        anexar_arquivo(os.path.join(BACKUP_DIR, 'versoes.jsonl'), json.dumps(entrada, ensure_ascii=False) + "\n")
+        BackupStore._salvar_estado(
+            estado, {'versao': versao, 'profundidade': profundidade, 'ordem': ordem, 'hashes': hashes},
+            alterados, removidos, ordem_explicita,
+        )
+        return versao
+
+    @staticmethod
+    def listar():
+        """Versões registradas, da mais recente para a mais antiga."""
+        caminho = os.path.join(BACKUP_DIR, 'versoes.jsonl')
+        if not os.path.exists(caminho):
+            return []
+        versoes = []
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    versoes.append(json.loads(linha))
+                except json.JSONDecodeError:
+                    continue
+        return versoes[::-1]
+
+    @staticmethod
+    def uso_em_disco():
+        total = 0
+        for raiz, _, arquivos in os.walk(os.path.join(BACKUP_DIR, 'objetos')):
+            total += sum(os.path.getsize(os.path.join(raiz, a)) for a in arquivos)
+        return total
+
+    @staticmethod
+    def reconstruir(versao):
+        """Lista de registros da versão: parte da cópia completa mais próxima e reaplica os deltas."""
+        cadeia = []
+        atual = versao
+        while True:
+            obj = BackupStore._ler_objeto(atual)
+            cadeia.append(obj)
+            if obj['tipo'] == 'completo':
+                break
+            atual = obj['base']
+        registros = list(cadeia.pop()['registros'])
+        for obj in reversed(cadeia):
+            if 'chaves' in obj:
+                por_chave = dict(zip(IndiceRegistros.chaves_ocorrencia(registros), registros))
+                removidos = set(obj['deletes'])
+                ordem = obj.get('ordem') or BackupStore._ordem_seguinte(
+                    list(por_chave), por_chave, removidos, obj['chaves']
+                )
+                por_chave.update(zip(obj['chaves'], obj['upserts']))
+                registros = [por_chave[c] for c in ordem]
+                continue
+            ops = [{'op': 'delete', '_id': i} for i in obj['deletes']]
+            ops += [{'op': 'upsert', 'registro': r} for r in obj['upserts']]
+            registros = PersistenceModule._apply_ops(registros, ops)
+            if 'ordem' in obj:
+                por_id = {r.get('_id'): r for r in registros}
+                registros = [por_id[i] for i in obj['ordem']]
+        return registros
+
+class SQLiteStorage:
+    """
+    Armazenamento do catálogo num banco SQLite local (SIBILA_STORAGE=sqlite).
+
+    Uma linha por registro em `registros` (chave `_id`), com índices em n,
+    registro, vocabulario_controlado e idioma_01; os campos-lista ficam em
+    tabelas-filhas (uma linha por item, na ordem original). Campos fora do
+    modelo ou com tipo inesperado vão para a coluna `extras` (JSON), de modo
+    que a exportação para JSON devolve o registro como foi gravado.
+    """
+    # Colunas escalares (sem tipo declarado: o SQLite guarda o valor como veio, int continua int)
+    CAMPOS_ESCALARES = [
+        'n', 'registro', 'ordem_exibicao', 'idioma_01', 'idioma_02', 'vocabulario_controlado',
+        'titulo_artigo', 'subtitulo_artigo', 'paginas', 'resumo', 'nota_edicao', '_timestamp',
+    ]
+    # Listas de texto: uma tabela-filha por campo (registro_id, pos, valor)
+    CAMPOS_LISTA = [
+        'autores_colaboradores', 'entidade_coletiva', 'tradutores',
+        'autores_citados', 'palavras_chave', 'nome_pessoal_como_assunto',
+    ]
+    # Ordem das chaves no registro reconstruído (a mesma do catalogo_sibila.json)
+    ORDEM_CAMPOS = [
+        'n', 'registro', 'ordem_exibicao', 'idioma_01', 'idioma_02', 'vocabulario_controlado',
+        'titulo_artigo', 'subtitulo_artigo', 'paginas', 'resumo', 'nota_edicao',
+        'autores_colaboradores', 'entidade_coletiva', 'tradutores', 'autores_citados',
+        'palavras_chave', 'nome_pessoal_como_assunto', 'iconografias', '_timestamp',
+        '_id', 'notas_pesquisa',
+    ]
+
+    @staticmethod
+    def connect(db_path=None):
+        conn = sqlite3.connect(db_path or DB_PATH, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        SQLiteStorage._criar_schema(conn)
+        return conn
+
+    @staticmethod
+    def _criar_schema(conn):
+        colunas = ", ".join(f'"{c}"' for c in SQLiteStorage.CAMPOS_ESCALARES)
+        script = [
+            f"CREATE TABLE IF NOT EXISTS registros (_id TEXT PRIMARY KEY, seq INTEGER NOT NULL, {colunas}, extras TEXT)",
+            "CREATE INDEX IF NOT EXISTS idx_registros_seq ON registros(seq)",
+            "CREATE INDEX IF NOT EXISTS idx_registros_n ON registros(n)",
+            "CREATE INDEX IF NOT EXISTS idx_registros_registro ON registros(registro)",
+            "CREATE INDEX IF NOT EXISTS idx_registros_n_registro ON registros(n, registro)",
+            "CREATE INDEX IF NOT EXISTS idx_registros_vocabulario ON registros(vocabulario_controlado)",
+            "CREATE INDEX IF NOT EXISTS idx_registros_idioma ON registros(idioma_01)",
+            "CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT)",
+        ]
+        for campo in SQLiteStorage.CAMPOS_LISTA:
+            script.append(
+                f"CREATE TABLE IF NOT EXISTS {campo} (registro_id TEXT NOT NULL REFERENCES registros(_id) ON DELETE CASCADE, "
+                f"pos INTEGER NOT NULL, valor, PRIMARY KEY (registro_id, pos))"
+            )
+            script.append(f"CREATE INDEX IF NOT EXISTS idx_{campo}_valor ON {campo}(valor)")
+        script.append(
+            "CREATE TABLE IF NOT EXISTS iconografias (registro_id TEXT NOT NULL REFERENCES registros(_id) ON DELETE CASCADE, "
+            "pos INTEGER NOT NULL, tipo, descricao, extras TEXT, PRIMARY KEY (registro_id, pos))"
+        )
+        script.append("CREATE INDEX IF NOT EXISTS idx_iconografias_tipo ON iconografias(tipo)")
+        script.append(
+            "CREATE TABLE IF NOT EXISTS notas_pesquisa (registro_id TEXT NOT NULL REFERENCES registros(_id) ON DELETE CASCADE, "
+            "pos INTEGER NOT NULL, nota TEXT NOT NULL, PRIMARY KEY (registro_id, pos))"
+        )
+        for sql in script:
+            conn.execute(sql)
+
+    # --- Conversão registro <-> linhas ---
+
+    @staticmethod
+    def _inserir(conn, rec, seq):
+        extras = {}
+        valores = []
+        for c in SQLiteStorage.CAMPOS_ESCALARES:
+            v = rec.get(c)
+            # Um null explícito também vai para extras: a coluna NULL é lida como campo ausente
+            if isinstance(v, (list, dict)) or (v is None and c in rec):
+                extras[c] = v
+                v = None
+            valores.append(v)
+        for k, v in rec.items():
+            if k not in SQLiteStorage.ORDEM_CAMPOS:
+                extras[k] = v
+        # Campos-lista com tipo inesperado (ex.: entidade_coletiva gravada como texto) ficam em extras;
+        # os ausentes são anotados para não voltarem como lista vazia (o que mudaria o hash do registro)
+        ausentes = []
+        for c in SQLiteStorage.CAMPOS_LISTA + ['iconografias', 'notas_pesquisa']:
+            if c not in rec:
+                ausentes.append(c)
+            elif not isinstance(rec[c], list):
+                extras[c] = rec[c]
+        if ausentes:
+            extras['__ausentes'] = ausentes
+        extras_txt = json.dumps(extras, ensure_ascii=False) if extras else None
+
+        reg_id = rec['_id']
+        colunas = ", ".join(f'"{c}"' for c in SQLiteStorage.CAMPOS_ESCALARES)
+        marcadores = ", ".join("?" for _ in SQLiteStorage.CAMPOS_ESCALARES)
+        conn.execute(
+            f"INSERT INTO registros (_id, seq, {colunas}, extras) VALUES (?, ?, {marcadores}, ?)",
+            [reg_id, seq] + valores + [extras_txt],
+        )
+        for c in SQLiteStorage.CAMPOS_LISTA:
+            itens = rec.get(c)
+            if isinstance(itens, list) and itens:
+                conn.executemany(
+                    f"INSERT INTO {c} (registro_id, pos, valor) VALUES (?, ?, ?)",
+                    [(reg_id, i, v) for i, v in enumerate(itens)],
+                )
+        icones = rec.get('iconografias')
+        if isinstance(icones, list) and icones:
+            linhas = []
+            for i, ic in enumerate(icones):
+                if isinstance(ic, dict):
+                    resto = {k: v for k, v in ic.items() if k not in ('tipo', 'descricao')}
+                    linhas.append((reg_id, i, ic.get('tipo'), ic.get('descricao'),
+                                   json.dumps(resto, ensure_ascii=False) if resto else None))
+                else:
+                    linhas.append((reg_id, i, None, None, json.dumps({'__valor': ic}, ensure_ascii=False)))
+            conn.executemany(
+                "INSERT INTO iconografias (registro_id, pos, tipo, descricao, extras) VALUES (?, ?, ?, ?, ?)", linhas
+            )
+        notas = rec.get('notas_pesquisa')
+        if isinstance(notas, list) and notas:
+            conn.executemany(
+                "INSERT INTO notas_pesquisa (registro_id, pos, nota) VALUES (?, ?, ?)",
+                [(reg_id, i, json.dumps(nota, ensure_ascii=False)) for i, nota in enumerate(notas)],
+            )
+
+    @staticmethod
+    def _montar(linha, listas, icones, notas):
+        """Reconstrói o dicionário do registro a partir da linha principal e das tabelas-filhas."""
+        reg_id = linha['_id']
+        extras = JsonCodec.loads(linha['extras']) if linha['extras'] else {}
+        ausentes = set(extras.pop('__ausentes', ()))
+        rec = {}
+        for c in SQLiteStorage.CAMPOS_ESCALARES:
+            if linha[c] is not None:
+                rec[c] = linha[c]
+        for c in SQLiteStorage.CAMPOS_LISTA:
+            if c not in ausentes:
+                rec[c] = listas[c].get(reg_id, [])
+        if 'iconografias' not in ausentes:
+            rec['iconografias'] = icones.get(reg_id, [])
+        if 'notas_pesquisa' not in ausentes:
+            rec['notas_pesquisa'] = notas.get(reg_id, [])
+        rec['_id'] = reg_id
+        rec.update(extras)
+        ordem = {c: i for i, c in enumerate(SQLiteStorage.ORDEM_CAMPOS)}
+        return dict(sorted(rec.items(), key=lambda kv: ordem.get(kv[0], len(ordem))))
+
+    @staticmethod
+    def _ler(conn, where="", params=()):
+        conn.row_factory = sqlite3.Row
+        linhas = conn.execute(f"SELECT * FROM registros {where} ORDER BY seq", params).fetchall()
+        if not linhas:
+            return []
+        # Com filtro, as tabelas-filhas são lidas só para os ids selecionados
+        filtro_filhos, params_filhos = "", ()
+        if where:
+            ids = [l['_id'] for l in linhas]
+            filtro_filhos = f"WHERE registro_id IN ({', '.join('?' for _ in ids)})"
+            params_filhos = ids
+
+        listas = {}
+        for c in SQLiteStorage.CAMPOS_LISTA:
+            agrupado = {}
+            for r in conn.execute(
+                f"SELECT registro_id, valor FROM {c} {filtro_filhos} ORDER BY registro_id, pos", params_filhos
+            ):
+                agrupado.setdefault(r['registro_id'], []).append(r['valor'])
+            listas[c] = agrupado
+        icones = {}
+        for r in conn.execute(
+            f"SELECT registro_id, tipo, descricao, extras FROM iconografias {filtro_filhos} ORDER BY registro_id, pos",
+            params_filhos,
+        ):
+            resto = json.loads(r['extras']) if r['extras'] else {}
+            if '__valor' in resto:
+                item = resto['__valor']
+            else:
+                item = {'tipo': r['tipo'], 'descricao': r['descricao']}
+                item.update(resto)
+            icones.setdefault(r['registro_id'], []).append(item)
+        notas = {}
+        for r in conn.execute(
+            f"SELECT registro_id, nota FROM notas_pesquisa {filtro_filhos} ORDER BY registro_id, pos", params_filhos
+        ):
+            notas.setdefault(r['registro_id'], []).append(JsonCodec.loads(r['nota']))
+        return [SQLiteStorage._montar(l, listas, icones, notas) for l in linhas]
+
+    # --- Operações ---
+
+    @staticmethod
+    def load_all(db_path=None):
+        conn = SQLiteStorage.connect(db_path)
+        try:
+            return SQLiteStorage._ler(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get(reg_id, db_path=None):
+        conn = SQLiteStorage.connect(db_path)
+        try:
+            achados = SQLiteStorage._ler(conn, "WHERE _id = ?", (reg_id,))
+            return achados[0] if achados else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def find_by_key(n, registro, excluir_id=None, db_path=None):
+        """Registro com a mesma Revista (n) + Registro, pelo índice (n, registro)."""
+        conn = SQLiteStorage.connect(db_path)
+        try:
+            where = "WHERE n = ? AND registro = ?"
+            params = [str(n), str(registro)]
+            if excluir_id:
+                where += " AND _id <> ?"
+                params.append(excluir_id)
+            achados = SQLiteStorage._ler(
+                conn, f"WHERE _id = (SELECT _id FROM registros {where} ORDER BY seq LIMIT 1)", params
+            )
+            return achados[0] if achados else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def upsert(rec, db_path=None):
+        """Grava um registro numa única transação (a posição original na lista é preservada)."""
+        conn = SQLiteStorage.connect(db_path)
+        try:
+            with conn:
+                atual = conn.execute("SELECT seq FROM registros WHERE _id = ?", (rec['_id'],)).fetchone()
+                if atual:
+                    seq = atual[0]
+                    conn.execute("DELETE FROM registros WHERE _id = ?", (rec['_id'],))
+                else:
+                    seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM registros").fetchone()[0]
+                SQLiteStorage._inserir(conn, rec, seq)
+                SQLiteStorage._nova_geracao(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def delete(reg_id, db_path=None):
+        conn = SQLiteStorage.connect(db_path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM registros WHERE _id = ?", (reg_id,))
+                SQLiteStorage._nova_geracao(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def replace_all(registros, db_path=None):
+        """Substitui o conteúdo inteiro do banco (importação em lote) numa transação."""
+        conn = SQLiteStorage.connect(db_path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM registros")
+                for seq, rec in enumerate(registros, 1):
+                    SQLiteStorage._inserir(conn, rec, seq)
+                conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('importado_em', ?)",
+                             (datetime.now().isoformat(),))
+                SQLiteStorage._nova_geracao(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def generation(db_path=None):
+        """Contador de gerações: incrementado na mesma transação de cada gravação."""
+        if not os.path.exists(db_path or DB_PATH):
+            return 0
+        conn = sqlite3.connect(db_path or DB_PATH, timeout=30)
+        try:
+            linha = conn.execute("SELECT valor FROM meta WHERE chave = 'geracao'").fetchone()
+            return int(linha[0]) if linha else 0
+        except sqlite3.OperationalError:
+            # Banco ainda sem schema
+            return 0
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _nova_geracao(conn):
+        conn.execute(
+            "INSERT INTO meta (chave, valor) VALUES ('geracao', 1) "
+            "ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1"
+        )
+
+    @staticmethod
+    def is_empty(db_path=None):
+        conn = SQLiteStorage.connect(db_path)
+        try:
+            vazio = conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0] == 0
+            importado = conn.execute("SELECT 1 FROM meta WHERE chave = 'importado_em'").fetchone()
+            return vazio and importado is None
+        finally:
+            conn.close()
+
+class ShardedStorage:
+    """
+    Catálogo fragmentado por revista (SIBILA_STORAGE=shards): um arquivo JSON
+    por número em SHARDS_DIR e um manifesto pequeno que guarda, para cada
+    revista, o arquivo, as contagens de registros e de iconografias e uma
+    versão própria (hash do conteúdo do fragmento).
+
+    Quem precisa de uma só revista lê só o fragmento dela, e cada gravação
+    reescreve apenas o(s) fragmento(s) tocado(s). O índice `ids.json`
+    (_id -> revista) localiza um registro sem abrir os demais fragmentos.
+    O manifesto é gravado por último e serve de ponto de confirmação.
+    """
+
+    @staticmethod
+    def _caminho(nome):
+        return os.path.join(SHARDS_DIR, nome)
+
+    @staticmethod
+    def chave(rec):
+        return str(rec.get('n', '') or '')
+
+    @staticmethod
+    def manifest():
+        caminho = ShardedStorage._caminho('manifesto.json')
+        if not os.path.exists(caminho):
+            return {'geracao': 0, 'revistas': {}}
+        with open(caminho, 'rb') as f:
+            return JsonCodec.loads(f.read())
+
+    @staticmethod
+    def generation():
+        return ShardedStorage.manifest()['geracao']
+
+    @staticmethod
+    def issues(manifesto=None):
+        """Revistas presentes, na ordem de ORDEM_SIBILA (demais números ao final)."""
+        revistas = (manifesto or ShardedStorage.manifest())['revistas']
+        return sorted(revistas, key=lambda n: (ORDEM_SIBILA.index(n) if n in ORDEM_SIBILA else 999, n))
+
+    @staticmethod
+    def _indice_ids():
+        caminho = ShardedStorage._caminho('ids.json')
+        if not os.path.exists(caminho):
+            return {}
+        with open(caminho, 'rb') as f:
+            return JsonCodec.loads(f.read())
+
+    @staticmethod
+    def _nome_arquivo(n, manifesto):
+        if n in manifesto['revistas']:
+            return manifesto['revistas'][n]['arquivo']
+        usados = {info['arquivo'] for info in manifesto['revistas'].values()}
+        base = "revista_" + (re.sub(r'[^0-9A-Za-z_-]+', '_', n) or "sem_numero")
+        nome, i = base + ".json", 1
+        while nome in usados:
+            i += 1
+            nome = f"{base}_{i}.json"
+        return nome
+
+    @staticmethod
+    def load_issue(n, manifesto=None):
+        info = (manifesto or ShardedStorage.manifest())['revistas'].get(str(n))
+        if not info:
+            return []
+        with open(ShardedStorage._caminho(info['arquivo']), 'rb') as f:
+            return JsonCodec.loads(f.read())
+
+    @staticmethod
+    def load_all():
+        manifesto = ShardedStorage.manifest()
+        return [r for n in ShardedStorage.issues(manifesto) for r in ShardedStorage.load_issue(n, manifesto)]
+
+    @staticmethod
+    def get(reg_id):
+        n = ShardedStorage._indice_ids().get(reg_id)
+        if n is None:
+            return None
+        return next((r for r in ShardedStorage.load_issue(n) if r.get('_id') == reg_id), None)
+
+    @staticmethod
+    def find_by_key(n, registro, excluir_id=None):
+        for r in ShardedStorage.load_issue(str(n)):
+            if str(r.get('registro')) == str(registro) and (not excluir_id or r.get('_id') != excluir_id):
+                return r
+        return None
+
+    @staticmethod
+    def _gravar_revista(n, registros, manifesto):
+        nome = ShardedStorage._nome_arquivo(n, manifesto)
+        if not registros:
+            if os.path.exists(ShardedStorage._caminho(nome)):
+                os.remove(ShardedStorage._caminho(nome))
+            manifesto['revistas'].pop(n, None)
+            return
+        bruto = JsonCodec.dumps(registros)
+        gravar_arquivo_atomico(ShardedStorage._caminho(nome), bruto)
+        manifesto['revistas'][n] = {
+            'arquivo': nome,
+            'registros': len(registros),
+            'icones': sum(len(r['iconografias']) for r in registros if isinstance(r.get('iconografias'), list)),
+            'versao': hashlib.sha1(bruto).hexdigest()[:16],
+        }
+
+    @staticmethod
+    def _confirmar(manifesto, ids):
+        manifesto['geracao'] = manifesto.get('geracao', 0) + 1
+        gravar_arquivo_atomico(ShardedStorage._caminho('ids.json'), JsonCodec.dumps(ids))
+        gravar_arquivo_atomico(ShardedStorage._caminho('manifesto.json'), JsonCodec.dumps(manifesto))
+
+    @staticmethod
+    def upsert(rec):
+        """Grava um registro reescrevendo só o fragmento da revista dele (e o de origem, se mudou de número)."""
+        os.makedirs(SHARDS_DIR, exist_ok=True)
+        manifesto = ShardedStorage.manifest()
+        ids = ShardedStorage._indice_ids()
+        n = ShardedStorage.chave(rec)
+        anterior = ids.get(rec['_id'])
+        registros = PersistenceModule._apply_ops(
+            ShardedStorage.load_issue(n, manifesto), [{"op": "upsert", "registro": rec}]
+        )
+        ShardedStorage._gravar_revista(n, registros, manifesto)
+        if anterior is not None and anterior != n:
+            restantes = [r for r in ShardedStorage.load_issue(anterior, manifesto) if r.get('_id') != rec['_id']]
+            ShardedStorage._gravar_revista(anterior, restantes, manifesto)
+        ids[rec['_id']] = n
+        ShardedStorage._confirmar(manifesto, ids)
+
+    @staticmethod
+    def delete(reg_id):
+        manifesto = ShardedStorage.manifest()
+        ids = ShardedStorage._indice_ids()
+        n = ids.pop(reg_id, None)
+        if n is None:
+            return
+        restantes = [r for r in ShardedStorage.load_issue(n, manifesto) if r.get('_id') != reg_id]
+        ShardedStorage._gravar_revista(n, restantes, manifesto)
+        ShardedStorage._confirmar(manifesto, ids)
+
+    @staticmethod
+    def replace_all(registros):
+        os.makedirs(SHARDS_DIR, exist_ok=True)
+        manifesto = ShardedStorage.manifest()
+        por_revista = {}
+        for r in registros:
+            por_revista.setdefault(ShardedStorage.chave(r), []).append(r)
+        for n in set(manifesto['revistas']) - set(por_revista):
+            ShardedStorage._gravar_revista(n, [], manifesto)
+        for n, regs in por_revista.items():
+            ShardedStorage._gravar_revista(n, regs, manifesto)
+        manifesto['importado_em'] = datetime.now().isoformat()
+        ids = {r.get('_id'): ShardedStorage.chave(r) for r in registros}
+        ShardedStorage._confirmar(manifesto, ids)
+
+    @staticmethod
+    def is_empty():
+        return not os.path.exists(ShardedStorage._caminho('manifesto.json'))
+
+# ==========================================
+# ÍNDICE DE REGISTROS (CHAVES)
+# ==========================================
+
+class IndiceRegistros:
+    """
+    Índices em memória sobre uma lista de registros: `_id` → posições e
+    chave natural (Revista n + Registro) → posições, mantidos a cada upsert
+    e exclusão. Exclusões deixam a posição vazia (None) até `lista()`, de
+    modo que nenhuma operação precisa reindexar o catálogo inteiro.
+
+    `_id` repetido (importações antigas) segue a semântica do journal: o
+    upsert substitui a última ocorrência, a exclusão remove todas e a
+    consulta devolve a primeira.
+    """
+
+    def __init__(self, registros=()):
+        self.registros = []
+        self.posicoes = {}
+        self.por_chave = {}
+        for r in registros:
+            self._anexar(r)
+
+    @staticmethod
+    def chave(n, registro):
+        return (str(n), str(registro))
+
+    @staticmethod
+    def chave_ocorrencia(reg_id, ocorrencia):
+        """Chave de um registro que distingue `_id`s repetidos: o `_id` na 1ª ocorrência, "_id#k" na k-ésima."""
+        return str(reg_id) if ocorrencia == 1 else f"{reg_id}#{ocorrencia}"
+
+    @staticmethod
+    def chaves_ocorrencia(registros):
+        """chave_ocorrencia de cada registro de `registros`, na ordem."""
+        vistos = Counter()
+        for r in registros:
+            reg_id = str(r.get('_id'))
+            vistos[reg_id] += 1
+            yield IndiceRegistros.chave_ocorrencia(reg_id, vistos[reg_id])
+
+    @staticmethod
+    def ultima_ocorrencia(chaves, reg_id):
+        """Nº de ocorrências de `reg_id` entre as `chaves` (de chaves_ocorrencia); 0 se não há nenhuma."""
+        k = 0
+        while IndiceRegistros.chave_ocorrencia(reg_id, k + 1) in chaves:
+            k += 1
+        return k
+
+    def _anexar(self, rec):
+        i = len(self.registros)
+        self.registros.append(rec)
+        self.posicoes.setdefault(rec.get('_id'), []).append(i)
+        self._indexar(i, rec)
+
+    def _indexar(self, i, rec):
+        self.por_chave.setdefault(IndiceRegistros.chave(rec.get('n'), rec.get('registro')), {})[i] = None
+
+    def _desindexar(self, i):
+        rec = self.registros[i]
+        posicoes = self.por_chave.get(IndiceRegistros.chave(rec.get('n'), rec.get('registro')))
+        if posicoes is not None:
+            posicoes.pop(i, None)
+
+    def upsert(self, rec):
+        """Insere (no fim) ou substitui (na mesma posição; a última, se o `_id` se repete) o registro."""
+        posicoes = self.posicoes.get(rec.get('_id'))
+        if not posicoes:
+            self._anexar(rec)
+            return
+        i = posicoes[-1]
+        self._desindexar(i)
+        self.registros[i] = rec
+        self._indexar(i, rec)
+
+    def delete(self, reg_id):
+        """Remove todas as ocorrências de `reg_id`; devolve False se não havia nenhuma."""
+        posicoes = self.posicoes.pop(reg_id, None)
+        if not posicoes:
+            return False
+        for i in posicoes:
+            self._desindexar(i)
+            self.registros[i] = None
+        return True
+
+    def get(self, reg_id):
+        posicoes = self.posicoes.get(reg_id)
+        return self.registros[posicoes[0]] if posicoes else None
+
+    def find_by_key(self, n, registro, excluir_id=None):
+        """Primeiro registro (na ordem do catálogo) com esta Revista + Registro, opcionalmente ignorando um `_id`."""
+        for i in sorted(self.por_chave.get(IndiceRegistros.chave(n, registro), ())):
+            rec = self.registros[i]
+            if not excluir_id or rec.get('_id') != excluir_id:
+                return rec
+        return None
+
+    def lista(self):
+        """Registros vivos, na ordem do catálogo."""
+        return [r for r in self.registros if r is not None]
+
+# ==========================================
+# CACHE COLUNAR (PARQUET)
+# ==========================================
+
+class CacheColunar:
+    """
+    Tabelas derivadas do catálogo, montadas uma vez por versão dos dados: a
+    tabela plana de registros (campos escalares + colunas derivadas) e tabelas
+    longas `_id -> valor` para cada campo de lista (autores, citados,
+    palavras-chave, tipos de iconografia...), já normalizadas como em
+    DataModule.get_normalized_series.
+
+    Cada linha de uma tabela longa guarda também a posição (`linha`) do
+    registro no DataFrame de origem.
+
+    Com pyarrow instalado elas também vão para Parquet em
+    CACHE_COLUNAR_DIR/<versão>/; um processo novo lê esses arquivos mapeados
+    em memória em vez de explodir as listas do JSON de novo. A pasta de uma
+    versão é descartada quando a seguinte é gravada.
+    """
+    # Sobe quando o formato das tabelas muda: pastas gravadas em outro formato não são lidas
+    FORMATO = 2
+    # Nome da tabela longa -> campo de lista do registro
+    RELACOES = {
+        'autores': 'autores_colaboradores',
+        'citados': 'autores_citados',
+        'tradutores': 'tradutores',
+        'assunto': 'nome_pessoal_como_assunto',
+        'entidades': 'entidade_coletiva',
+        'palavras_chave': 'palavras_chave',
+        'iconografias': 'iconografias',
+    }
+    TABELA_DO_CAMPO = {campo: nome for nome, campo in RELACOES.items()}
+
+    @staticmethod
+    def _pasta(versao):
+        chave = repr((CacheColunar.FORMATO, versao))
+        return os.path.join(CACHE_COLUNAR_DIR, hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16])
+
+    @staticmethod
+    def _explodir(ids, valores, nome_pessoal):
+        longa = pd.DataFrame({
+            '_id': ids.to_numpy(), 'linha': np.arange(len(ids), dtype=np.int64), 'valor': valores.to_numpy(),
+        }).explode('valor').reset_index(drop=True)
+        valor = longa['valor'].dropna().astype(str).str.strip().replace('', pd.NA).dropna()
+        if nome_pessoal:
+            valor = valor.apply(DataModule.format_nome_abnt)
+        return pd.DataFrame({
+            '_id': longa.loc[valor.index, '_id'].astype(str),
+            'linha': longa.loc[valor.index, 'linha'].astype(np.int64),
+            'valor': valor.astype(str),
+        }).reset_index(drop=True)
+
+    @staticmethod
+    def construir(df):
+        """Tabelas de uma versão a partir do DataFrame preparado (UtilsModule.preparar_dataframe)."""
+        ids = df['_id'].astype(str) if '_id' in df.columns else pd.Series('', index=df.index)
+        tabelas = {}
+        for nome, campo in CacheColunar.RELACOES.items():
+            valores = df[campo] if campo in df.columns else pd.Series([[]] * len(df), index=df.index, dtype=object)
+            if campo == 'iconografias':
+                valores = valores.apply(
+                    lambda itens: [i.get('tipo') for i in itens if isinstance(i, dict)] if isinstance(itens, list) else []
+                )
+            tabelas[nome] = CacheColunar._explodir(ids, valores, campo in DataModule.CAMPOS_NOME_PESSOAL)
+        escalares = [c for c in df.columns if c not in CacheColunar.TABELA_DO_CAMPO and c != 'notas_pesquisa']
+        plana = df[escalares].copy()
+        for c in escalares:
+            if plana[c].dtype == object:
+                plana[c] = plana[c].map(lambda v: v if v is None or isinstance(v, str) else str(v)).astype('string')
+        tabelas['registros'] = plana.reset_index(drop=True)
+        return tabelas
+
+    @staticmethod
+    def carregar(versao):
+        """Tabelas gravadas para esta versão, ou None (sem pyarrow, sem arquivo ou arquivo ilegível)."""
+        pasta = CacheColunar._pasta(versao)
+        if not PYARROW_AVAILABLE or not os.path.isdir(pasta):
+            return None
+        try:
+            return {
+                nome: pd.read_parquet(os.path.join(pasta, f"{nome}.parquet"), memory_map=True)
+                for nome in list(CacheColunar.RELACOES) + ['registros']
+            }
+        except Exception as e:
+            print(f"Cache colunar ignorado ({pasta}): {e}")
+            return None
+
+    @staticmethod
+    def gravar(versao, tabelas):
+        """Grava as tabelas numa pasta temporária e a renomeia para a da versão; remove as versões antigas."""
+        if not PYARROW_AVAILABLE:
+            return
+        try:
+            os.makedirs(CACHE_COLUNAR_DIR, exist_ok=True)
+            destino = CacheColunar._pasta(versao)
+            if not os.path.isdir(destino):
+                temporaria = tempfile.mkdtemp(prefix='.tmp-', dir=CACHE_COLUNAR_DIR)
+                for nome, tabela in tabelas.items():
+                    tabela.to_parquet(os.path.join(temporaria, f"{nome}.parquet"), index=False)
+                try:
+                    os.replace(temporaria, destino)
+                except OSError:
+                    # Outro processo gravou a mesma versão primeiro
+                    shutil.rmtree(temporaria, ignore_errors=True)
+            for entrada in os.listdir(CACHE_COLUNAR_DIR):
+                caminho = os.path.join(CACHE_COLUNAR_DIR, entrada)
+                if caminho != destino and os.path.isdir(caminho) and not entrada.startswith('.tmp-'):
+                    shutil.rmtree(caminho, ignore_errors=True)
+        except Exception as e:
+            print(f"Erro ao gravar cache colunar: {e}")
+
+# ==========================================
+# ÍNDICE DE BUSCA
+# ==========================================
+
+class IndiceTextual:
+    """
+    Índice invertido da busca livre: termo -> {_id: {campo: frequência}}.
+
+    Os termos são dobrados (minúsculas, sem acentos: "Bilíngue" -> "bilingue"),
+    e cada termo da consulta vale como prefixo, o que permite buscar enquanto se
+    digita. Cada documento guarda o hash do registro, o comprimento de cada
+    campo e os próprios termos, para que uma edição remova só as entradas
+    dele.
+
+    `ranquear` ordena os acertos por BM25 com pesos por campo e `trecho`
+    destaca os termos no resumo; é a API comum das telas de busca e do PDF.
+
+    Persistido em INDICE_TEXTO_PATH, que pode ficar alguns registros atrás do
+    catálogo: ao carregar uma versão nova dos dados, `sincronizar` reindexa só
+    os registros cujo hash mudou (o que cobre também edições feitas fora do
+    aplicativo), e o arquivo é regravado quando a diferença passa de
+    INDICE_TEXTO_DEFASAGEM_MAX registros.
+    """
+    CAMPOS = [
+        'titulo_artigo', 'subtitulo_artigo', 'resumo', 'nota_edicao',
+        'autores_colaboradores', 'autores_citados', 'tradutores',
+        'nome_pessoal_como_assunto', 'entidade_coletiva', 'palavras_chave',
+        'vocabulario_controlado', 'iconografias',
+    ]
+
+    def __init__(self, docs=None, postings=None):
+        self.docs = docs or {}
+        self.postings = postings or {}
+        self.textos = {}
+        self._vocabulario = None
+        self._medias = None
+
+    @staticmethod
+    def dobrar(texto):
+        decomposto = unicodedata.normalize('NFKD', str(texto).lower())
+        return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+    @staticmethod
+    def tokens(texto):
+        return re.findall(r'[a-z0-9]+', IndiceTextual.dobrar(texto))
+
+    @staticmethod
+    def campos_registro(rec):
+        """{campo: [termos]} de um registro (listas são concatenadas)."""
+        campos = {}
+        for campo in IndiceTextual.CAMPOS:
+            valor = rec.get(campo)
+            if isinstance(valor, list):
+                # Itens de iconografia são dicts {tipo, descricao}: indexa os valores
+                valor = " ".join(
+                    " ".join(str(x) for x in v.values()) if isinstance(v, dict) else str(v)
+                    for v in valor if v is not None
+                )
+            elif valor is None or (isinstance(valor, float) and pd.isna(valor)):
+                valor = ""
+            campos[campo] = IndiceTextual.tokens(valor)
+        return campos
+
+    def remover(self, reg_id):
+        doc = self.docs.pop(reg_id, None)
+        if not doc:
+            return
+        for termo in doc['termos']:
+            lista = self.postings.get(termo)
+            if lista is not None:
+                lista.pop(reg_id, None)
+                if not lista:
+                    del self.postings[termo]
+        self._vocabulario = None
+        self._medias = None
+
+    def adicionar(self, rec, hash_registro=None):
+        reg_id = str(rec.get('_id'))
+        self.remover(reg_id)
+        frequencias, comprimentos = {}, {}
+        for campo, termos in IndiceTextual.campos_registro(rec).items():
+            if termos:
+                comprimentos[campo] = len(termos)
+            for termo in termos:
+                por_campo = frequencias.setdefault(termo, {})
+                por_campo[campo] = por_campo.get(campo, 0) + 1
+        for termo, por_campo in frequencias.items():
+            self.postings.setdefault(termo, {})[reg_id] = por_campo
+        self.docs[reg_id] = {
+            'hash': hash_registro or BackupStore._hash_registro(rec),
+            'comprimentos': comprimentos,
+            'termos': sorted(frequencias),
+        }
+        self._vocabulario = None
+        self._medias = None
+
+    def sincronizar(self, registros):
+        """Reindexa só o que difere de `registros`; devolve quantos documentos mudaram."""
+        mudados = 0
+        vistos = set()
+        for rec in registros:
+            reg_id = str(rec.get('_id'))
+            vistos.add(reg_id)
+            h = BackupStore._hash_registro(rec)
+            if self.docs.get(reg_id, {}).get('hash') != h:
+                self.adicionar(rec, h)
+                mudados += 1
+        for reg_id in set(self.docs) - vistos:
+            self.remover(reg_id)
+            mudados += 1
+        return mudados
+
+    def vocabulario(self):
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self.postings)
+        return self._vocabulario
+
+    def expandir(self, prefixo):
+        """Termos do índice que começam com `prefixo` (busca binária no vocabulário ordenado)."""
+        vocab = self.vocabulario()
+        inicio = bisect.bisect_left(vocab, prefixo)
+        fim = bisect.bisect_left(vocab, prefixo + '\uffff')
+        return vocab[inicio:fim]
+
+    def buscar(self, consulta, campos=None):
+        """Conjunto de _ids com todos os termos da consulta (cada um como prefixo), opcionalmente só em `campos`."""
+        resultado = None
+        for token in dict.fromkeys(IndiceTextual.tokens(consulta)):
+            ids = set()
+            for termo in self.expandir(token):
+                if campos is None:
+                    ids.update(self.postings[termo])
+                else:
+                    ids.update(i for i, por_campo in self.postings[termo].items() if any(c in por_campo for c in campos))
+            resultado = ids if resultado is None else resultado & ids
+            if not resultado:
+                return set()
+        return resultado or set()
+
+    # --- Ranqueamento (BM25 com pesos por campo) ---
+
+    K1 = 1.2
+    B = 0.75
+    # Título > palavras-chave > nomes > resumo > notas
+    PESOS_CAMPOS = {
+        'titulo_artigo': 3.0, 'palavras_chave': 2.5, 'subtitulo_artigo': 2.0,
+        'autores_colaboradores': 1.5, 'nome_pessoal_como_assunto': 1.5, 'autores_citados': 1.2,
+        'tradutores': 1.0, 'entidade_coletiva': 1.0, 'vocabulario_controlado': 1.0,
+        'resumo': 1.0, 'nota_edicao': 0.5, 'iconografias': 0.5,
+    }
+    # Termo do índice alcançado só como prefixo vale menos que o termo exato da consulta
+    PESO_PREFIXO = 0.5
+
+    def medias_campos(self):
+        if self._medias is None:
+            totais = {}
+            for doc in self.docs.values():
+                for campo, n in doc['comprimentos'].items():
+                    totais[campo] = totais.get(campo, 0) + n
+            total_docs = len(self.docs) or 1
+            self._medias = {campo: t / total_docs for campo, t in totais.items()}
+        return self._medias
+
+    def pontuar(self, consulta, pesos=None, restringir_a=None):
+        """{_id: pontuação BM25} dos registros com todos os termos, na ordem do catálogo."""
+        candidatos = self.buscar(consulta)
+        if restringir_a is not None:
+            candidatos &= set(restringir_a)
+        if not candidatos:
+            return {}
+        pesos = pesos or self.PESOS_CAMPOS
+        medias = self.medias_campos()
+        total_docs = len(self.docs)
+        pontos = {reg_id: 0.0 for reg_id in self.docs if reg_id in candidatos}
+        for token in dict.fromkeys(IndiceTextual.tokens(consulta)):
+            for termo in self.expandir(token):
+                lista = self.postings[termo]
+                idf = math.log(1 + (total_docs - len(lista) + 0.5) / (len(lista) + 0.5))
+                fator = idf * (1.0 if termo == token else self.PESO_PREFIXO)
+                for reg_id in (pontos if len(pontos) < len(lista) else lista):
+                    por_campo = lista.get(reg_id)
+                    if por_campo is None or reg_id not in pontos:
+                        continue
+                    comprimentos = self.docs[reg_id]['comprimentos']
+                    parcial = 0.0
+                    for campo, tf in por_campo.items():
+                        peso = pesos.get(campo, 0)
+                        if peso:
+                            norm = 1 - self.B + self.B * comprimentos.get(campo, 0) / (medias.get(campo) or 1)
+                            parcial += peso * tf * (self.K1 + 1) / (tf + self.K1 * norm)
+                    pontos[reg_id] += fator * parcial
+        return pontos
+
+    def ranquear(self, consulta, k=10, pesos=None, restringir_a=None):
+        """Os k mais relevantes [(_id, pontuação)], por heap (sem ordenar todos os acertos)."""
+        pontos = self.pontuar(consulta, pesos, restringir_a)
+        return heapq.nlargest(k, pontos.items(), key=lambda item: item[1])
+
+    # --- Trechos ---
+
+    def preparar_trechos(self, registros):
+        """Guarda em memória (não no arquivo) o necessário para exibir um acerto: revista, registro, título e resumo."""
+        self.textos = {
+            str(rec.get('_id')): {
+                'n': rec.get('n', ''), 'registro': rec.get('registro', ''),
+                'titulo': rec.get('titulo_artigo', '') or '', 'resumo': str(rec.get('resumo') or ''),
+            }
+            for rec in registros
+        }
+
+    def trecho(self, reg_id, consulta, largura=220, marcador='**'):
+        """Janela do resumo em torno do primeiro acerto, com os termos da consulta entre `marcador`."""
+        info = self.textos.get(reg_id)
+        if not info or not info['resumo']:
+            return ""
+        texto = info['resumo']
+        if 'resumo_dobrado' not in info:
+            # Dobra caractere a caractere para manter as posições do texto original
+            info['resumo_dobrado'] = ''.join((IndiceTextual.dobrar(c) or c)[0] for c in texto)
+        termos = [re.escape(t) for t in dict.fromkeys(IndiceTextual.tokens(consulta))]
+        achados = []
+        if termos:
+            padrao = re.compile(r'(?<![a-z0-9])(?:' + '|'.join(termos) + r')[a-z0-9]*')
+            achados = [(a.start(), a.end()) for a in padrao.finditer(info['resumo_dobrado'])]
+        inicio = max(0, achados[0][0] - largura // 3) if achados else 0
+        if inicio > 0:
+            espaco = texto.find(' ', inicio, achados[0][0])
+            inicio = espaco + 1 if espaco >= 0 else inicio
+        fim = min(len(texto), inicio + largura)
+        if fim < len(texto):
+            espaco = texto.rfind(' ', inicio, fim)
+            fim = espaco if espaco > inicio else fim
+        partes, pos = [], inicio
+        for a, b in achados:
+            if a < inicio or b > fim:
+                continue
+            partes += [texto[pos:a], marcador, texto[a:b], marcador]
+            pos = b
+        partes.append(texto[pos:fim])
+        return ("…" if inicio > 0 else "") + "".join(partes) + ("…" if fim < len(texto) else "")
+
+    @staticmethod
+    def carregar(caminho=None):
+        caminho = caminho or INDICE_TEXTO_PATH
+        if not os.path.exists(caminho):
+            return IndiceTextual()
+        try:
+            with open(caminho, 'rb') as f:
+                dados = JsonCodec.loads(f.read())
+            return IndiceTextual(dados.get('docs'), dados.get('postings'))
+        except Exception as e:
+            # Índice corrompido: é só um derivado do catálogo, reconstrói do zero
+            print(f"Índice de busca ilegível, reconstruindo: {e}")
+            return IndiceTextual()
+
+    def salvar(self, caminho=None):
+        caminho = caminho or INDICE_TEXTO_PATH
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        gravar_arquivo_atomico(caminho, JsonCodec.dumps({'docs': self.docs, 'postings': self.postings}))
+
+# ==========================================
+# BUSCA APROXIMADA (TRIGRAMAS)
+# ==========================================
+
+class IndiceAproximado:
+    """
+    Busca tolerante a erros de digitação e de acentuação sobre uma lista de
+    textos curtos (nomes no formato ABNT, títulos).
+
+    Cada palavra, já dobrada (IndiceTextual.dobrar), vira trigramas com bordas
+    ("  bo", " bon", "bon", ..., "no "). Um bincount sobre as listas de
+    trigramas da consulta dá a fração deles presente em cada texto, e só os
+    mais parecidos passam para a verificação de distância de edição. Nela,
+    cada palavra da consulta precisa estar a no máximo 0, 1 ou 2 edições
+    (conforme o tamanho) de uma palavra do texto ou de um prefixo dela. A
+    ordem das palavras não importa: "haroldo campos" acha "CAMPOS, Haroldo de".
+    """
+    # Quantos candidatos (por consulta) passam para a verificação de distância
+    CANDIDATOS_POR_RESULTADO = 10
+
+    def __init__(self, chaves, cargas=None):
+        self.chaves = list(chaves)
+        self.cargas = list(cargas) if cargas is not None else [None] * len(self.chaves)
+        self.palavras = [IndiceTextual.tokens(c) for c in self.chaves]
+        listas = {}
+        for i, palavras in enumerate(self.palavras):
+            for tri in IndiceAproximado.trigramas(palavras):
+                listas.setdefault(tri, []).append(i)
+        self.listas = {tri: np.asarray(ids, dtype=np.int32) for tri, ids in listas.items()}
+
+    @staticmethod
+    def trigramas(palavras):
+        tris = set()
+        for p in palavras:
+            p = f"  {p} "
+            tris.update(p[i:i + 3] for i in range(len(p) - 2))
+        return tris
+
+    @staticmethod
+    def limite_edicoes(palavra):
+        return 0 if len(palavra) <= 3 else 1 if len(palavra) <= 6 else 2
+
+    @staticmethod
+    def levenshtein(a, b, limite):
+        """Distância de edição entre a e b, ou limite + 1 assim que ela passar de `limite`."""
+        if abs(len(a) - len(b)) > limite:
+            return limite + 1
+        anterior = list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            atual = [i]
+            for j, cb in enumerate(b, 1):
+                atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+            if min(atual) > limite:
+                return limite + 1
+            anterior = atual
+        return anterior[-1]
+
+    @staticmethod
+    def distancia(consulta, palavras):
+        """Soma, por palavra da consulta, da menor distância a uma palavra (ou prefixo) do texto; None se alguma passa do limite."""
+        total = 0
+        for q in consulta:
+            limite = IndiceAproximado.limite_edicoes(q)
+            melhor = limite + 1
+            for p in palavras:
+                melhor = min(melhor, IndiceAproximado.levenshtein(q, p, limite))
+                if len(p) > len(q):
+                    melhor = min(melhor, IndiceAproximado.levenshtein(q, p[:len(q)], limite))
+                if melhor == 0:
+                    break
+            if melhor > limite:
+                return None
+            total += melhor
+        return total
+
+    def buscar(self, consulta, k=10, limiar=0.3, aceitar=None):
+        """
+        Até k acertos [(chave, carga, distância, similaridade)], dos mais próximos
+        aos menos. Com `aceitar(carga)`, as chaves recusadas saem antes da escolha
+        dos candidatos, e os k são os melhores entre as aceitas.
+        """
+        palavras = IndiceTextual.tokens(consulta)
+        tris = IndiceAproximado.trigramas(palavras)
+        listas = [self.listas[t] for t in tris if t in self.listas]
+        if not listas:
+            return []
+        similaridade = np.bincount(np.concatenate(listas), minlength=len(self.chaves)) / len(tris)
+        candidatos = np.flatnonzero(similaridade >= limiar)
+        if aceitar is not None:
+            candidatos = np.array([i for i in candidatos if aceitar(self.cargas[i])], dtype=np.int64)
+        maximo = self.CANDIDATOS_POR_RESULTADO * k
+        if len(candidatos) > maximo:
+            candidatos = candidatos[np.argpartition(-similaridade[candidatos], maximo)[:maximo]]
+        achados = []
+        for i in candidatos:
+            d = IndiceAproximado.distancia(palavras, self.palavras[i])
+            if d is not None:
+                achados.append((d, -float(similaridade[i]), int(i)))
+        return [
+            (self.chaves[i], self.cargas[i], d, -s)
+            for d, s, i in heapq.nsmallest(k, achados)
+        ]
+
+# ==========================================
+# FACETAS (BITSETS)
+# ==========================================
+
+class MotorFacetas:
+    """
+    Um bitset por valor de faceta, calculado uma vez por versão dos dados sobre
+    o DataFrame de load_dataframe (bit i = linha i). Valores de cada faceta:
+    revista, tipo textual completo (vocabulario_controlado), tipo base,
+    palavra-chave (sem distinção de caixa), idioma (1 ou 2) e bilíngue
+    (True/False).
+
+    Os bitsets são ints do Python. Um filtro faz OR entre os valores escolhidos
+    de uma faceta e AND entre facetas, e as contagens ao lado das opções saem
+    de int.bit_count().
+    """
+    FACETAS = ('revista', 'tipo', 'tipo_base', 'palavra_chave', 'idioma', 'bilingue',
+               'autor', 'citado', 'tradutor', 'assunto')
+    # Facetas de nomes (valores no formato ABNT) -> campo de lista do registro
+    CAMPOS_NOMES = {
+        'autor': 'autores_colaboradores', 'citado': 'autores_citados',
+        'tradutor': 'tradutores', 'assunto': 'nome_pessoal_como_assunto',
+    }
+
+    def __init__(self, df):
+        self.total = len(df)
+        self.todos = (1 << self.total) - 1
+        self.bits = {faceta: {} for faceta in self.FACETAS}
+        self.ids = df['_id'].astype(str).tolist() if '_id' in df.columns else []
+        self._posicao = {reg_id: i for i, reg_id in enumerate(self.ids)}
+        self._dobrados = {}
+        if df.empty:
+            return
+        colunas = {
+            'revista': df['n'].astype(str) if 'n' in df.columns else None,
+            'tipo': df['vocabulario_controlado'].fillna('').astype(str).str.strip()
+                    if 'vocabulario_controlado' in df.columns else None,
+            'tipo_base': df['__tipo_base'],
+            'bilingue': df['__bilingue'],
+        }
+        if 'palavras_chave' in df.columns:
+            colunas['palavra_chave'] = df['palavras_chave'].explode().dropna().astype(str).str.strip().str.lower()
+        idiomas = [df[c].fillna('').astype(str).str.strip().str.upper() for c in ('idioma_01', 'idioma_02') if c in df.columns]
+        if idiomas:
+            colunas['idioma'] = pd.concat(idiomas)
+        for faceta, campo in self.CAMPOS_NOMES.items():
+            if campo in df.columns:
+                nomes = df[campo].explode().dropna().astype(str).str.strip()
+                nomes = nomes[nomes != '']
+                abnt = {nome: DataModule.format_nome_abnt(nome) for nome in nomes.unique()}
+                colunas[faceta] = nomes.map(abnt)
+        posicoes = pd.Series(np.arange(self.total), index=df.index)
+        for faceta, valores in colunas.items():
+            if valores is None:
+                continue
+            valores = valores[valores != ''] if valores.dtype != bool else valores
+            pos = posicoes.loc[valores.index].to_numpy()
+            for valor, grupo in pd.Series(pos, index=valores.to_numpy()).groupby(level=0):
+                self.bits[faceta][valor] = self._de_posicoes(grupo.to_numpy())
+
+    def _de_posicoes(self, posicoes):
+        mascara = np.zeros(self.total, dtype=bool)
+        mascara[posicoes] = True
+        return int.from_bytes(np.packbits(mascara, bitorder='little').tobytes(), 'little')
+
+    @staticmethod
+    def _chave(faceta, valor):
+        return str(valor).strip().lower() if faceta == 'palavra_chave' else valor
+
+    def valores(self, faceta):
+        return list(self.bits[faceta])
+
+    def valores_por_texto(self, faceta, texto):
+        """
+        Valores da faceta iguais a `texto` sem distinção de caixa/acentos;
+        com '*' no fim, os que começam por ele.
+        """
+        if faceta not in self._dobrados:
+            dobrados = {}
+            for valor in self.bits[faceta]:
+                dobrados.setdefault(IndiceTextual.dobrar(str(valor)).strip(), []).append(valor)
+            self._dobrados[faceta] = dobrados
+        alvo = IndiceTextual.dobrar(texto).strip()
+        if alvo.endswith('*'):
+            alvo = alvo[:-1]
+            return [v for chave, vs in self._dobrados[faceta].items() if chave.startswith(alvo) for v in vs]
+        return self._dobrados[faceta].get(alvo, [])
+
+    def de_ids(self, ids):
+        """Bitset dos registros com estes _ids."""
+        posicoes = [self._posicao[i] for i in ids if i in self._posicao]
+        return self._de_posicoes(np.asarray(posicoes, dtype=np.int64)) if posicoes else 0
+
+    def ids_de(self, bitset):
+        return [self.ids[i] for i in self.posicoes(bitset)]
+
+    def linhas(self, df, ids):
+        """Linhas de `df` (o DataFrame de load_dataframe) com estes _ids, na ordem dada."""
+        if len(df) != self.total:
+            raise ValueError("DataFrame não corresponde à versão das facetas")
+        return df.iloc[[self._posicao[i] for i in ids if i in self._posicao]]
+
+    def selecionar(self, faceta, valores):
+        """OR dos bitsets dos valores; sem valores, todos os registros (faceta não filtra)."""
+        if not valores:
+            return self.todos
+        resultado = 0
+        for valor in valores:
+            resultado |= self.bits[faceta].get(self._chave(faceta, valor), 0)
+        return resultado
+
+    def filtrar(self, **criterios):
+        """AND entre facetas, ex.: filtrar(revista=['3'], palavra_chave=['Poesia'])."""
+        resultado = self.todos
+        for faceta, valores in criterios.items():
+            resultado &= self.selecionar(faceta, valores)
+        return resultado
+
+    def contar(self, faceta, valor, base=None):
+        bits = self.bits[faceta].get(self._chave(faceta, valor), 0)
+        return (bits & (self.todos if base is None else base)).bit_count()
+
+    def posicoes(self, bitset):
+        bytes_ = bitset.to_bytes((self.total + 7) // 8, 'little')
+        mascara = np.unpackbits(np.frombuffer(bytes_, dtype=np.uint8), bitorder='little')[:self.total]
+        return np.flatnonzero(mascara)
+
+    def aplicar(self, df, bitset):
+        """Linhas de `df` (o DataFrame de load_dataframe, na mesma ordem) marcadas em `bitset`."""
+        if len(df) != self.total:
+            raise ValueError("DataFrame não corresponde à versão das facetas")
+        return df.iloc[self.posicoes(bitset)]
+
+# ==========================================
+# RELATÓRIOS MATERIALIZADOS
+# ==========================================
+
+class RelatoriosMaterializados:
+    """
+    Totais por revista usados pelos relatórios (itens, bilíngues, imagens,
+    páginas, tipos, palavras-chave, colaboradores e nomes como assunto),
+    gravados em indices/relatorios.json junto com a contribuição de cada
+    registro. Numa gravação de registros só a revista afetada muda:
+    subtrai-se a contribuição guardada e soma-se a nova. Como em
+    BuscasSalvas, o arquivo traz a versão dos dados; se não confere,
+    a próxima leitura ressincroniza (só os registros cuja contribuição mudou).
+    """
+    LISTAS = {
+        'palavras_chave': 'palavras_chave', 'colaboradores': 'autores_colaboradores',
+        'assunto': 'nome_pessoal_como_assunto',
+    }
+
+    # Sobe quando a regra de contribuicao (ou a chave dos registros) muda: arquivo de outro
+    # formato é refeito do zero
+    FORMATO = 3
+
+    @staticmethod
+    def vazio():
+        return {'formato': RelatoriosMaterializados.FORMATO, 'versao_dados': None, 'registros': {}, 'revistas': {}}
+
+    @staticmethod
+    def _ler():
+        if not os.path.exists(RELATORIOS_PATH):
+            return RelatoriosMaterializados.vazio()
+        with open(RELATORIOS_PATH, 'rb') as f:
+            dados = JsonCodec.loads(f.read())
+        return dados if dados.get('formato') == RelatoriosMaterializados.FORMATO else RelatoriosMaterializados.vazio()
+
+    @staticmethod
+    def _gravar(dados):
+        os.makedirs(INDICES_DIR, exist_ok=True)
+        gravar_arquivo_atomico(RELATORIOS_PATH, JsonCodec.dumps(dados))
+
+    @staticmethod
+    def contribuicao(rec):
+        """O que um registro soma aos totais da revista dele (mesmas regras de preparar_dataframe)."""
+        vocab = rec.get('vocabulario_controlado')
+        texto = " ".join(str(rec.get(c) or '') for c in ('nota_edicao', 'resumo')).lower()
+        icones = rec.get('iconografias')
+        inicio, fim, _, _ = UtilsModule.intervalo_paginas(rec.get('paginas'))
+        contrib = {
+            'n': str(rec.get('n')),
+            'bilingue': int('bilíngue' in texto or 'bilingue' in texto),
+            'imagens': len(icones) if isinstance(icones, list) else 0,
+            'pagina_max': max(inicio, fim),
+            'tipo': None if vocab is None else (
+                'Manifesto' if 'manifesto' in str(vocab).lower() else str(vocab).split(' - ', 1)[0]
+            ),
+        }
+        for chave, campo in RelatoriosMaterializados.LISTAS.items():
+            valores = [str(v).strip() for v in (rec.get(campo) if isinstance(rec.get(campo), list) else [])
+                       if v is not None and str(v).strip()]
+            if campo in DataModule.CAMPOS_NOME_PESSOAL:
+                valores = [DataModule.format_nome_abnt(v) for v in valores]
+            contrib[chave] = dict(Counter(valores))
+        return contrib
+
+    @staticmethod
+    def _somar(revistas, reg_id, contrib, sinal):
+        total = revistas.setdefault(contrib['n'], {
+            'itens': 0, 'bilingues': 0, 'imagens': 0, 'paginas': {}, 'tipos': {},
+            'palavras_chave': {}, 'colaboradores': {}, 'assunto': {},
+        })
+        total['itens'] += sinal
+        total['bilingues'] += sinal * contrib['bilingue']
+        total['imagens'] += sinal * contrib['imagens']
+
+        def contar(contador, chave, qtd):
+            contador[chave] = contador.get(chave, 0) + qtd
+            if not contador[chave]:
+                del contador[chave]
+
+        # A maior página é guardada como multiconjunto, para poder ser subtraída
+        contar(total['paginas'], str(contrib['pagina_max']), sinal)
+        if contrib['tipo'] is not None:
+            contar(total['tipos'], contrib['tipo'], sinal)
+        for chave in RelatoriosMaterializados.LISTAS:
+            for valor, qtd in contrib[chave].items():
+                contar(total[chave], valor, sinal * qtd)
+        if not total['itens']:
+            del revistas[contrib['n']]
+
+    @staticmethod
+    def _trocar(dados, reg_id, contrib):
+        """Substitui a contribuição de um registro (None = excluído); devolve True se mudou."""
+        anterior = dados['registros'].get(reg_id)
+        if anterior == contrib:
+            return False
+        if anterior is not None:
+            RelatoriosMaterializados._somar(dados['revistas'], reg_id, anterior, -1)
+            del dados['registros'][reg_id]
+        if contrib is not None:
+            RelatoriosMaterializados._somar(dados['revistas'], reg_id, contrib, 1)
+            dados['registros'][reg_id] = contrib
+        return True
+
+    @staticmethod
+    def sincronizar(dados, registros):
+        """
+        Ajusta os totais a `registros` (o catálogo inteiro); devolve True se algo
+        mudou. As contribuições são guardadas por IndiceRegistros.chave_ocorrencia,
+        para que um `_id` repetido conte uma vez por registro, como no DataFrame.
+        """
+        mudou = False
+        vistos = set()
+        for chave, rec in zip(IndiceRegistros.chaves_ocorrencia(registros), registros):
+            vistos.add(chave)
+            mudou |= RelatoriosMaterializados._trocar(dados, chave, RelatoriosMaterializados.contribuicao(rec))
+        for chave in set(dados['registros']) - vistos:
+            mudou |= RelatoriosMaterializados._trocar(dados, chave, None)
+        return mudou
+
+    @staticmethod
+    def aplicar(versao_antes, versao_depois, registros=None, upserts=(), deletes=()):
+        """Mesma assinatura de BackupStore.registrar; incremental só sobre totais de `versao_antes`."""
+        dados = RelatoriosMaterializados._ler()
+        if registros is not None:
+            RelatoriosMaterializados.sincronizar(dados, registros)
+        elif dados.get('versao_dados') == BuscasSalvas.versao(versao_antes):
+            # Mesma semântica do journal: exclusão remove todas as ocorrências do `_id`,
+            # upsert substitui a última (ou anexa a primeira)
+            for reg_id in deletes:
+                for k in range(IndiceRegistros.ultima_ocorrencia(dados['registros'], str(reg_id)), 0, -1):
+                    RelatoriosMaterializados._trocar(dados, IndiceRegistros.chave_ocorrencia(reg_id, k), None)
+            for rec in upserts:
+                reg_id = str(rec.get('_id'))
+                k = max(IndiceRegistros.ultima_ocorrencia(dados['registros'], reg_id), 1)
+                RelatoriosMaterializados._trocar(
+                    dados, IndiceRegistros.chave_ocorrencia(reg_id, k), RelatoriosMaterializados.contribuicao(rec)
+                )
+        else:
+            # Totais já defasados: a próxima leitura ressincroniza
+            return
+        dados['versao_dados'] = BuscasSalvas.versao(versao_depois)
+        RelatoriosMaterializados._gravar(dados)
+
+# ==========================================
+# AGREGAÇÕES (RELATÓRIOS)
+# ==========================================
+
+class AgregadosCatalogo:
+    """
+    Medidas por revista e por tipo textual para os relatórios. Para o
+    catálogo inteiro vêm dos totais materializados (RelatoriosMaterializados),
+    lidos uma vez por versão dos dados; para recortes, são calculadas com
+    operações vetorizadas sobre as colunas derivadas de
+    UtilsModule.preparar_dataframe. Cada relatório só seleciona daqui;
+    `de(df)` escolhe o caminho. Somente leitura.
+    """
+    def __init__(self, df, revistas=None):
+        self.df = df
+        if revistas is not None:
+            self._de_totais(revistas)
+            return
+        ordem = pd.Categorical(df['n'].astype(str), categories=ORDEM_SIBILA, ordered=True)
+        self.por_revista = pd.DataFrame({
+            'n': ordem,
+            'itens': 1,
+            'bilingues': df['__bilingue'].astype(int),
+            'imagens': df['__qtd_icones'],
+            'ultima_pagina': df['__pagina_max'],
+        }).groupby('n', observed=True).agg(
+            itens=('itens', 'sum'), bilingues=('bilingues', 'sum'),
+            imagens=('imagens', 'sum'), ultima_pagina=('ultima_pagina', 'max'),
+        )
+        self._completar_revistas()
+
+        vocab = df['vocabulario_controlado'] if 'vocabulario_controlado' in df.columns \
+            else pd.Series('', index=df.index)
+        eh_manifesto = vocab.fillna('').astype(str).str.lower().str.contains('manifesto', regex=False)
+        self._tipos = df['__tipo_base'].where(~eh_manifesto, 'Manifesto').value_counts().to_dict()
+        self._contagens = {
+            chave: DataModule.get_normalized_series(df, campo).value_counts().to_dict()
+            for chave, campo in RelatoriosMaterializados.LISTAS.items()
+        }
+
+    def _de_totais(self, revistas):
+        linhas = {
+            n: {
+                'itens': t['itens'], 'bilingues': t['bilingues'], 'imagens': t['imagens'],
+                'ultima_pagina': max((int(p) for p in t['paginas']), default=0),
+            }
+            for n, t in revistas.items()
+        }
+        ordem = [n for n in ORDEM_SIBILA if n in linhas] + sorted(n for n in linhas if n not in ORDEM_SIBILA)
+        self.por_revista = pd.DataFrame.from_dict(
+            linhas, orient='index', columns=['itens', 'bilingues', 'imagens', 'ultima_pagina']
+        ).reindex(ordem).rename_axis('n')
+        self._completar_revistas()
+
+        def somar(chave):
+            total = Counter()
+            for t in revistas.values():
+                total.update(t[chave])
+            return dict(total)
+
+        self._tipos = somar('tipos')
+        self._contagens = {chave: somar(chave) for chave in RelatoriosMaterializados.LISTAS}
+
+    def _completar_revistas(self):
+        por_revista = self.por_revista
+        por_revista['pct_bilingue'] = np.where(
+            por_revista['itens'] > 0, por_revista['bilingues'] / por_revista['itens'].clip(lower=1) * 100, 0
+        )
+        # Densidade: imagens / última página física da revista (sem página conhecida, 1)
+        por_revista['paginas'] = por_revista['ultima_pagina'].where(por_revista['ultima_pagina'] > 0, 1)
+        por_revista['densidade'] = por_revista['imagens'] / por_revista['paginas'] * 100
+
+    @staticmethod
+    def de(df):
+        # Só o próprio DataFrame de load_dataframe usa os totais materializados;
+        # recortes e cópias (mesmo do mesmo tamanho) são recontados
+        versao = PersistenceModule.versao_canonica(df)
+        if versao is not None:
+            return PersistenceModule._agregados_versioned(versao)
+        return AgregadosCatalogo(df)
+
+    @staticmethod
+    def _ordenar(contagens):
+        # Mais frequentes primeiro; empates em ordem alfabética (não dependem da ordem de gravação)
+        return sorted(contagens.items(), key=lambda item: (-item[1], item[0]))
+
+    def tabela_revistas(self, colunas):
+        """{coluna de por_revista: rótulo} -> DataFrame com 'n' e as colunas pedidas, na ordem das revistas."""
+        tabela = self.por_revista[list(colunas)].rename(columns=colunas).reset_index()
+        tabela['n'] = tabela['n'].astype(str)
+        return tabela
+
+    def tipos(self):
+        return pd.DataFrame(AgregadosCatalogo._ordenar(self._tipos), columns=['Tipo textual', 'Num. Absoluto'])
+
+    def contagens(self, chave):
+        """Termo / Qtd / % (como UtilsModule.calculate_stats_with_percentage) de uma das LISTAS."""
+        if not self._contagens[chave]:
+            return pd.DataFrame(columns=['Termo', 'Qtd', '%'])
+        counts = pd.DataFrame(AgregadosCatalogo._ordenar(self._contagens[chave]), columns=['Termo', 'Qtd'])
+        counts['%'] = (counts['Qtd'] / counts['Qtd'].sum() * 100).map('{:.2f}%'.format)
+        return counts
+
+    # Faixas de extensão dos textos (nº de páginas): limite inferior -> rótulo
+    FAIXAS_PAGINAS = [(1, '1 p.'), (2, '2-3 p.'), (4, '4-7 p.'), (8, '8-15 p.'), (16, '16+ p.')]
+
+    def _paginas(self):
+        """n (código em ORDEM_SIBILA), início, fim, nº de páginas e situação, como arrays."""
+        df = self.df
+        codigo = pd.Categorical(df['n'].astype(str), categories=ORDEM_SIBILA, ordered=True).codes
+        return (codigo, df['__pag_inicio'].to_numpy(), df['__pag_fim'].to_numpy(),
+                df['__pag_qtd'].to_numpy(), df['__pag_status'].to_numpy())
+
+    def cobertura_paginas(self):
+        """
+        Por revista: páginas cobertas por algum registro (união dos
+        intervalos), última página citada, cobertura em %, e registros com
+        páginas, sem páginas e ilegíveis. Intervalos ordenados por (revista,
+        início); cada um soma só o que passa do maior fim anterior da revista.
+        """
+        codigo, inicio, fim, _, situacao = self._paginas()
+        ok = (situacao == UtilsModule.PAGINAS_OK) & (codigo >= 0)
+        c, i, f = codigo[ok], inicio[ok], fim[ok]
+        ordem = np.lexsort((i, c))
+        c, i, f = c[ordem], i[ordem], f[ordem]
+        maior_fim = pd.Series(f).groupby(c).cummax().to_numpy()
+        anterior = np.zeros_like(f)
+        mesma_revista = np.r_[False, c[1:] == c[:-1]]
+        anterior[1:] = np.where(mesma_revista[1:], maior_fim[:-1], 0)
+        novas = np.clip(f - np.maximum(i - 1, anterior), 0, None)
+
+        revistas = len(ORDEM_SIBILA)
+        validos = codigo >= 0
+        ultima = np.zeros(revistas, dtype=np.int64)
+        np.maximum.at(ultima, c, f)
+        tabela = pd.DataFrame({
+            'n.': ORDEM_SIBILA,
+            'Páginas cobertas': np.bincount(c, weights=novas, minlength=revistas).astype(int),
+            'Última página': ultima,
+            'Registros com páginas': np.bincount(c, minlength=revistas),
+            'Sem páginas': np.bincount(codigo[validos & (situacao == UtilsModule.PAGINAS_VAZIO)], minlength=revistas),
+            'Ilegíveis': np.bincount(codigo[validos & np.isin(
+                situacao, [UtilsModule.PAGINAS_ILEGIVEL, UtilsModule.PAGINAS_INVERTIDO]
+            )], minlength=revistas),
+        })
+        presentes = np.bincount(codigo[validos], minlength=revistas) > 0
+        tabela = tabela[presentes].reset_index(drop=True)
+        tabela.insert(3, 'Cobertura (%)', np.where(
+            tabela['Última página'] > 0, tabela['Páginas cobertas'] / tabela['Última página'].clip(lower=1) * 100, 0
+        ).round(1))
+        return tabela
+
+    def faixas_paginas(self):
+        """Registros por faixa de extensão (FAIXAS_PAGINAS) em cada revista, com o total por faixa."""
+        codigo, _, _, qtd, situacao = self._paginas()
+        ok = (situacao == UtilsModule.PAGINAS_OK) & (codigo >= 0)
+        limites = [limite for limite, _ in AgregadosCatalogo.FAIXAS_PAGINAS]
+        faixa = np.searchsorted(limites, qtd[ok], side='right') - 1
+        revistas, faixas = len(ORDEM_SIBILA), len(limites)
+        contagem = np.bincount(codigo[ok] * faixas + faixa, minlength=revistas * faixas).reshape(revistas, faixas)
+        tabela = pd.DataFrame(contagem, columns=[rotulo for _, rotulo in AgregadosCatalogo.FAIXAS_PAGINAS])
+        tabela.insert(0, 'n.', ORDEM_SIBILA)
+        tabela = tabela[contagem.sum(axis=1) > 0].reset_index(drop=True)
+        return tabela
+
+# ==========================================
+# OCORRÊNCIA DE TERMOS
+# ==========================================
+
+class AhoCorasick:
+    """Autômato de Aho–Corasick: todas as ocorrências de vários padrões numa só passada pelo texto."""
+
+    def __init__(self, padroes):
+        self.transicoes = [{}]
+        self.falha = [0]
+        self.saidas = [[]]
+        for padrao in padroes:
+            estado = 0
+            for c in padrao:
+                if c not in self.transicoes[estado]:
+                    self.transicoes.append({})
+                    self.falha.append(0)
+                    self.saidas.append([])
+                    self.transicoes[estado][c] = len(self.transicoes) - 1
+                estado = self.transicoes[estado][c]
+            self.saidas[estado].append(padrao)
+        # Links de falha em largura: o maior sufixo próprio que também é prefixo de algum padrão
+        fila = list(self.transicoes[0].values())
+        for estado in fila:
+            for c, proximo in self.transicoes[estado].items():
+                fila.append(proximo)
+                f = self.falha[estado]
+                while f and c not in self.transicoes[f]:
+                    f = self.falha[f]
+                self.falha[proximo] = self.transicoes[f].get(c, 0)
+                self.saidas[proximo] = self.saidas[proximo] + self.saidas[self.falha[proximo]]
+
+    def ocorrencias(self, texto):
+        """(posição final, padrão) de cada ocorrência."""
+        estado = 0
+        for i, c in enumerate(texto):
+            while estado and c not in self.transicoes[estado]:
+                estado = self.falha[estado]
+            estado = self.transicoes[estado].get(c, 0)
+            for padrao in self.saidas[estado]:
+                yield i, padrao
+
+
+class RelatorioTermos:
+    """
+    Relatório de ocorrência de termos: para cada termo (palavra ou frase,
+    sem caixa/acentos), os registros em que aparece e em quais campos.
+
+    Usa o índice invertido (IndiceTextual): uma passada de Aho–Corasick pelo
+    vocabulário acha, para todos os termos de uma vez, as palavras que contêm
+    cada um (como no antigo `'sibil' in texto`); as listas de postings dizem
+    registros e campos. Frases são conferidas por posição nos tokens do
+    campo, só nos registros candidatos e dentro de um mesmo item (uma frase
+    não emenda duas palavras-chave). Resultados ficam em memória por termo;
+    a instância vale para uma versão dos dados (somente leitura).
+    """
+    CAMPOS = [
+        ('Tipo textual', 'vocabulario_controlado'), ('Palavra-chave', 'palavras_chave'),
+        ('Título', 'titulo_artigo'), ('Resumo', 'resumo'),
+    ]
+
+    def __init__(self, indice, registros):
+        self.indice = indice
+        self._registros = {str(r.get('_id')): r for r in registros}
+        self._resultados = {}
+        vocab = indice.vocabulario()
+        self._vocab = vocab
+        self._texto_vocab = "\n".join(vocab)
+        self._inicios = []
+        pos = 0
+        for termo in vocab:
+            self._inicios.append(pos)
+            pos += len(termo) + 1
+
+    @staticmethod
+    def normalizar(termo):
+        return " ".join(IndiceTextual.tokens(termo))
+
+    def _palavras_com(self, tokens):
+        """{token: palavras do vocabulário que o contêm}, numa só passada pelo vocabulário."""
+        encontradas = {t: set() for t in tokens}
+        for fim, padrao in AhoCorasick(tokens).ocorrencias(self._texto_vocab):
+            encontradas[padrao].add(self._vocab[bisect.bisect_right(self._inicios, fim) - 1])
+        return encontradas
+
+    @staticmethod
+    def _frase_no_campo(rec, campo, partes):
+        """
+        Frase em posições consecutivas de um item do campo, com a semântica de
+        substring das palavras soltas: a primeira parte termina uma palavra, as
+        do meio são palavras inteiras e a última começa a seguinte.
+        """
+        valor = rec.get(campo)
+        itens = valor if isinstance(valor, list) else [valor]
+        n = len(partes)
+        for item in itens:
+            if item is None or (isinstance(item, float) and pd.isna(item)):
+                continue
+            tokens = IndiceTextual.tokens(str(item))
+            for i in range(len(tokens) - n + 1):
+                if (tokens[i].endswith(partes[0]) and tokens[i + n - 1].startswith(partes[-1])
+                        and tokens[i + 1:i + n - 1] == partes[1:-1]):
+                    return True
+        return False
+
+    def buscar(self, termos):
+        """{termo normalizado: {_id: [rótulos dos campos]}} para todos os `termos`."""
+        novos = [t for t in dict.fromkeys(map(RelatorioTermos.normalizar, termos)) if t and t not in self._resultados]
+        tokens = sorted({tok for termo in novos for tok in termo.split()})
+        palavras = self._palavras_com(tokens) if tokens else {}
+        for termo in novos:
+            partes = termo.split()
+            achados = {}
+            for rotulo, campo in RelatorioTermos.CAMPOS:
+                candidatos = None
+                for tok in partes:
+                    ids = {
+                        reg_id for palavra in palavras[tok]
+                        for reg_id, por_campo in self.indice.postings[palavra].items() if campo in por_campo
+                    }
+                    candidatos = ids if candidatos is None else candidatos & ids
+                    if not candidatos:
+                        break
+                for reg_id in candidatos or ():
+                    if len(partes) == 1 or self._frase_no_campo(self._registros.get(reg_id, {}), campo, partes):
+                        achados.setdefault(reg_id, []).append(rotulo)
+            self._resultados[termo] = achados
+        return {t: self._resultados[t] for t in map(RelatorioTermos.normalizar, termos) if t}
+
+# ==========================================
+# LINGUAGEM DE CONSULTA
+# ==========================================
+
+class ErroConsulta(ValueError):
+    """Consulta estruturada mal formada (mensagem pronta para exibir)."""
+
+
+class ConsultaCatalogo:
+    """
+    Consultas estruturadas do catálogo, por exemplo:
+
+        autor:"BONVICINO, Régis" AND kw:Tradução AND n:5..8 AND NOT tipo:POEMA(S)
+
+    Operadores: AND (também implícito entre termos), OR, NOT (em maiúsculas),
+    parênteses. Cada campo:valor vira o bitset de uma faceta (MotorFacetas),
+    comparado sem caixa/acentos e com '*' final como prefixo; n:a..b é um
+    intervalo de revistas, e n:a acha também o número duplo que contém a
+    ("8-9"). Palavras soltas e os campos de texto usam o índice invertido
+    (IndiceTextual).
+
+    A análise sintática fica em cache (lru_cache); na execução, cada AND
+    avalia primeiro as facetas mais seletivas, depois subexpressões e textos,
+    e para assim que o resultado parcial fica vazio.
+    """
+    # campo da consulta -> (tipo, destino)
+    CAMPOS = {
+        'autor': ('faceta', 'autor'), 'citado': ('faceta', 'citado'),
+        'tradutor': ('faceta', 'tradutor'), 'assunto': ('faceta', 'assunto'),
+        'kw': ('faceta', 'palavra_chave'), 'palavra': ('faceta', 'palavra_chave'),
+        'idioma': ('faceta', 'idioma'),
+        'n': ('revista', None), 'revista': ('revista', None),
+        'tipo': ('tipo', None),
+        'bilingue': ('bilingue', None),
+        'titulo': ('texto', ('titulo_artigo', 'subtitulo_artigo')),
+        'resumo': ('texto', ('resumo',)),
+        'texto': ('texto', None),
+    }
+    # Valores aceitam parênteses colados e balanceados, como em tipo:POEMA(S)
+    _VALOR = r'(?:[^\s()"]|\([^\s()"]*\))+'
+    _TOKEN = re.compile(rf'\s*(?:(\()|(\))|(\w+):("[^"]*"|{_VALOR})|"([^"]*)"|({_VALOR}))')
+
+    @staticmethod
+    def estruturada(texto):
+        """True se `texto` usa campos ou operadores (senão é busca livre comum)."""
+        campos = '|'.join(ConsultaCatalogo.CAMPOS)
+        return bool(re.search(rf'(?<!\w)({campos}):|\b(AND|OR|NOT)\b|[()]', texto))
+
+    @staticmethod
+    def _tokens(texto):
+        tokens, pos = [], 0
+        while pos < len(texto):
+            if not texto[pos:].strip():
+                break
+            m = ConsultaCatalogo._TOKEN.match(texto, pos)
+            if not m or m.end() == pos:
+                raise ErroConsulta(f"Consulta inválida perto de: {texto[pos:pos + 20]!r}")
+            abre, fecha, campo, valor, frase, palavra = m.groups()
+            if abre or fecha:
+                tokens.append((abre or fecha,))
+            elif campo is not None:
+                campo_min = IndiceTextual.dobrar(campo)
+                if campo_min not in ConsultaCatalogo.CAMPOS:
+                    raise ErroConsulta(
+                        f"Campo desconhecido: {campo}: (use {', '.join(ConsultaCatalogo.CAMPOS)})"
+                    )
+                tokens.append(('campo', campo_min, valor.strip('"')))
+            elif frase is not None:
+                tokens.append(('texto', frase))
+            elif palavra in ('AND', 'OR', 'NOT'):
+                tokens.append((palavra,))
+            elif palavra.endswith(':') and IndiceTextual.dobrar(palavra[:-1]) in ConsultaCatalogo.CAMPOS:
+                raise ErroConsulta(f"Campo sem valor: {palavra}")
+            else:
+                tokens.append(('texto', palavra))
+            pos = m.end()
+        return tokens
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def analisar(texto):
+        """Árvore da consulta: ('e'|'ou', filhos), ('nao', filho), ('campo', campo, valor) ou ('texto', valor)."""
+        tokens = ConsultaCatalogo._tokens(texto)
+        if not tokens:
+            raise ErroConsulta("Consulta vazia.")
+        pos = 0
+
+        def olhar():
+            return tokens[pos][0] if pos < len(tokens) else None
+
+        def ou():
+            nonlocal pos
+            filhos = [e()]
+            while olhar() == 'OR':
+                pos += 1
+                filhos.append(e())
+            return filhos[0] if len(filhos) == 1 else ('ou', tuple(filhos))
+
+        def e():
+            nonlocal pos
+            filhos = [nao()]
+            while olhar() not in (None, ')', 'OR'):
+                if olhar() == 'AND':
+                    pos += 1
+                filhos.append(nao())
+            return filhos[0] if len(filhos) == 1 else ('e', tuple(filhos))
+
+        def nao():
+            nonlocal pos
+            if olhar() == 'NOT':
+                pos += 1
+                return ('nao', nao())
+            return atomo()
+
+        def atomo():
+            nonlocal pos
+            token = tokens[pos] if pos < len(tokens) else None
+            if token is None:
+                raise ErroConsulta("Consulta incompleta: falta um termo no fim.")
+            pos += 1
+            if token[0] == '(':
+                arvore = ou()
+                if olhar() != ')':
+                    raise ErroConsulta("Parêntese aberto sem fechar.")
+                pos += 1
+                return arvore
+            if token[0] in ('campo', 'texto'):
+                return token
+            raise ErroConsulta(f"Operador fora de lugar: {token[0]}")
+
+        arvore = ou()
+        if pos != len(tokens):
+            raise ErroConsulta("Parêntese fechado sem abrir." if olhar() == ')' else "Consulta inválida.")
+        return arvore
+
+    @staticmethod
+    def descrever(no):
+        if no[0] == 'campo':
+            return f'{no[1]}:"{no[2]}"' if ' ' in no[2] else f"{no[1]}:{no[2]}"
+        if no[0] == 'texto':
+            return f'"{no[1]}"'
+        if no[0] == 'nao':
+            return f"NOT {ConsultaCatalogo.descrever(no[1])}"
+        junta = ' AND ' if no[0] == 'e' else ' OR '
+        return "(" + junta.join(ConsultaCatalogo.descrever(f) for f in no[1]) + ")"
+
+    @staticmethod
+    def termos_livres(arvore):
+        """Palavras de busca livre fora de NOT (usadas para ordenar os acertos por relevância)."""
+        if arvore[0] == 'texto':
+            return [arvore[1]]
+        if arvore[0] in ('e', 'ou'):
+            return [t for filho in arvore[1] for t in ConsultaCatalogo.termos_livres(filho)]
+        return []
+
+    @staticmethod
+    def _revistas(valor):
+        # Um número solto vale como intervalo de um só (n:8 acha o número duplo "8-9");
+        # outros valores são comparados ao rótulo da revista como estão
+        if valor.isdigit():
+            valor = f"{valor}..{valor}"
+        if '..' not in valor:
+            return [valor]
+        inicio, fim = valor.split('..', 1)
+        try:
+            inicio, fim = int(inicio or 0), int(fim or 10 ** 6)
+        except ValueError:
+            raise ErroConsulta(f"Intervalo de revistas inválido: {valor} (ex.: n:5..8)")
+        return [n for n in ORDEM_SIBILA if any(inicio <= int(x) <= fim for x in re.findall(r'\d+', n))]
+
+    @staticmethod
+    def _folha(no, motor, indice):
+        if no[0] == 'texto':
+            return motor.de_ids(indice.buscar(no[1]))
+        _, campo, valor = no
+        tipo, destino = ConsultaCatalogo.CAMPOS[campo]
+        if tipo == 'faceta':
+            return motor.selecionar(destino, motor.valores_por_texto(destino, valor) or [None])
+        if tipo == 'revista':
+            return motor.selecionar('revista', ConsultaCatalogo._revistas(valor) or [None])
+        if tipo == 'tipo':
+            # Tipo base (ENSAIO) ou tipo completo (ENSAIO - Literatura)
+            return (motor.selecionar('tipo_base', motor.valores_por_texto('tipo_base', valor) or [None])
+                    | motor.selecionar('tipo', motor.valores_por_texto('tipo', valor) or [None]))
+        if tipo == 'bilingue':
+            return motor.selecionar('bilingue', [IndiceTextual.dobrar(valor) in ('sim', 's', 'true', '1')])
+        return motor.de_ids(indice.buscar(valor, destino))
+
+    @staticmethod
+    def executar(arvore, motor, indice, plano=None):
+        """Bitset (MotorFacetas) dos registros que satisfazem a árvore; `plano` recebe a ordem de avaliação."""
+        if arvore[0] in ('campo', 'texto'):
+            bits = ConsultaCatalogo._folha(arvore, motor, indice)
+            if plano is not None:
+                plano.append((arvore, bits.bit_count()))
+            return bits
+        if arvore[0] == 'nao':
+            return motor.todos & ~ConsultaCatalogo.executar(arvore[1], motor, indice, plano)
+        if arvore[0] == 'ou':
+            bits = 0
+            for filho in arvore[1]:
+                bits |= ConsultaCatalogo.executar(filho, motor, indice, plano)
+            return bits
+        # AND: facetas (baratas) primeiro, da mais seletiva para a menos; depois o resto
+        facetas = {
+            filho: ConsultaCatalogo._folha(filho, motor, indice)
+            for filho in arvore[1] if filho[0] == 'campo' and ConsultaCatalogo.CAMPOS[filho[1]][0] != 'texto'
+        }
+        resto = sorted(
+            (f for f in arvore[1] if f not in facetas),
+            key=lambda f: {'campo': 0, 'e': 1, 'ou': 1, 'texto': 2, 'nao': 3}[f[0]]
+        )
+        bits = motor.todos
+        for filho, parcial in sorted(facetas.items(), key=lambda item: item[1].bit_count()):
+            bits &= parcial
+            if plano is not None:
+                plano.append((filho, parcial.bit_count()))
+            if not bits:
+                return 0
+        for filho in resto:
+            bits &= ConsultaCatalogo.executar(filho, motor, indice, plano)
+            if not bits:
+                return 0
+        return bits
+
+# ==========================================
+# BUSCAS SALVAS
+# ==========================================
+
+class BuscasSalvas:
+    """
+    Buscas nomeadas (consultas de ConsultaCatalogo) com o conjunto de
+    resultados materializado em buscas_salvas.json, ao lado do catálogo.
+
+    A cada gravação de registros só os registros alterados são avaliados
+    contra cada consulta salva (com facetas e índice de texto montados só
+    sobre eles, a mesma semântica da consulta sobre o catálogo inteiro).
+    O arquivo guarda a versão dos dados a que os resultados correspondem:
+    se ela não confere (gravação em lote, falha no meio, outro processo),
+    tudo é recalculado na próxima leitura.
+    """
+
+    @staticmethod
+    def _ler():
+        if not os.path.exists(BUSCAS_SALVAS_PATH):
+            return {'versao_dados': None, 'buscas': {}}
+        with open(BUSCAS_SALVAS_PATH, 'rb') as f:
+            return JsonCodec.loads(f.read())
+
+    @staticmethod
+    def _gravar(dados):
+        gravar_arquivo_atomico(BUSCAS_SALVAS_PATH, JsonCodec.dumps(dados, pretty=True))
+
+    @staticmethod
+    def versao(versao_dados):
+        # data_version() tem tuplas aninhadas: a forma textual compara igual depois do JSON
+        return repr(versao_dados)
+
+    @staticmethod
+    def avaliar(consulta, registros):
+        """_ids de `registros` que satisfazem `consulta`."""
+        if not registros:
+            return set()
+        motor = MotorFacetas(UtilsModule.preparar_dataframe([dict(r) for r in registros]))
+        indice = IndiceTextual()
+        for rec in registros:
+            indice.adicionar(rec)
+        return set(motor.ids_de(ConsultaCatalogo.executar(ConsultaCatalogo.analisar(consulta), motor, indice)))
+
+    @staticmethod
+    def aplicar(versao_antes, versao_depois, registros=None, upserts=(), deletes=()):
+        """
+        Mesma assinatura de BackupStore.registrar. Só atualiza de forma
+        incremental resultados que correspondiam a `versao_antes`.
+        """
+        dados = BuscasSalvas._ler()
+        if not dados['buscas']:
+            return
+        if registros is not None or dados.get('versao_dados') != BuscasSalvas.versao(versao_antes):
+            # Catálogo inteiro substituído (ou resultados já defasados): recálculo na leitura
+            if dados.get('versao_dados') is not None:
+                dados['versao_dados'] = None
+                BuscasSalvas._gravar(dados)
+            return
+        alterados = {str(i) for i in deletes} | {str(r.get('_id')) for r in upserts}
+        for busca in dados['buscas'].values():
+            ids = [i for i in busca['ids'] if i not in alterados]
+            ids += sorted(BuscasSalvas.avaliar(busca['consulta'], list(upserts)))
+            busca['ids'] = ids
+        dados['versao_dados'] = BuscasSalvas.versao(versao_depois)
+        BuscasSalvas._gravar(dados)
+
+# ==========================================
+# CACHE DE RESULTADOS DE BUSCA
+# ==========================================
+
+class CacheResultados:
+    """
+    LRU limitada de resultados de busca (listas de _ids e metadados), com
+    contadores de acertos, faltas e descartes. Há dois níveis: um por sessão
+    (st.session_state) e um compartilhado pelo processo inteiro
+    (PersistenceModule.result_cache), de modo que uma busca popular só é
+    calculada uma vez para todos os visitantes. As chaves incluem a versão
+    dos dados, e as entradas de versões antigas saem naturalmente pela LRU.
+    Os valores guardados são compartilhados: não alterar.
+    """
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = self.faltas = self.descartes = 0
+
+    def obter(self, chave):
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+            self.faltas += 1
+            return None
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+                self.descartes += 1
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                'itens': len(self._itens), 'capacidade': self.capacidade,
+                'acertos': self.acertos, 'faltas': self.faltas, 'descartes': self.descartes,
+                'taxa': (self.acertos / consultas * 100) if consultas else 0.0,
+            }
+
+class PersistenceModule:
+    """
+    Encapsula funções de carregamento e salvamento de dados.
+
+    O catálogo é o snapshot FILE_PATH mais o journal JOURNAL_PATH: cada
+    inserção, edição ou exclusão vira uma linha anexada ao journal
+    (custo proporcional ao registro, não ao catálogo). load_data reaplica o
+    journal sobre o snapshot, e a compactação periódica dobra o journal de
+    volta no snapshot.
+
+    Com SIBILA_STORAGE=sqlite os registros ficam em SQLiteStorage e com
+    SIBILA_STORAGE=shards em ShardedStorage (um arquivo por revista); na
+    primeira abertura o armazenamento vazio é povoado a partir do JSON, que
+    segue como formato de importação/exportação.
+
+    O cache de load_data é indexado pela versão dos dados (data_version):
+    um rerun sem alterações custa um stat()/consulta ao contador, e uma
+    gravação feita por outro processo aparece no rerun seguinte.
+    """
+    @staticmethod
+    def load_data():
+        """
+        Registros da versão atual. A lista e os dicts são compartilhados entre
+        reruns e sessões (sem cópia por chamada): somente leitura. Quem for
+        alterar um registro trabalha numa cópia (get_record já devolve uma) e
+        grava com save_record.
+        """
+        metricas = PersistenceModule.cache_stats()
+        with metricas['lock']:
+            metricas['chamadas'] += 1
+        try:
+            dados = PersistenceModule._load_versioned(PersistenceModule.data_version())
+            PersistenceModule._falhas_leitura()['catalogo'] = None
+            return dados
+        except Exception as e:
+            PersistenceModule._falhas_leitura()['catalogo'] = str(e)
+            st.error(f"Erro ao carregar dados: {str(e)}")
+            return []
+
+    @staticmethod
+    def data_version():
+        """
+        Versão barata dos dados: (mtime, tamanho, inode) do snapshot e do
+        journal no modo json; o contador de gerações do banco (sqlite) ou do
+        manifesto (shards) nos demais.
+        """
+        if STORAGE_ENGINE == 'sqlite':
+            return ('sqlite', DB_PATH, SQLiteStorage.generation())
+        if STORAGE_ENGINE == 'shards':
+            return ('shards', SHARDS_DIR, ShardedStorage.generation())
+        versao = ['json']
+        for caminho in (FILE_PATH, JOURNAL_PATH):
+            try:
+                info = os.stat(caminho)
+                versao.append((info.st_mtime_ns, info.st_size, info.st_ino))
+            except FileNotFoundError:
+                versao.append(None)
+        return tuple(versao)
+
+    @staticmethod
+    def _motor():
+        """Armazenamento de registros avulsos (SQLiteStorage/ShardedStorage), ou None no modo json."""
+        return {'sqlite': SQLiteStorage, 'shards': ShardedStorage}.get(STORAGE_ENGINE)
+
+    @staticmethod
+    def load_issue(n):
+        """
+        Registros de uma revista, na ordem do catálogo. No modo shards lê só o
+        fragmento dela (em cache pela versão do fragmento); nos demais filtra
+        o catálogo já carregado.
+        """
+        n = str(n)
+        if STORAGE_ENGINE != 'shards':
+            return [r for r in PersistenceModule.load_data() if str(r.get('n', '') or '') == n]
+        try:
+            PersistenceModule._garantir_shards()
+            info = ShardedStorage.manifest()['revistas'].get(n)
+            return PersistenceModule._issue_versioned(n, info['versao']) if info else []
+        except Exception as e:
+            st.error(f"Erro ao carregar dados: {str(e)}")
+            return []
+
+    @staticmethod
+    def issue_dataframe(n):
+        """
+        DataFrame preparado de uma revista. No modo shards vem só do fragmento
+        dela (montado uma vez por versão do fragmento); nos demais é um recorte
+        do DataFrame compartilhado do catálogo.
+        """
+        n = str(n)
+        if STORAGE_ENGINE != 'shards':
+            df = PersistenceModule.load_dataframe()
+            return df[df['n'].astype(str) == n] if not df.empty else df
+        try:
+            PersistenceModule._garantir_shards()
+            info = ShardedStorage.manifest()['revistas'].get(n)
+            return PersistenceModule._issue_dataframe_versioned(n, info['versao']) if info else pd.DataFrame()
+        except Exception as e:
+            st.error(f"Erro ao carregar dados: {str(e)}")
+            return pd.DataFrame()
+
+    @staticmethod
+    @st.cache_resource(max_entries=16, show_spinner=False)
+    def _issue_dataframe_versioned(n, versao):
+        # Compartilhado como _dataframe_versioned: somente leitura
+        return UtilsModule.preparar_dataframe([dict(r) for r in PersistenceModule._issue_versioned(n, versao)])
+
+    @staticmethod
+    def issue_stats():
+        """{revista: {'registros', 'icones'}} na ordem do catálogo; no modo shards vem do manifesto."""
+        if STORAGE_ENGINE == 'shards':
+            try:
+                PersistenceModule._garantir_shards()
+                manifesto = ShardedStorage.manifest()
+                return {n: {'registros': manifesto['revistas'][n]['registros'],
+                            'icones': manifesto['revistas'][n]['icones']}
+                        for n in ShardedStorage.issues(manifesto)}
+            except Exception as e:
+                st.error(f"Erro ao carregar dados: {str(e)}")
+                return {}
+        df = PersistenceModule.load_dataframe()
+        if df.empty:
+            return {}
+        grupos = df.groupby(df['n'].astype(str), sort=False)['__qtd_icones'].agg(['size', 'sum'])
+        ordem = sorted(grupos.index, key=lambda n: (ORDEM_SIBILA.index(n) if n in ORDEM_SIBILA else 999, n))
+        return {n: {'registros': int(grupos.at[n, 'size']), 'icones': int(grupos.at[n, 'sum'])} for n in ordem}
+
+    @staticmethod
+    @st.cache_resource(max_entries=64, show_spinner=False)
+    def _issue_versioned(n, versao):
+        # Compartilhado como _load_versioned: somente leitura
+        return ShardedStorage.load_issue(n)
+
+    @staticmethod
+    def load_dataframe():
+        """
+        DataFrame preparado do catálogo (UtilsModule.preparar_dataframe), construído
+        uma vez por versão dos dados e compartilhado entre reruns e sessões.
+        O objeto é compartilhado: quem precisar alterá-lo deve trabalhar numa cópia.
+        """
+        try:
+            return PersistenceModule._dataframe_versioned(PersistenceModule.data_version())
+        except Exception as e:
+            st.error(f"Erro ao carregar dados: {str(e)}")
+            return pd.DataFrame()
+
+    @staticmethod
+    @st.cache_resource(max_entries=2, show_spinner=False)
+    def _dataframe_versioned(versao):
+        df = UtilsModule.preparar_dataframe(PersistenceModule._load_versioned(versao))
+        # Recortes e cópias herdam a versão nos attrs, mas só este objeto é registrado
+        # como o DataFrame da versão (ver versao_canonica)
+        df.attrs['versao_dados'] = versao
+        PersistenceModule._dataframes_canonicos()[versao] = df
+        return df
+
+    @staticmethod
+    @st.cache_resource
+    def _dataframes_canonicos():
+        """versão dos dados -> DataFrame de _dataframe_versioned (enquanto ele existir)."""
+        return weakref.WeakValueDictionary()
+
+    @staticmethod
+    def versao_canonica(df):
+        """
+        Versão dos dados de que `df` é o próprio DataFrame compartilhado (o objeto
+        devolvido por load_dataframe), ou None. Recortes e cópias, mesmo do mesmo
+        tamanho e com a versão nos attrs, não contam: podem ter sido alterados.
+        """
+        versao = df.attrs.get('versao_dados')
+        if versao is None or PersistenceModule._dataframes_canonicos().get(versao) is not df:
+            return None
+        return versao
+
+    @staticmethod
+    @st.cache_resource
+    def result_cache():
+        """Nível compartilhado (todas as sessões do processo) do cache de resultados de busca."""
+        return CacheResultados(CACHE_RESULTADOS_COMPARTILHADO)
+
+    @staticmethod
+    def session_result_cache():
+        if '_cache_resultados' not in st.session_state:
+            st.session_state['_cache_resultados'] = CacheResultados(CACHE_RESULTADOS_SESSAO)
+        return st.session_state['_cache_resultados']
+
+    @staticmethod
+    def cached_results(estado, calcular, versao=None):
+        """
+        Resultado de `calcular()` para o estado normalizado dos filtros `estado`
+        (tupla hashable) na versão `versao` dos dados (padrão: a atual) — a do
+        DataFrame sobre o qual `calcular` trabalha: procura na sessão, depois no
+        nível compartilhado, e só calcula numa falta dos dois.
+        """
+        chave = (versao or PersistenceModule.data_version(), estado)
+        sessao = PersistenceModule.session_result_cache()
+        valor = sessao.obter(chave)
+        if valor is None:
+            compartilhado = PersistenceModule.result_cache()
+            valor = compartilhado.obter(chave)
+            if valor is None:
+                valor = calcular()
+                compartilhado.guardar(chave, valor)
+            sessao.guardar(chave, valor)
+        return valor
+
+    @staticmethod
+    def query(texto, plano=None, versao=None):
+        """
+        Bitset (de facets(versao)) dos registros que satisfazem a consulta estruturada
+        `texto` (ver ConsultaCatalogo). Erros de sintaxe sobem como ErroConsulta.
+        """
+        versao = versao or PersistenceModule.data_version()
+        return ConsultaCatalogo.executar(
+            ConsultaCatalogo.analisar(" ".join(texto.split())),
+            PersistenceModule._facetas_versioned(versao), PersistenceModule._indice_versioned(versao), plano
+        )
+
+    @staticmethod
+    def fuzzy_index(tipo):
+        """
+        IndiceAproximado da versão atual: 'nomes' (autores, citados, tradutores e
+        nomes como assunto, no formato ABNT) ou 'titulos'; a carga de cada chave
+        é a lista de _ids em que ela aparece. Somente leitura.
+        """
+        return PersistenceModule._aproximado_versioned(PersistenceModule.data_version(), tipo)
+
+    @staticmethod
+    def fuzzy_search(consulta, k=20, ids=None):
+        """
+        _ids dos registros com título ou nome próximo de `consulta`, dos mais
+        próximos aos menos. Com `ids`, só entre esses registros (ex.: os de uma
+        revista): o corte em k vem depois do filtro.
+        """
+        try:
+            permitidos = None if ids is None else {str(i) for i in ids}
+            aceitar = None if permitidos is None else (lambda carga: not permitidos.isdisjoint(carga))
+            achados = []
+            for tipo in ('titulos', 'nomes'):
+                achados += PersistenceModule.fuzzy_index(tipo).buscar(consulta, k, aceitar=aceitar)
+            ordem = {}
+            for _, ids_chave, d, sim in sorted(achados, key=lambda a: (a[2], -a[3])):
+                for reg_id in ids_chave:
+                    if permitidos is None or reg_id in permitidos:
+                        ordem.setdefault(reg_id, None)
+            return list(ordem)[:k]
+        except Exception as e:
+            st.error(f"Erro na busca: {str(e)}")
+            return []
+
+    @staticmethod
+    @st.cache_resource(max_entries=4, show_spinner=False)
+    def _aproximado_versioned(versao, tipo):
+        if tipo == 'titulos':
+            df = PersistenceModule._dataframe_versioned(versao)
+            if df.empty:
+                return IndiceAproximado([])
+            longa = pd.DataFrame({
+                '_id': df['_id'].astype(str),
+                'valor': df['titulo_artigo'].fillna('').astype(str).str.strip(),
+            })
+            longa = longa[longa['valor'] != '']
+        else:
+            tabelas = PersistenceModule._tabelas_versioned(versao)
+            longa = pd.concat([tabelas[t] for t in ('autores', 'citados', 'tradutores', 'assunto')])
+        grupos = longa.groupby('valor', sort=False)['_id'].agg(lambda ids: list(dict.fromkeys(ids)))
+        return IndiceAproximado(grupos.index, grupos.tolist())
+
+    @staticmethod
+    def facets(versao=None):
+        """
+        MotorFacetas da versão `versao` (padrão: a atual), alinhado às linhas do
+        DataFrame dela; somente leitura. Quem já tem o DataFrame passa
+        df.attrs['versao_dados'], para que uma gravação entre a leitura de um e
+        de outro não desalinhe os dois.
+        """
+        return PersistenceModule._facetas_versioned(versao or PersistenceModule.data_version())
+
+    @staticmethod
+    @st.cache_resource(max_entries=2, show_spinner=False)
+    def _facetas_versioned(versao):
+        return MotorFacetas(PersistenceModule._dataframe_versioned(versao))
+
+    @staticmethod
+    @st.cache_resource(max_entries=2, show_spinner=False)
+    def _agregados_versioned(versao):
+        return AgregadosCatalogo(
+            PersistenceModule._dataframe_versioned(versao), PersistenceModule._totais_relatorios(versao)
+        )
+
+    @staticmethod
+    def _totais_relatorios(versao):
+        """Totais materializados de `versao`, ressincronizados (e regravados) se estiverem defasados."""
+        dados = RelatoriosMaterializados._ler()
+        if dados.get('versao_dados') != BuscasSalvas.versao(versao):
+            registros = PersistenceModule._load_versioned(versao)
+            RelatoriosMaterializados.sincronizar(dados, registros)
+            dados['versao_dados'] = BuscasSalvas.versao(versao)
+            try:
+                with bloqueio_derivados():
+                    if PersistenceModule.data_version() == versao:
+                        RelatoriosMaterializados._gravar(dados)
+            except Exception as e:
+                print(f"Erro ao gravar totais dos relatórios: {e}")
+        return dados['revistas']
+
+    @staticmethod
+    def term_report(termos):
+        """
+        {termo normalizado: {_id: [campos]}} das ocorrências de cada termo
+        (RelatorioTermos) no catálogo atual.
+        """
+        try:
+            return PersistenceModule._termos_versioned(PersistenceModule.data_version()).buscar(termos)
+        except Exception as e:
+            st.error(f"Erro no relatório de termos: {str(e)}")
+            return {}
+
+    @staticmethod
+    @st.cache_resource(max_entries=2, show_spinner=False)
+    def _termos_versioned(versao):
+        return RelatorioTermos(PersistenceModule._indice_versioned(versao), PersistenceModule._load_versioned(versao))
+
+    @staticmethod
+    def relation_table(nome, versao=None):
+        """
+        Tabela de CacheColunar ('registros' ou uma das RELACOES) da versão atual
+        dos dados. Compartilhada entre sessões: não alterar no lugar.
+        """
+        return PersistenceModule._tabelas_versioned(
+            PersistenceModule.data_version() if versao is None else versao
+        )[nome]
+
+    @staticmethod
+    @st.cache_resource(max_entries=2, show_spinner=False)
+    def _tabelas_versioned(versao):
+        tabelas = CacheColunar.carregar(versao)
+        if tabelas is None:
+            df = PersistenceModule._dataframe_versioned(versao)
+            tabelas = CacheColunar.construir(df)
+            if not df.empty:
+                CacheColunar.gravar(versao, tabelas)
+        return tabelas
+
+    @staticmethod
+    @st.cache_resource
+    def _falhas_leitura():
+        """Último erro de leitura do catálogo/diário (None quando a leitura mais recente deu certo)."""
+        return {'catalogo': None, 'diario': None}
+
+    @staticmethod
+    @st.cache_resource
+    def cache_stats():
+        """Contadores do cache de load_data, compartilhados por todas as sessões do processo."""
+        return {'lock': threading.Lock(), 'chamadas': 0, 'misses': 0}
+
+    @staticmethod
+    @st.cache_resource(max_entries=2, show_spinner=False)
+    def _load_versioned(versao):
+        # Só executa em cache miss; exceções sobem para load_data e não ficam em cache.
+        # Objeto compartilhado (cache_resource): ninguém altera a lista nem os registros no lugar
+        metricas = PersistenceModule.cache_stats()
+        with metricas['lock']:
+            metricas['misses'] += 1
+        if STORAGE_ENGINE == 'sqlite':
+            return PersistenceModule._load_sqlite()
+        if STORAGE_ENGINE == 'shards':
+            return PersistenceModule._load_shards()
+        if not os.path.exists(FILE_PATH) and not os.path.exists(JOURNAL_PATH):
+            return []
+        memoria = PersistenceModule._catalogo_memoria()
+        with memoria['lock']:
+            if memoria['versao'] == versao:
+                # Versão gravada por este processo: o índice mantido já a tem, sem reler os arquivos
+                return memoria['indice'].lista()
+        return PersistenceModule._load_snapshot_and_journal()
+
+    @staticmethod
+    def save_data(data):
+        """Regrava o catálogo inteiro (importação em lote, restauração) e zera o journal."""
+        try:
+            if PersistenceModule._falhas_leitura().get('catalogo'):
+                # A lista em memória pode ser o [] devolvido pela falha: gravá-la apagaria o catálogo
+                raise RuntimeError(
+                    "a última leitura do catálogo falhou; gravação em lote recusada "
+                    f"({PersistenceModule._falhas_leitura()['catalogo']})"
+                )
+            data = PersistenceModule._ensure_ids(data)
+            with bloqueio_escrita():
+                versao_antes = PersistenceModule.data_version()
+                PersistenceModule._registrar_versao_inicial()
+                if PersistenceModule._motor():
+                    PersistenceModule._motor().replace_all(data)
+                else:
+                    PersistenceModule._write_snapshot(data)
+                PersistenceModule._registrar_versao(registros=data)
+                versao_depois = PersistenceModule.data_version()
+                PersistenceModule._ajustar_catalogo_memoria(versao_antes, None, registros=data)
+            PersistenceModule._atualizar_materializados(versao_antes, versao_depois, registros=data)
+            return True
+        except Exception as e:
+            st.error(f"Erro ao salvar dados: {str(e)}")
+            return False
+
+    @staticmethod
+    def import_records(novos):
+        """
+        Importa registros (chave `_id`) sobre o catálogo atual, lido sob a trava:
+        os existentes são substituídos e os demais anexados, sem descartar o que
+        outra sessão gravou depois que esta carregou os dados.
+        """
+        try:
+            with bloqueio_escrita():
+                atuais = PersistenceModule._load_versioned(PersistenceModule.data_version())
+                ops = [{"op": "upsert", "registro": r} for r in PersistenceModule._ensure_ids(list(novos))]
+                return PersistenceModule.save_data(PersistenceModule._apply_ops(list(atuais), ops))
+        except Exception as e:
+            st.error(f"Erro ao importar dados: {str(e)}")
+            return False
+
+    @staticmethod
+    def save_record(registro, base=None):
+        """
+        Insere ou atualiza um único registro (chave `_id`).
+
+        Controle otimista por `_versao`: a versão de `base` (o registro como estava
+        quando a edição começou; na falta dele, o próprio `registro`) tem de ser a
+        gravada. Se outra sessão gravou antes, as alterações desta são mescladas
+        campo a campo sobre a versão atual; campos alterados nas duas sessões são
+        recusados com ConflitoEdicao. A trava cobre só a leitura do registro atual
+        e a gravação de uma linha, mais o histórico e o índice de registros em
+        memória; buscas salvas e totais dos relatórios são ajustados depois, e a
+        compactação do journal, quando devida, também corre fora dela.
+        """
+        try:
+            if not registro.get('_id'):
+                raise ValueError("registro sem _id")
+            compactar = False
+            # Se o índice de registros em memória estiver defasado, é reconstruído antes da trava
+            PersistenceModule._aquecer_indice_registros()
+            with bloqueio_escrita():
+                versao_antes = PersistenceModule.data_version()
+                PersistenceModule._registrar_versao_inicial()
+                atual = PersistenceModule._registro_atual(registro['_id'])
+                registro = PersistenceModule._resolver_versao(registro, base, atual)
+                if PersistenceModule._motor():
+                    PersistenceModule._motor().upsert(registro)
+                else:
+                    compactar = PersistenceModule._append_journal({"op": "upsert", "registro": registro})
+                PersistenceModule._registrar_versao(upserts=[registro])
+                versao_depois = PersistenceModule.data_version()
+                if not PersistenceModule._motor():
+                    PersistenceModule._ajustar_catalogo_memoria(versao_antes, versao_depois, upserts=[registro])
+            PersistenceModule._atualizar_materializados(versao_antes, versao_depois, upserts=[registro])
+            if compactar:
+                PersistenceModule.compact()
+            return True
+        except ConflitoEdicao as e:
+            st.error(f"⚠️ {str(e)} Recarregue o registro e refaça a alteração.")
+            return False
+        except Exception as e:
+            st.error(f"Erro ao salvar dados: {str(e)}")
+            return False
+
+    @staticmethod
+    def delete_record(reg_id):
+        """Exclui o(s) registro(s) com o `_id` informado anexando a operação ao journal."""
+        try:
+            compactar = False
+            PersistenceModule._aquecer_indice_registros()
+            with bloqueio_escrita():
+                versao_antes = PersistenceModule.data_version()
+                PersistenceModule._registrar_versao_inicial()
+                if PersistenceModule._motor():
+                    PersistenceModule._motor().delete(reg_id)
+                else:
+                    compactar = PersistenceModule._append_journal({"op": "delete", "_id": reg_id})
+                PersistenceModule._registrar_versao(deletes=[reg_id])
+                versao_depois = PersistenceModule.data_version()
+                if not PersistenceModule._motor():
+                    PersistenceModule._ajustar_catalogo_memoria(versao_antes, versao_depois, deletes=[reg_id])
+            PersistenceModule._atualizar_materializados(versao_antes, versao_depois, deletes=[reg_id])
+            if compactar:
+                PersistenceModule.compact()
+            return True
+        except Exception as e:
+            st.error(f"Erro ao salvar dados: {str(e)}")
+            return False
+
+    # --- Internos: versões por registro ---
+
+    @staticmethod
+    def _aquecer_indice_registros():
+        """Reconstrói (fora da trava de escrita) o índice de registros em memória, se estiver defasado."""
+        if not PersistenceModule._motor():
+            PersistenceModule._consultar_indice(lambda indice: None)
+
+    @staticmethod
+    def _registro_atual(reg_id):
+        """Registro como está gravado agora (lido sob a trava, sem depender do cache da sessão)."""
+        return PersistenceModule.get_record(reg_id)
+
+    @staticmethod
+    def _resolver_versao(registro, base, atual):
+        esperado = (base if base is not None else registro).get('_versao', 0)
+        if atual is None:
+            if base is not None and base.get('_versao', 0) > 0:
+                raise ConflitoEdicao(registro['_id'], motivo="o registro foi excluído")
+            return dict(registro, _versao=esperado + 1)
+        versao_atual = atual.get('_versao', 0)
+        if versao_atual == esperado:
+            return dict(registro, _versao=versao_atual + 1)
+        if base is None:
+            raise ConflitoEdicao(registro['_id'])
+        mesclado, conflitos = PersistenceModule._mesclar(base, registro, atual)
+        if conflitos:
+            raise ConflitoEdicao(registro['_id'], conflitos)
+        mesclado['_versao'] = versao_atual + 1
+        return mesclado
+
+    @staticmethod
+    def _mesclar(base, nosso, atual):
+        """
+        Mescla de três vias por campo: o que só esta sessão alterou (nosso x base)
+        é aplicado sobre a versão atual; campo alterado dos dois lados com valores
+        diferentes é conflito. Notas de pesquisa são mescladas pelo `id` de cada nota.
+        """
+        ausente = object()
+        mesclado = dict(atual)
+        conflitos = []
+        for campo in set(base) | set(nosso) | set(atual):
+            if campo in ('_versao', '_timestamp', '_id'):
+                continue
+            b, n, a = base.get(campo, ausente), nosso.get(campo, ausente), atual.get(campo, ausente)
+            if n == b or n == a:
+                continue
+            if a == b:
+                if n is ausente:
+                    mesclado.pop(campo, None)
+                else:
+                    mesclado[campo] = n
+            elif campo == 'notas_pesquisa' and all(isinstance(x, list) for x in (b, n, a)):
+                ids_base = {x.get('id') for x in b if isinstance(x, dict)}
+                ids_nossos = {x.get('id') for x in n if isinstance(x, dict)}
+                removidas = ids_base - ids_nossos
+                novas = [x for x in n if isinstance(x, dict) and x.get('id') not in ids_base]
+                ids_atuais = {x.get('id') for x in a if isinstance(x, dict)}
+                mesclado[campo] = [x for x in a if not (isinstance(x, dict) and x.get('id') in removidas)]
+                mesclado[campo] += [x for x in novas if x.get('id') not in ids_atuais]
+            else:
+                conflitos.append(campo)
+        if nosso.get('_timestamp'):
+            mesclado['_timestamp'] = nosso['_timestamp']
+        return mesclado, sorted(conflitos)
+
+    @staticmethod
+    def list_versions():
+        """Versões do histórico (BackupStore), da mais recente para a mais antiga."""
+        return BackupStore.listar()
+
+    @staticmethod
+    def load_version(versao):
+        """Catálogo como estava na versão informada (sem alterar os dados atuais)."""
+        return BackupStore.reconstruir(versao)
+
+    @staticmethod
+    def restore_version(versao):
+        """Restaura o catálogo para uma versão do histórico; a restauração vira uma nova versão."""
+        try:
+            registros = BackupStore.reconstruir(versao)
+        except Exception as e:
+            st.error(f"Erro ao restaurar versão: {str(e)}")
+            return False
+        return PersistenceModule.save_data(registros)
+
+    @staticmethod
+    def _registrar_versao_inicial():
+        # Histórico ainda vazio: antes da primeira gravação (e sob a trava), o catálogo como
+        # está no disco vira a versão inicial, em cópia completa; a gravação entra como delta
+        try:
+            if BackupStore._carregar_estado() is None:
+                registros = PersistenceModule.load_data()
+                if registros:
+                    BackupStore.registrar(registros=list(registros))
+        except Exception as e:
+            print(f"Erro ao registrar a versão inicial no histórico: {e}")
+
+    @staticmethod
+    def _registrar_versao(**alteracao):
+        # O histórico nunca impede a gravação principal, que já foi concluída
+        try:
+            BackupStore.registrar(**alteracao)
+        except Exception as e:
+            print(f"Erro ao registrar versão no histórico: {e}")
+
+    @staticmethod
+    def _atualizar_materializados(versao_antes, versao_depois, **alteracao):
+        # Buscas salvas e totais dos relatórios, já fora da trava do catálogo: cada arquivo só é
+        # levado de `versao_antes` a `versao_depois`. Se outra gravação passou na frente (ou
+        # se algo falhar), a versão gravada não confere e a próxima leitura recalcula
+        with bloqueio_derivados():
+            try:
+                BuscasSalvas.aplicar(versao_antes, versao_depois, **alteracao)
+            except Exception as e:
+                print(f"Erro ao atualizar buscas salvas: {e}")
+            try:
+                RelatoriosMaterializados.aplicar(versao_antes, versao_depois, **alteracao)
+            except Exception as e:
+                print(f"Erro ao atualizar totais dos relatórios: {e}")
+
+    @staticmethod
+    def saved_searches():
+        """
+        {nome: {consulta, criada_em, ids}} das buscas salvas, com os resultados
+        da versão atual dos dados (recalculados só se estiverem defasados).
+        """
+        try:
+            dados = BuscasSalvas._ler()
+            versao = PersistenceModule.data_version()
+            if dados['buscas'] and dados.get('versao_dados') != BuscasSalvas.versao(versao):
+                with bloqueio_derivados():
+                    dados = BuscasSalvas._ler()
+                    versao = PersistenceModule.data_version()
+                    facetas = PersistenceModule.facets(versao)
+                    for busca in dados['buscas'].values():
+                        busca['ids'] = facetas.ids_de(PersistenceModule.query(busca['consulta'], versao=versao))
+                    dados['versao_dados'] = BuscasSalvas.versao(versao)
+                    # Se uma gravação do catálogo passou no meio, os resultados valem para a
+                    # versão anterior: ficam só nesta resposta
+                    if PersistenceModule.data_version() == versao:
+                        BuscasSalvas._gravar(dados)
+            return dados['buscas']
+        except Exception as e:
+            st.error(f"Erro ao carregar buscas salvas: {str(e)}")
+            return {}
+
+    @staticmethod
+    def save_search(nome, consulta):
+        """Salva (ou substitui) a busca `nome`; a consulta é validada antes."""
+        try:
+            ConsultaCatalogo.analisar(consulta)
+            with bloqueio_derivados():
+                dados = BuscasSalvas._ler()
+                versao = PersistenceModule.data_version()
+                if dados['buscas'] and dados.get('versao_dados') != BuscasSalvas.versao(versao):
+                    # As demais estão defasadas: a próxima leitura recalcula todas
+                    dados['versao_dados'] = None
+                elif not dados['buscas']:
+                    dados['versao_dados'] = BuscasSalvas.versao(versao)
+                dados['buscas'][nome] = {
+                    'consulta': consulta,
+                    'criada_em': datetime.now().isoformat(),
+                    'ids': PersistenceModule.facets(versao).ids_de(PersistenceModule.query(consulta, versao=versao)),
+                }
+                BuscasSalvas._gravar(dados)
+            return True
+        except ErroConsulta as e:
+            st.error(f"⚠️ {str(e)}")
+            return False
+        except Exception as e:
+            st.error(f"Erro ao salvar busca: {str(e)}")
+            return False
+
+    @staticmethod
+    def delete_search(nome):
+        try:
+            with bloqueio_derivados():
+                dados = BuscasSalvas._ler()
+                if dados['buscas'].pop(nome, None) is not None:
+                    BuscasSalvas._gravar(dados)
+            return True
+        except Exception as e:
+            st.error(f"Erro ao excluir busca: {str(e)}")
+            return False
+
+    @staticmethod
+    def search_index():
+        """IndiceTextual da versão atual dos dados (compartilhado entre sessões: somente leitura)."""
+        return PersistenceModule._indice_versioned(PersistenceModule.data_version())
+
+    @staticmethod
+    def search_ids(termo):
+        """_ids dos registros que contêm todos os termos de `termo` (sem acentos/caixa, por prefixo)."""
+        try:
+            return PersistenceModule.search_index().buscar(termo)
+        except Exception as e:
+            st.error(f"Erro na busca: {str(e)}")
+            return set()
+
+    @staticmethod
+    def search(termo, k=10, pesos=None, restringir_a=None):
+        """
+        Os k registros mais relevantes para `termo` (BM25, pesos de
+        IndiceTextual.PESOS_CAMPOS), como dicts com _id, pontuacao, n,
+        registro, titulo e trecho (resumo com os termos em **negrito**).
+        """
+        try:
+            indice = PersistenceModule.search_index()
+            resultados = []
+            for reg_id, pontos in indice.ranquear(termo, k, pesos, restringir_a):
+                info = indice.textos.get(reg_id, {})
+                resultados.append({
+                    '_id': reg_id, 'pontuacao': pontos,
+                    'n': info.get('n', ''), 'registro': info.get('registro', ''), 'titulo': info.get('titulo', ''),
+                    'trecho': indice.trecho(reg_id, termo),
+                })
+            return resultados
+        except Exception as e:
+            st.error(f"Erro na busca: {str(e)}")
+            return []
 
-    TIPOS_TEXTUAIS = {
-        "APRESENTAÇÃO": ["Sem especificação", "Literatura"],
-        "ARTES PLÁSTICAS": ["Sem especificação"],
-        "CAPA": ["Sem especificação"],
-        "CARTAS DO LEITOR": ["Sem especificação"],
-        "CHARGE": ["Sem especificação"],
-        "CORRESPONDÊNCIA(S)": ["Sem especificação"],
-        "DEBATE": ["Sem especificação"],
-        "DEPOIMENTO": ["Sem especificação", "Literatura"],
-        "EDITORIAL": ["Sem especificação", "Literatura"],
-        "ENSAIO": [
-            "Sem especificação", "Antropologia", "Arquitetura", "Bibliologia", "Ciência",
-            "Comunicação", "Cultura", "Economia", "Educação", "Esporte", "Filosofia",
-            "Fotográfico", "História", "Linguística", "Literatura", "Política",
-            "Psicanálise", "Psicologia", "Sociologia", "Teologia"
-        ],
-        "ENTREVISTA": ["Sem especificação", "Literatura"],
-        "FICÇÃO": ["Sem especificação"],
-        "HQ": ["Sem especificação"],
-        "HQ/CHARGE": ["Sem especificação"],
-        "INFORME": ["Sem especificação", "Literatura"],
-        "POEMA(S)": ["Sem especificação"],
-        "REPORTAGEM": ["Sem especificação", "Literatura"],
-        "RESENHA": [
-            "Sem especificação", "Antropologia", "Arquitetura", "Bibliologia", "Ciência",
-            "Comunicação", "Cultura", "Economia", "Educação", "Filosofia", "História",
-            "Linguística", "Literatura", "Política", "Psicanálise", "Psicologia", "Sociologia"
-        ],
-        "VARIEDADES": ["Sem especificação"]
-    }
+    @staticmethod
+    def search_scores(termo, pesos=None, restringir_a=None):
+        """{_id: pontuação} de todos os acertos de `termo` (para ordenar uma tabela de resultados)."""
+        try:
+            return PersistenceModule.search_index().pontuar(termo, pesos, restringir_a)
+        except Exception as e:
+            st.error(f"Erro na busca: {str(e)}")
+            return {}
 
     @staticmethod
-    def normalizar_texto(val: str | list) -> str | list:
-        """Normaliza texto genérico (palavras-chave etc.) para Title Case."""
-        if isinstance(val, list):
-            return [i.strip().title() for i in val if str(i).strip()]
-        if isinstance(val, str):
-            return val.strip().title()
-        return val
+    @st.cache_resource(max_entries=2, show_spinner=False)
+    def _indice_versioned(versao):
+        # As gravações do catálogo não tocam no texto.json: a versão nova é alcançada aqui,
+        # fora da trava de escrita, reindexando só os registros que mudaram desde o arquivo
+        indice = IndiceTextual.carregar()
+        registros = PersistenceModule._load_versioned(versao)
+        indice.preparar_trechos(registros)
+        mudados = indice.sincronizar(registros)
+        if mudados >= INDICE_TEXTO_DEFASAGEM_MAX or (mudados and not os.path.exists(INDICE_TEXTO_PATH)):
+            # Gravação atômica de um derivado que vale para qualquer versão (cada documento
+            # leva o hash do registro): não precisa da trava do catálogo
+            try:
+                indice.salvar()
+            except Exception as e:
+                print(f"Erro ao gravar índice de busca: {e}")
+        return indice
 
     @staticmethod
-    def format_nome_abnt(nome: str | None) -> str:
+    def get_record(reg_id):
+        """Registro pelo `_id` (consulta indexada no sqlite, um só fragmento no modo shards)."""
+        if PersistenceModule._motor():
+            return PersistenceModule._motor().get(reg_id)
+        return copy.deepcopy(PersistenceModule._consultar_indice(lambda indice: indice.get(reg_id)))
+
+    @staticmethod
+    def find_by_key(n, registro, excluir_id=None):
+        """Registro com a mesma Revista (n) + Registro, opcionalmente ignorando um `_id`."""
+        if PersistenceModule._motor():
+            return PersistenceModule._motor().find_by_key(n, registro, excluir_id)
+        return copy.deepcopy(PersistenceModule._consultar_indice(
+            lambda indice: indice.find_by_key(n, registro, excluir_id)
+        ))
+
+    @staticmethod
+    @st.cache_resource
+    def _catalogo_memoria():
         """
-        Normaliza nomes pessoais segundo ABNT.
-        Ex.: 'Bonvicino, Régis' -> 'BONVICINO, Régis'
+        IndiceRegistros do processo (modo json) e a versão dos dados a que
+        corresponde. As gravações deste processo o ajustam no lugar
+        (_ajustar_catalogo_memoria); só uma versão vinda de fora (outro
+        processo) faz reconstruí-lo.
         """
-        if nome is None:
-            return ""
-        if not isinstance(nome, str):
-            nome = str(nome)
-        s = " ".join(nome.strip().split())
-        if not s:
-            return ""
-        if "," in s:
-            ult, resto = s.split(",", 1)
-            return f"{ult.strip().upper()}, {resto.strip()}" if resto.strip() else ult.strip().upper()
-        partes = s.split()
-        if len(partes) >= 2:
-            sobrenome = partes[-1].upper()
-            prenomes = " ".join(partes[:-1])
-            return f"{sobrenome}, {prenomes}"
-        return s.upper()
+        return {'lock': threading.Lock(), 'versao': None, 'indice': None}
 
     @staticmethod
-    def parse_multiline(texto: str | None) -> list[str]:
-        if texto is None:
-            return []
-        if not isinstance(texto, str):
-            texto = str(texto)
-        # Split only on newlines to preserve commas in ABNT format names
-        linhas = texto.split('\n')
-        return [l.strip() for l in linhas if l.strip()]
+    def _consultar_indice(consulta):
+        """`consulta(indice)` sobre o IndiceRegistros da versão atual, sob a trava da memória."""
+        memoria = PersistenceModule._catalogo_memoria()
+        versao = PersistenceModule.data_version()
+        if memoria['versao'] != versao:
+            # Reconstrução fora da trava da memória (_load_versioned também a consulta)
+            indice = IndiceRegistros(PersistenceModule._load_versioned(versao))
+            with memoria['lock']:
+                if memoria['versao'] != versao:
+                    memoria['indice'], memoria['versao'] = indice, versao
+        with memoria['lock']:
+            return consulta(memoria['indice'])
 
     @staticmethod
-    def normalizar_lista_autores(texto: str | list) -> list[str]:
-        nomes = DataModule.parse_multiline(texto)
-        return [DataModule.format_nome_abnt(n) for n in nomes]
+    def _ajustar_catalogo_memoria(versao_antes, versao_depois, registros=None, upserts=(), deletes=()):
+        """Leva o índice em memória de `versao_antes` a `versao_depois` com a alteração gravada."""
+        memoria = PersistenceModule._catalogo_memoria()
+        with memoria['lock']:
+            if registros is not None or memoria['versao'] != versao_antes:
+                # Gravação em lote, ou índice de outra versão: a próxima consulta reconstrói
+                memoria['versao'] = None
+                return
+            for reg_id in deletes:
+                memoria['indice'].delete(reg_id)
+            for rec in upserts:
+                memoria['indice'].upsert(copy.deepcopy(rec))
+            memoria['versao'] = versao_depois
 
     @staticmethod
-    def get_normalized_series(df: pd.DataFrame, col: str) -> pd.Series:
+    def export_json(path=None):
+        """Grava o catálogo atual no arquivo JSON de intercâmbio (usado nos modos sqlite e shards)."""
+        try:
+            registros = PersistenceModule.load_data()
+            gravar_arquivo_atomico(path or FILE_PATH, JsonCodec.dumps(registros))
+            return True
+        except Exception as e:
+            st.error(f"Erro ao exportar dados: {str(e)}")
+            return False
+
+    @staticmethod
+    def export_json_bytes():
+        """JSON indentado do catálogo para download, gerado uma vez por versão dos dados."""
+        return PersistenceModule._exportacao_versioned(PersistenceModule.data_version())
+
+    @staticmethod
+    @st.cache_data(max_entries=2, show_spinner=False)
+    def _exportacao_versioned(versao):
+        return JsonCodec.dumps(PersistenceModule._load_versioned(versao), pretty=True)
+
+    @staticmethod
+    def compact():
         """
-        Explode coluna, remove vazios. Para campos de autor, aplica formatação ABNT
-        sem rebaixar para Title Case (preserva SOBRENOME em CAIXA ALTA).
+        Dobra o journal no snapshot. O conteúdo não muda, então não gera versão nova:
+        o índice de registros em memória, as buscas salvas e os totais dos relatórios
+        que estavam na versão anterior são só remarcados com a nova.
         """
-        if col not in df.columns:
-            return pd.Series(dtype='object')
-        s = (
-            df.explode(col)[col]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .replace('', pd.NA)
-            .dropna()
-        )
-        if col in {'autores_colaboradores', 'autores_citados', 'tradutores', 'entidade_coletiva', 'nome_pessoal_como_assunto'}:
-            s = s.apply(DataModule.format_nome_abnt)
-        return s
+        with bloqueio_escrita():
+            versao_antes = PersistenceModule.data_version()
+            PersistenceModule._write_snapshot(PersistenceModule._load_versioned(versao_antes))
+            versao_depois = PersistenceModule.data_version()
+            PersistenceModule._ajustar_catalogo_memoria(versao_antes, versao_depois)
+        PersistenceModule._atualizar_materializados(versao_antes, versao_depois)
 
-# ==========================================
-# FUNÇÃO DE ROTAÇÃO DE BACKUPS
-# ==========================================
+    # --- Internos: SQLite ---
 
-def limpar_backups_antigos(diretorio, manter=3):
-    """
-    Remove backups antigos, mantendo apenas os N mais recentes.
+    @staticmethod
+    def _load_sqlite():
+        if SQLiteStorage.is_empty() and (os.path.exists(FILE_PATH) or os.path.exists(JOURNAL_PATH)):
+            # Primeira abertura: importa o catálogo JSON (snapshot + journal) para o banco
+            SQLiteStorage.replace_all(PersistenceModule._load_snapshot_and_journal())
+        return SQLiteStorage.load_all()
 
-    Args:
-        diretorio: Caminho do diretório de backups
-        manter: Número de backups mais recentes a manter (padrão: 3)
-    """
-    try:
-        if not os.path.exists(diretorio):
-            return
+    # --- Internos: fragmentos por revista ---
+
+    @staticmethod
+    def _garantir_shards():
+        """Na primeira abertura do modo shards, importa o catálogo JSON (snapshot + journal) para os fragmentos."""
+        if ShardedStorage.is_empty() and (os.path.exists(FILE_PATH) or os.path.exists(JOURNAL_PATH)):
+            with bloqueio_escrita():
+                if ShardedStorage.is_empty():
+                    ShardedStorage.replace_all(PersistenceModule._load_snapshot_and_journal())
+
+    @staticmethod
+    def _load_shards():
+        """Catálogo completo a partir dos fragmentos; só os que mudaram de versão são relidos."""
+        PersistenceModule._garantir_shards()
+        manifesto = ShardedStorage.manifest()
+        return [
+            r for n in ShardedStorage.issues(manifesto)
+            for r in PersistenceModule._issue_versioned(n, manifesto['revistas'][n]['versao'])
+        ]
+
+    @staticmethod
+    def _ensure_ids(registros):
+        """
+        Registros legados sem `_id` recebem um identificador derivado do
+        conteúdo, estável entre leituras até a próxima compactação gravá-lo.
+        """
+        vistos = {}
+        for r in registros:
+            if r.get('_id'):
+                continue
+            base = "leg" + hashlib.sha1(
+                json.dumps(r, ensure_ascii=False, sort_keys=True).encode('utf-8')
+            ).hexdigest()[:12]
+            vistos[base] = vistos.get(base, 0) + 1
+            r['_id'] = base if vistos[base] == 1 else f"{base}-{vistos[base]}"
+        return registros
 
-        # Listar todos os arquivos de backup
-        backups = []
-        for arquivo in os.listdir(diretorio):
-            caminho_completo = os.path.join(diretorio, arquivo)
-            if os.path.isfile(caminho_completo):
-                # Obter tempo de criação do arquivo
-                tempo_criacao = os.path.getctime(caminho_completo)
-                backups.append((tempo_criacao, caminho_completo, arquivo))
-
-        # Ordenar por data de criação (mais recente primeiro)
-        backups.sort(reverse=True, key=lambda x: x[0])
-
-        # Se houver mais de N backups, apagar os antigos
-        if len(backups) > manter:
-            for _, caminho, nome in backups[manter:]:
+    @staticmethod
+    def _read_journal():
+        """Lê as operações do journal; uma última linha truncada (queda no meio da escrita) é ignorada."""
+        ops = []
+        if not os.path.exists(JOURNAL_PATH):
+            return ops
+        with open(JOURNAL_PATH, 'r', encoding='utf-8') as f:
+            for num, linha in enumerate(f, 1):
+                linha = linha.strip()
+                if not linha:
+                    continue
                 try:
-                    os.remove(caminho)
-                except Exception as e:
-                    print(f"Erro ao remover backup {nome}: {e}")
+                    ops.append(JsonCodec.loads(linha))
+                except ValueError:
+                    print(f"Journal: linha {num} ilegível ignorada")
+        return ops
 
-    except Exception as e:
-        print(f"Erro na limpeza de backups: {e}")
+    @staticmethod
+    def _apply_ops(registros, ops):
+        """Reaplica as operações do journal sobre a lista de registros, preservando a ordem."""
+        if not ops:
+            return registros
+        indice = IndiceRegistros(registros)
+        for op in ops:
+            if op.get('op') == 'upsert':
+                indice.upsert(op.get('registro') or {})
+            elif op.get('op') == 'delete':
+                indice.delete(op.get('_id'))
+        return indice.lista()
 
-class PersistenceModule:
-    """Encapsula funções de carregamento e salvamento de dados."""
     @staticmethod
-    @st.cache_data(ttl=60)
-    def load_data():
-        if not os.path.exists(FILE_PATH):
-            return []
+    def _load_snapshot_and_journal():
+        registros = []
+        assinatura = None
+        if os.path.exists(FILE_PATH):
+            with open(FILE_PATH, 'rb') as f:
+                bruto = f.read()
+            assinatura = hashlib.sha1(bruto).hexdigest()
+            registros = JsonCodec.loads(bruto)
+        PersistenceModule._ensure_ids(registros)
+        ops = PersistenceModule._read_journal()
+        # O cabeçalho do journal diz sobre qual snapshot ele foi escrito; se não confere,
+        # o snapshot foi regravado depois (queda antes de remover o journal) e as operações
+        # já estão nele ou foram substituídas
+        if ops and ops[0].get('op') == 'base' and ops[0].get('snapshot') != assinatura:
+            print("Journal de um snapshot anterior ignorado")
+            ops = []
+        return PersistenceModule._apply_ops(registros, ops)
+
+    @staticmethod
+    def _assinatura_snapshot():
         try:
-            with open(FILE_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            st.error(f"Erro ao carregar dados: {str(e)}")
-            return []
+            info = os.stat(FILE_PATH)
+        except FileNotFoundError:
+            return None
+        return PersistenceModule._sha1_arquivo(FILE_PATH, (info.st_mtime_ns, info.st_size, info.st_ino))
 
     @staticmethod
-    def save_data(data):
+    @functools.lru_cache(maxsize=4)
+    def _sha1_arquivo(caminho, _estado_arquivo):
+        """sha1 do conteúdo; `_estado_arquivo` (mtime, tamanho, inode) só entra na chave do cache."""
+        with open(caminho, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    @staticmethod
+    def _descartar_journal_orfao():
+        """
+        Um journal cujo cabeçalho não confere com o snapshot sobrou de uma queda entre
+        _write_snapshot regravar o snapshot e apagá-lo: a leitura já o ignora, e operações
+        anexadas a ele se perderiam. É posto de lado (JOURNAL_PATH + '.orfao') para que a
+        gravação comece um journal novo.
+        """
+        if not os.path.exists(JOURNAL_PATH) or os.path.getsize(JOURNAL_PATH) == 0:
+            return
+        with open(JOURNAL_PATH, 'rb') as f:
+            primeira = f.readline()
         try:
-            if os.path.exists(FILE_PATH):
-                if not os.path.exists(BACKUP_DIR):
-                    os.makedirs(BACKUP_DIR)
-                bkp = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                with open(FILE_PATH, 'r', encoding='utf-8') as f:
-                    with open(os.path.join(BACKUP_DIR, bkp), 'w', encoding='utf-8') as b:
-                        json.dump(json.load(f), b, ensure_ascii=False, indent=2)
-                # Limpar backups antigos, mantendo apenas os 3 mais recentes
-                limpar_backups_antigos(BACKUP_DIR, manter=3)
-            with open(FILE_PATH, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            PersistenceModule.load_data.clear()
-            return True
-        except Exception as e:
-            st.error(f"Erro ao salvar dados: {str(e)}")
-            return False
+            cabecalho = JsonCodec.loads(primeira)
+        except ValueError:
+            return
+        if not isinstance(cabecalho, dict) or cabecalho.get('op') != 'base':
+            # Journal antigo, sem cabeçalho: vale sobre qualquer snapshot
+            return
+        if cabecalho.get('snapshot') != PersistenceModule._assinatura_snapshot():
+            print("Journal de um snapshot anterior posto de lado")
+            os.replace(JOURNAL_PATH, JOURNAL_PATH + '.orfao')
+            sincronizar_diretorio(os.path.dirname(os.path.abspath(JOURNAL_PATH)))
+
+    @staticmethod
+    def _append_journal(op):
+        """Anexa `op` ao journal; devolve True se ele passou do limite e deve ser compactado (compact())."""
+        op = dict(op, ts=datetime.now().isoformat())
+        linha = JsonCodec.dumps(op).decode('utf-8') + "\n"
+        PersistenceModule._descartar_journal_orfao()
+        # Se a última escrita foi interrompida, começa numa linha nova para não corromper esta operação
+        if os.path.exists(JOURNAL_PATH) and os.path.getsize(JOURNAL_PATH) > 0:
+            with open(JOURNAL_PATH, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    linha = "\n" + linha
+        else:
+            # Journal novo: a primeira linha registra o snapshot sobre o qual ele vale
+            cabecalho = {"op": "base", "snapshot": PersistenceModule._assinatura_snapshot()}
+            linha = json.dumps(cabecalho) + "\n" + linha
+        anexar_arquivo(JOURNAL_PATH, linha)
+        # Compactação periódica: só quando o journal cresce além do limite. Quem chamou a
+        # faz depois de soltar a trava, para não segurar as demais gravações
+        tam_journal = os.path.getsize(JOURNAL_PATH)
+        tam_snapshot = os.path.getsize(FILE_PATH) if os.path.exists(FILE_PATH) else 0
+        return tam_journal > max(JOURNAL_MIN_COMPACT_BYTES, tam_snapshot // 2)
+
+    @staticmethod
+    def _write_snapshot(data):
+        # O histórico de versões fica no BackupStore: não há mais cópia integral do arquivo anterior
+        # Compacto: o snapshot é lido por máquina; a versão indentada sai na aba EXPORTAR
+        gravar_arquivo_atomico(FILE_PATH, JsonCodec.dumps(data))
+        # As operações do journal já estão no snapshot: ele pode ser descartado. Se houver
+        # uma queda entre as duas etapas, o cabeçalho do journal não confere mais com o
+        # snapshot: ele é ignorado na leitura (ver _load_snapshot_and_journal) e posto de
+        # lado na gravação seguinte (_descartar_journal_orfao)
+        if os.path.exists(JOURNAL_PATH):
+            os.remove(JOURNAL_PATH)
+            sincronizar_diretorio(os.path.dirname(JOURNAL_PATH))
 
     @staticmethod
     def load_diario():
         if not os.path.exists(DIARIO_PATH):
             return []
         try:
-            with open(DIARIO_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(DIARIO_PATH, 'rb') as f:
+                entradas = JsonCodec.loads(f.read())
+            PersistenceModule._falhas_leitura()['diario'] = None
+            return entradas
         except Exception as e:
+            PersistenceModule._falhas_leitura()['diario'] = str(e)
             st.error(f"Erro ao carregar diário: {str(e)}")
             return []
 
     @staticmethod
     def save_diario(entries):
         try:
-            with open(DIARIO_PATH, 'w', encoding='utf-8') as f:
-                json.dump(entries, f, ensure_ascii=False, indent=2)
+            if PersistenceModule._falhas_leitura().get('diario'):
+                raise RuntimeError(
+                    "a última leitura do diário falhou; gravação recusada para não sobrescrevê-lo "
+                    f"({PersistenceModule._falhas_leitura()['diario']})"
+                )
+            gravar_arquivo_atomico(DIARIO_PATH, JsonCodec.dumps(entries, pretty=True))
             return True
         except Exception as e:
             st.error(f"Erro ao salvar diário: {str(e)}")
@@ -751,9 +4161,8 @@ class PDFModule:
                     tit = PDFModule.to_latin1(r.get('titulo_artigo', ''))
                     tip = PDFModule.to_latin1(r.get('vocabulario_controlado', ''))
                     rev = PDFModule.to_latin1(r.get('n', ''))
-                    # Limpeza de páginas para evitar "p. p."
-                    raw_pag = str(r.get('paginas', '')).replace('pp.', '').replace('p.', '').strip()
-                    pags = PDFModule.to_latin1(raw_pag)
+                    # Sem o prefixo p./pp. do campo, para evitar "p. p."
+                    pags = PDFModule.to_latin1(UtilsModule.rotulo_paginas(r.get('paginas', '')))
                     pdf.set_font("Arial", 'B', 11)
                     pdf.multi_cell(0, 6, f"[{tip}] REVISTA {rev} / p. {pags}")
                     if tit:
@@ -811,13 +4220,14 @@ class PDFModule:
             return pdf.output(dest='S').encode('latin-1', 'replace')
 
     @staticmethod
-    def gerar_pdf_busca_analitica(df_reg, total_base, crit, df_citados=None, df_colab=None):
+    def gerar_pdf_busca_analitica(df_reg, total_base, crit, df_citados=None, df_colab=None, relevancia=None):
         """
         Relatório da aba EXPLORAR DADOS, incluindo:
         - Critérios de busca
         - Nº de registros e % na base
         - Resumo de 'Autores citados' e 'Autores colaboradores' (tabelas da seleção)
-        - Lista de registros
+        - Lista de registros (com a pontuação de PersistenceModule.search_scores
+          quando `relevancia` = {_id: pontuação} é informado)
         """
         try:
             pdf = FPDF()
@@ -875,11 +4285,13 @@ class PDFModule:
                     tit = PDFModule.to_latin1(r.get('titulo_artigo', ''))
                     tip = PDFModule.to_latin1(r.get('vocabulario_controlado', ''))
                     rev = PDFModule.to_latin1(r.get('n', ''))
-                    # Limpeza de páginas para evitar "p. p."
-                    raw_pag = str(r.get('paginas', '')).replace('pp.', '').replace('p.', '').strip()
-                    pags = PDFModule.to_latin1(raw_pag)
+                    # Sem o prefixo p./pp. do campo, para evitar "p. p."
+                    pags = PDFModule.to_latin1(UtilsModule.rotulo_paginas(r.get('paginas', '')))
                     pdf.set_font("Arial", 'B', 11)
-                    pdf.multi_cell(0, 6, f"[{tip}] REVISTA {rev} / p. {pags}")
+                    cabecalho = f"[{tip}] REVISTA {rev} / p. {pags}"
+                    if relevancia and str(r.get('_id')) in relevancia:
+                        cabecalho += PDFModule.to_latin1(f" - relevância {relevancia[str(r.get('_id'))]:.2f}")
+                    pdf.multi_cell(0, 6, cabecalho)
                     if tit:
                         pdf.set_font("Arial", '', 10)
                         pdf.multi_cell(0, 5, tit)
@@ -937,9 +4349,8 @@ class PDFModule:
             pdf.multi_cell(0, 5, safe(f"Nº revista: {registro.get('n','')}"))
             pdf.multi_cell(0, 5, safe(f"Registro: {registro.get('registro','')}"))
             
-            # Limpeza de páginas para evitar "p. p."
-            raw_pag = str(registro.get('paginas', '')).replace('pp.', '').replace('p.', '').strip()
-            pdf.multi_cell(0, 5, safe(f"Páginas: p. {raw_pag}"))
+            # Sem o prefixo p./pp. do campo, para evitar "p. p."
+            pdf.multi_cell(0, 5, safe(f"Páginas: p. {UtilsModule.rotulo_paginas(registro.get('paginas', ''))}"))
             
             pdf.multi_cell(0, 5, safe(f"Tipo textual: {registro.get('vocabulario_controlado','')}"))
             pdf.multi_cell(
@@ -1225,6 +4636,142 @@ class UtilsModule:
                 df[col] = df[col].apply(lambda x: x if isinstance(x, list) else [])
         return df
 
+    # Situação da leitura do campo PÁGINAS (coluna __pag_status)
+    PAGINAS_OK, PAGINAS_VAZIO, PAGINAS_ILEGIVEL, PAGINAS_INVERTIDO = 0, 1, 2, 3
+    SITUACOES_PAGINAS = {0: 'ok', 1: 'vazio', 2: 'ilegível', 3: 'intervalo invertido'}
+    _RE_TRECHO_PAGINAS = re.compile(r'^(?:pp?\.?\s*)?(\d+)(?:\s*[-–]\s*(\d+))?$', re.IGNORECASE)
+    # Maior número de página aceito; acima disso o valor é erro de digitação e conta como ilegível
+    PAGINA_MAXIMA = 99999
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def trechos_paginas(texto):
+        """
+        Lê o campo PÁGINAS ("p.10-12", "pp. 3", "10", "p.4-5, 9") como
+        (situação, ((início, fim), ...)). Um fim abreviado ("p.123-45") é
+        completado com os dígitos iniciais do início. Páginas acima de
+        PAGINA_MAXIMA tornam o valor ilegível. Em cache por texto: o catálogo
+        tem poucos valores distintos.
+        """
+        texto = texto.strip()
+        if not texto:
+            return UtilsModule.PAGINAS_VAZIO, ()
+        trechos = []
+        for parte in re.split(r'\s*(?:[,;]|\se\s)\s*', texto):
+            m = UtilsModule._RE_TRECHO_PAGINAS.match(parte)
+            if not m:
+                return UtilsModule.PAGINAS_ILEGIVEL, ()
+            inicio = int(m[1])
+            fim = inicio if m[2] is None else int(m[2])
+            if fim < inicio and len(m[2]) < len(m[1]):
+                fim = int(m[1][:len(m[1]) - len(m[2])] + m[2])
+            if max(inicio, fim) > UtilsModule.PAGINA_MAXIMA:
+                return UtilsModule.PAGINAS_ILEGIVEL, ()
+            if fim < inicio:
+                return UtilsModule.PAGINAS_INVERTIDO, ((inicio, fim),)
+            trechos.append((inicio, fim))
+        return UtilsModule.PAGINAS_OK, tuple(trechos)
+
+    @staticmethod
+    def intervalo_paginas(valor):
+        """(início, fim, nº de páginas, situação) do campo PÁGINAS; sem leitura válida, 0 nos três números."""
+        situacao, trechos = UtilsModule.trechos_paginas(str(valor or ''))
+        if situacao != UtilsModule.PAGINAS_OK:
+            inicio, fim = trechos[0] if trechos else (0, 0)
+            return inicio, fim, 0, situacao
+        return (min(i for i, _ in trechos), max(f for _, f in trechos),
+                sum(f - i + 1 for i, f in trechos), situacao)
+
+    @staticmethod
+    def rotulo_paginas(valor):
+        """PÁGINAS sem o prefixo p./pp. ("10-12"), para compor "p. 10-12"; ilegível sai como digitado."""
+        situacao, trechos = UtilsModule.trechos_paginas(str(valor or ''))
+        if situacao != UtilsModule.PAGINAS_OK:
+            return str(valor or '').strip()
+        return ", ".join(str(i) if i == f else f"{i}-{f}" for i, f in trechos)
+
+    # Colunas derivadas calculadas uma vez por versão dos dados (prefixo "__": internas,
+    # ficam fora de exibições e exportações — ver colunas_visiveis). As de páginas são
+    # inteiras: início, fim, nº de páginas e situação da leitura (PAGINAS_*)
+    COLUNAS_DERIVADAS = ['__tipo_base', '__bilingue', '__qtd_icones', '__pagina_max',
+                         '__pag_inicio', '__pag_fim', '__pag_qtd', '__pag_status']
+
+    @staticmethod
+    def preparar_dataframe(dados):
+        """
+        Monta o DataFrame canônico do catálogo: saneado, com `n` categórico
+        na ordem de ORDEM_SIBILA e as colunas derivadas já calculadas.
+        """
+        df = UtilsModule.sanitizar_dataframe(pd.DataFrame(dados))
+        if df.empty:
+            return df
+        if 'n' in df.columns:
+            df['n'] = pd.Categorical(df['n'].astype(str), categories=ORDEM_SIBILA, ordered=True)
+        vocab = df['vocabulario_controlado'] if 'vocabulario_controlado' in df.columns else pd.Series('', index=df.index)
+        df['__tipo_base'] = vocab.astype(str).str.split(' - ', n=1).str[0]
+        texto = pd.Series('', index=df.index)
+        for col in ('nota_edicao', 'resumo'):
+            if col in df.columns:
+                texto = texto + " " + df[col].fillna('').astype(str)
+        df['__bilingue'] = texto.str.lower().str.contains('bilíngue|bilingue', regex=True)
+        df['__qtd_icones'] = (
+            df['iconografias'].str.len().fillna(0).astype(int) if 'iconografias' in df.columns else 0
+        )
+        # PÁGINAS lido uma vez por valor distinto e espalhado pelos registros com o código do factorize
+        paginas = df['paginas'] if 'paginas' in df.columns else pd.Series('', index=df.index)
+        codigos, distintos = pd.factorize(paginas.fillna('').astype(str))
+        lidos = np.array(
+            [UtilsModule.intervalo_paginas(v) for v in distintos] or [(0, 0, 0, UtilsModule.PAGINAS_VAZIO)],
+            dtype=np.int64
+        )[codigos]
+        df['__pag_inicio'], df['__pag_fim'], df['__pag_qtd'] = lidos[:, 0], lidos[:, 1], lidos[:, 2]
+        df['__pag_status'] = lidos[:, 3].astype(np.int8)
+        # Maior página citada (a "última página" da revista nos relatórios); ilegível conta 0
+        df['__pagina_max'] = np.maximum(lidos[:, 0], lidos[:, 1])
+        return df
+
+    @staticmethod
+    def colunas_visiveis(df):
+        """O DataFrame sem as colunas internas (prefixo '__'), para exibir ou exportar."""
+        return df[[c for c in df.columns if not str(c).startswith('__')]]
+
+    @staticmethod
+    def ordenar_catalogo(df):
+        """Ordem estável do catálogo: revista na ordem de ORDEM_SIBILA, depois ordem_exibicao."""
+        if df.empty or 'n' not in df.columns:
+            return df
+        chave_n = pd.Categorical(df['n'].astype(str), categories=ORDEM_SIBILA, ordered=True).codes
+        chave_n = np.where(chave_n < 0, len(ORDEM_SIBILA), chave_n)
+        if 'ordem_exibicao' in df.columns:
+            ordem = pd.to_numeric(df['ordem_exibicao'], errors='coerce').fillna(0).to_numpy()
+        else:
+            ordem = np.zeros(len(df))
+        # lexsort: a última chave é a principal; a posição original desempata
+        return df.iloc[np.lexsort((np.arange(len(df)), ordem, chave_n))]
+
+    @staticmethod
+    def paginar(df, chave, assinatura=None, tamanhos=(25, 50, 100, 250)):
+        """
+        Paginação no servidor: desenha os controles e devolve (fatia da página
+        atual, posição da primeira linha). Só a fatia segue para o navegador.
+        Quando `assinatura` muda (outro resultado), volta para a página 1.
+        """
+        chave_pagina, chave_tamanho = f"{chave}_pagina", f"{chave}_tamanho"
+        if st.session_state.get(f"{chave}_assinatura") != assinatura:
+            st.session_state[f"{chave}_assinatura"] = assinatura
+            st.session_state[chave_pagina] = 1
+        total = len(df)
+        c_tam, c_pag, c_info = st.columns([1, 1, 2])
+        por_pagina = c_tam.selectbox("Linhas por página", list(tamanhos), index=1, key=chave_tamanho)
+        paginas = max(1, -(-total // por_pagina))
+        if st.session_state.get(chave_pagina, 1) > paginas:
+            st.session_state[chave_pagina] = paginas
+        pagina = c_pag.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+        inicio = (int(pagina) - 1) * por_pagina
+        fim = min(inicio + por_pagina, total)
+        c_info.caption(f"Linhas {inicio + 1 if total else 0}–{fim} de {total}")
+        return df.iloc[inicio:fim], inicio
+
     @staticmethod
     def calculate_stats_with_percentage(series):
         if series.empty:
@@ -1236,11 +4783,10 @@ class UtilsModule:
         return counts
 
     @staticmethod
-    def get_registro_by_id(dados, reg_id):
-        for r in dados:
-            if r.get('_id') == reg_id:
-                return r
-        return None
+    def get_registro_by_id(reg_id):
+        # Consulta indexada (chave primária no sqlite, ids.json nos shards, IndiceRegistros
+        # no json) em vez de varrer o catálogo carregado
+        return PersistenceModule.get_record(reg_id)
 
     @staticmethod
     def is_bilingue(registro):
@@ -1305,7 +4851,7 @@ class UtilsModule:
         try:
             o = BytesIO()
             with pd.ExcelWriter(o, engine='xlsxwriter') as w:
-                df_export = df.copy()
+                df_export = UtilsModule.colunas_visiveis(df).copy()
                 for col in df_export.columns:
                     df_export[col] = df_export[col].apply(
                         lambda x: json.dumps(x, ensure_ascii=False) if isinstance(x, (list, dict)) else x
@@ -1490,6 +5036,8 @@ class CatalogacaoForm:
             def lt(x): return "\n".join(x) if isinstance(x, list) else str(x)
 
             if rec:
+                # Registro como estava ao abrir a edição: base da mescla se outra sessão gravar antes
+                st.session_state.form_registro_base = json.loads(json.dumps(rec, ensure_ascii=False))
                 # Carregar dados do registro
                 st.session_state.form_n_rev = str(rec.get('n', ''))
                 st.session_state.form_registro = str(rec.get('registro', ''))
@@ -1519,6 +5067,7 @@ class CatalogacaoForm:
                 st.session_state.form_resumo = rec.get('resumo', '')
             else:
                 # Formulário vazio (novo registro sem dados)
+                st.session_state.form_registro_base = None
                 st.session_state.form_n_rev = ''
                 st.session_state.form_registro = ''
                 st.session_state.form_paginas = ''
@@ -1547,14 +5096,12 @@ class CatalogacaoForm:
             n_rev = c_form1.text_input("Nº REVISTA*", key="form_n_rev")
             reg_txt = c_form2.text_input("REGISTRO*", key="form_registro")
             pag = c_form3.text_input("PÁGINAS", key="form_paginas")
+            if UtilsModule.intervalo_paginas(pag)[3] in (UtilsModule.PAGINAS_ILEGIVEL, UtilsModule.PAGINAS_INVERTIDO):
+                c_form3.caption("⚠️ Fora do formato p.10-12: será listado em QUALIDADE DOS DADOS.")
             # Verificação de Duplicidade
             if n_rev and reg_txt:
-                duplicado = False
-                for r in self.dados:
-                    if mode == "EDITAR EXISTENTE" and (rec or {}).get('_id') == r.get('_id'): continue
-                    if str(r.get('n')) == str(n_rev) and str(r.get('registro')) == str(reg_txt):
-                        duplicado = True
-                        break
+                excluir_id = (rec or {}).get('_id') if mode == "EDITAR EXISTENTE" else None
+                duplicado = PersistenceModule.find_by_key(n_rev, reg_txt, excluir_id=excluir_id) is not None
                 if duplicado:
                     st.warning(f"⚠️ ATENÇÃO: Já existe o registro '{reg_txt}' na Revista {n_rev}!", icon="🚨")
             ordem = c_form4.number_input("ORDEM", key="form_ordem", min_value=0, step=1, format="%d")
@@ -1697,15 +5244,7 @@ class CatalogacaoForm:
 
             # LÓGICA APRIMORADA: Buscar registro existente por Revista + Registro
             # Isso evita duplicatas mesmo quando não há _id no rec
-            registro_existente = None
-            indice_existente = None
-
-            for i, d in enumerate(self.dados):
-                if str(d.get('n')) == str(n_rev) and str(d.get('registro')) == str(reg_txt):
-                    # Encontrou registro com mesma Revista + Registro
-                    registro_existente = d
-                    indice_existente = i
-                    break
+            registro_existente = PersistenceModule.find_by_key(n_rev, reg_txt)
 
             if mode == "EDITAR EXISTENTE":
                 # Modo EDITAR: Verificar se há registro para substituir
@@ -1715,22 +5254,16 @@ class CatalogacaoForm:
                     # Preservar notas de pesquisa do registro original
                     if 'notas_pesquisa' in registro_existente:
                         new['notas_pesquisa'] = registro_existente.get('notas_pesquisa', [])
-                    self.dados[indice_existente] = new
                     st.info(f"ℹ️ Registro existente (ID: {new['_id']}) foi ATUALIZADO.")
                 elif '_id' in (rec or {}):
                     # Tem _id mas não encontrou por revista+registro (usuário pode ter mudado esses campos)
-                    # Buscar pelo _id original
+                    # O _id original identifica o registro a substituir no journal
                     new['_id'] = (rec or {})['_id']
-                    for i, d in enumerate(self.dados):
-                        if d.get('_id') == new['_id']:
-                            self.dados[i] = new
-                            st.info(f"ℹ️ Registro (ID: {new['_id']}) foi ATUALIZADO.")
-                            break
+                    st.info(f"ℹ️ Registro (ID: {new['_id']}) foi ATUALIZADO.")
                 else:
                     # Está em modo EDITAR mas não encontrou registro existente - criar novo
                     new['_id'] = str(int(datetime.now().timestamp() * 1000))
                     new.setdefault('notas_pesquisa', [])
-                    self.dados.append(new)
                     st.warning("⚠️ Não foi encontrado registro existente para editar. Criado NOVO registro.")
             else:
                 # Modo NOVO REGISTRO
@@ -1743,9 +5276,15 @@ class CatalogacaoForm:
                     # Criar novo registro normalmente
                     new['_id'] = str(int(datetime.now().timestamp() * 1000))
                     new.setdefault('notas_pesquisa', [])
-                    self.dados.append(new)
 
-            if PersistenceModule.save_data(self.dados):
+            # Base da verificação de versão: o registro como estava quando a edição começou
+            # (se o _id final for outro, o registro encontrado por Revista + Registro agora)
+            base = st.session_state.get('form_registro_base')
+            if not base or base.get('_id') != new['_id']:
+                base = registro_existente if registro_existente and registro_existente.get('_id') == new['_id'] else None
+
+            # Grava apenas este registro (journal), sem reescrever o catálogo inteiro
+            if PersistenceModule.save_record(new, base=base):
                 st.success("✅ Registro salvo com sucesso!")
                 st.balloons()
 
@@ -1766,22 +5305,21 @@ class CatalogacaoForm:
 
 
 class FichasNotasView:
-    def __init__(self, df, dados):
-        self.df = df
-        self.dados = dados
+    """
+    Fichas por revista. Só a opção "Todas as revistas" usa o catálogo inteiro;
+    uma revista vem de PersistenceModule.issue_dataframe (no modo shards, só o
+    fragmento dela é lido).
+    """
 
     def render(self):
         st.title("📇 FICHAS & NOTAS NELIC")
-        if self.df.empty:
+        # Revistas em ORDEM_SIBILA (no modo shards, do manifesto)
+        revistas_disponiveis = [n for n in PersistenceModule.issue_stats() if n]
+        if not revistas_disponiveis:
             st.warning("Base de dados vazia. Cadastre registros na aba CATALOGAÇÃO.")
             return
 
         st.markdown("### 🔍 Navegação por Revista")
-        # Garante ordenação correta das revistas
-        revistas_disponiveis = sorted(
-            self.df['n'].astype(str).unique(),
-            key=lambda x: ORDEM_SIBILA.index(x) if x in ORDEM_SIBILA else 999
-        )
         revista_selecionada = st.selectbox(
             "Selecione a revista:",
             ["Todas as revistas"] + revistas_disponiveis,
@@ -1789,21 +5327,46 @@ class FichasNotasView:
         )
 
         if revista_selecionada == "Todas as revistas":
-            df_filtrado = self.df
+            df_filtrado = PersistenceModule.load_dataframe()
         else:
-            df_filtrado = self.df[self.df['n'].astype(str) == revista_selecionada]
+            df_filtrado = PersistenceModule.issue_dataframe(revista_selecionada)
 
         st.markdown("---")
-        opcoes = [
-            f"{r.get('n','?')} | Reg: {r.get('registro','?')} | {r.get('titulo_artigo','[sem título]')}"
-            for _, r in df_filtrado.iterrows()
-        ]
-        if not opcoes:
+        if df_filtrado.empty:
             st.warning(f"⚠️ Nenhum registro encontrado para a revista {revista_selecionada}")
             return
+        df_filtrado = UtilsModule.ordenar_catalogo(df_filtrado)
+
+        def coluna_texto(col, padrao):
+            if col not in df_filtrado.columns:
+                return pd.Series(padrao, index=df_filtrado.index)
+            return df_filtrado[col].astype(object).where(df_filtrado[col].notna(), padrao).astype(str)
+
+        # Rótulos montados de forma vetorizada; a lista de opções mostra só os
+        # primeiros acertos do filtro digitado (typeahead) em vez de todo o catálogo
+        rotulos = (
+            coluna_texto('n', '?') + " | Reg: " + coluna_texto('registro', '?') + " | "
+            + coluna_texto('titulo_artigo', '[sem título]')
+        ).tolist()
+        filtro = st.text_input(
+            "Filtrar registros (título, registro ou nº):", key="fichas_filtro",
+            placeholder="Digite parte do título..."
+        )
+        if filtro:
+            alvo = IndiceTextual.dobrar(filtro.strip())
+            posicoes = [i for i, rotulo in enumerate(rotulos) if alvo in IndiceTextual.dobrar(rotulo)]
+        else:
+            posicoes = list(range(len(rotulos)))
+        if not posicoes:
+            st.warning("⚠️ Nenhum registro corresponde ao filtro.")
+            return
+        if len(posicoes) > LIMITE_OPCOES_SELECAO:
+            st.caption(
+                f"Mostrando {LIMITE_OPCOES_SELECAO} de {len(posicoes)} registros — digite no filtro para refinar."
+            )
+            posicoes = posicoes[:LIMITE_OPCOES_SELECAO]
 
-        escolha = st.selectbox("Selecione o registro específico:", opcoes)
-        idx = opcoes.index(escolha)
+        idx = st.selectbox("Selecione o registro específico:", posicoes, format_func=lambda i: rotulos[i])
         reg_sel = df_filtrado.iloc[idx].to_dict()
         reg_id = reg_sel.get('_id')
 
@@ -1881,12 +5444,11 @@ class FichasNotasView:
                             "tags": [t.strip() for t in tags_nota.split(',') if t.strip()],
                             "registro_id": reg_id
                         }
-                        # Precisamos buscar o registro na lista original 'dados' para salvar
-                        reg_real = UtilsModule.get_registro_by_id(self.dados, reg_id)
+                        # O registro como está gravado (não a linha do DataFrame) é a base da gravação
+                        reg_real = PersistenceModule.get_record(reg_id)
                         if reg_real is not None:
-                            reg_real.setdefault('notas_pesquisa', [])
-                            reg_real['notas_pesquisa'].append(nova_nota)
-                            if PersistenceModule.save_data(self.dados):
+                            com_nota = dict(reg_real, notas_pesquisa=list(reg_real.get('notas_pesquisa') or []) + [nova_nota])
+                            if PersistenceModule.save_record(com_nota, base=reg_real):
                                 st.success("Nota adicionada ao registro.")
                                 st.rerun() # Recarrega para mostrar a nota nova
                         else:
@@ -1894,44 +5456,206 @@ class FichasNotasView:
                     else:
                         st.warning("O texto da nota não pode estar vazio.")
 
-            if notas:
-                st.markdown("##### Notas já cadastradas")
-                for n in sorted(notas, key=lambda x: x.get('data', ''), reverse=True):
-                    dt = n.get('data', '')[:16].replace("T", " ")
-                    st.markdown(
-                        f"""
-                        <div class="nelic-card">
-                            <div class="nelic-card-header">{n.get('titulo','[sem título]')}</div>
-                            <div class="nelic-card-subtitle">Data: {dt}</div>
-                            <div class="nelic-muted">{n.get('texto','')}</div>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-                    tags = n.get('tags', [])
-                    if tags:
-                        st.markdown(" ".join([f"<span class='nelic-tag nelic-tag-muted'>{t}</span>" for t in tags]), unsafe_allow_html=True)
-            else:
-                st.info("Nenhuma nota vinculada.")
+            if notas:
+                st.markdown("##### Notas já cadastradas")
+                for n in sorted(notas, key=lambda x: x.get('data', ''), reverse=True):
+                    dt = n.get('data', '')[:16].replace("T", " ")
+                    st.markdown(
+                        f"""
+                        <div class="nelic-card">
+                            <div class="nelic-card-header">{n.get('titulo','[sem título]')}</div>
+                            <div class="nelic-card-subtitle">Data: {dt}</div>
+                            <div class="nelic-muted">{n.get('texto','')}</div>
+                        </div>
+                        """,
+                        unsafe_allow_html=True
+                    )
+                    tags = n.get('tags', [])
+                    if tags:
+                        st.markdown(" ".join([f"<span class='nelic-tag nelic-tag-muted'>{t}</span>" for t in tags]), unsafe_allow_html=True)
+            else:
+                st.info("Nenhuma nota vinculada.")
+
+# ==========================================
+# 4. FUNÇÕES DE RELATÓRIOS
+# ==========================================
+
+def seletor_facetado(opcoes, chave, contar, rotulo_busca="🔍 Filtrar:", colunas=3):
+    """
+    Grade de checkboxes que só cria widgets para o subconjunto visível: as
+    opções marcadas, e as que casam com o filtro digitado (sem ele, as mais
+    frequentes), até LIMITE_OPCOES_GRADE por vez com "mostrar mais". A seleção
+    fica num set em st.session_state[f"{chave}_selecao"], atualizado pelos
+    callbacks antes do rerun. `contar(opcao)` dá a contagem ao lado do rótulo.
+    Devolve a seleção como lista ordenada.
+    """
+    chave_sel, chave_lim = f"{chave}_selecao", f"{chave}_limite"
+    selecao = st.session_state.setdefault(chave_sel, set())
+
+    def alternar(opcao, chave_widget):
+        if st.session_state.get(chave_widget):
+            selecao.add(opcao)
+        else:
+            selecao.discard(opcao)
+
+    busca = st.text_input(
+        rotulo_busca, key=f"{chave}_busca", placeholder="Digite para filtrar a lista...",
+        on_change=lambda: st.session_state.pop(chave_lim, None)
+    )
+    contagens = {opcao: contar(opcao) for opcao in opcoes}
+    if busca:
+        alvo = IndiceTextual.dobrar(busca)
+        candidatas = [o for o in opcoes if alvo in IndiceTextual.dobrar(o)]
+        st.caption(f"✅ {len(candidatas)} encontradas")
+    else:
+        # Sem filtro: as mais frequentes dentro dos demais filtros
+        candidatas = sorted((o for o in opcoes if contagens[o]), key=lambda o: -contagens[o])
+    limite = st.session_state.get(chave_lim, LIMITE_OPCOES_GRADE)
+    marcadas = [o for o in opcoes if o in selecao]
+    restantes = [o for o in candidatas if o not in selecao]
+    visiveis = marcadas + restantes[:limite]
+
+    if marcadas:
+        st.caption(f"☑️ {len(marcadas)} selecionada(s)")
+    cols = st.columns(colunas)
+    for idx, opcao in enumerate(visiveis):
+        chave_widget = f"{chave}_ck_{opcao}"
+        with cols[idx % colunas]:
+            st.checkbox(
+                f"{opcao} ({contagens[opcao]})", value=opcao in selecao, key=chave_widget,
+                on_change=alternar, args=(opcao, chave_widget)
+            )
+    ocultas = len(restantes) - limite
+    if ocultas > 0:
+        if st.button(f"Mostrar mais ({ocultas} restantes)", key=f"{chave}_mais"):
+            st.session_state[chave_lim] = limite + LIMITE_OPCOES_GRADE
+            st.rerun()
+    return sorted(selecao)
+
+def consulta_dos_filtros(f_rev, f_idioma, f_tipo, f_kw, termo):
+    """Os filtros de EXPLORAR DADOS escritos na linguagem de consulta (para salvar a busca)."""
+    def grupo(campo, valores):
+        partes = [f'{campo}:"{str(v).replace(chr(34), "")}"' for v in valores]
+        return partes[0] if len(partes) == 1 else "(" + " OR ".join(partes) + ")"
+
+    clausulas = [grupo(campo, valores) for campo, valores in (
+        ('n', f_rev), ('idioma', f_idioma), ('tipo', f_tipo), ('kw', f_kw)
+    ) if valores]
+    if termo.strip():
+        clausulas.append(f"({termo.strip()})" if ConsultaCatalogo.estruturada(termo) else termo.strip())
+    return " AND ".join(clausulas)
+
+def filtrar_explorar(df, facetas, f_rev, f_idioma, f_tipo, f_kw, termo, autor_aprox):
+    """
+    Aplica os filtros de EXPLORAR DADOS. Devolve um dict guardável em cache:
+    ids (na ordem de exibição), relevancia ({_id: BM25}), termo_relevancia,
+    criterios (textos para o resumo da busca) e erro (de sintaxe da consulta).
+    """
+    # Tipo compara o valor COMPLETO tipo + subtipo; palavras-chave sem distinção de caixa
+    res = facetas.aplicar(df, facetas.filtrar(revista=f_rev, idioma=f_idioma, tipo=f_tipo, palavra_chave=f_kw))
+    # Ordem estável (revista, ordem_exibicao): páginas consistentes entre reruns
+    res = UtilsModule.ordenar_catalogo(res)
+    criterios, erro = [], None
+    if f_rev:
+        criterios.append(f"Revistas: {', '.join(f_rev)}")
+    if f_idioma:
+        criterios.append(f"Idiomas: {', '.join(f_idioma)}")
+    if f_tipo:
+        criterios.append(f"Tipos: {', '.join(f_tipo)}")
+    if f_kw:
+        criterios.append(f"Palavras-chave: {', '.join(f_kw)}")
+
+    if autor_aprox:
+        nomes_proximos = PersistenceModule.fuzzy_index('nomes').buscar(autor_aprox, k=10)
+        ids_autor = {reg_id for _, ids, _, _ in nomes_proximos for reg_id in ids}
+        res = res[res['_id'].astype(str).isin(ids_autor)]
+        nomes_txt = ', '.join(nome for nome, _, _, _ in nomes_proximos[:3]) or 'nenhum nome próximo'
+        criterios.append(f"Autor ≈ '{autor_aprox}' ({nomes_txt})")
+
+    relevancia = {}
+    termo_relevancia = termo
+    consulta_estruturada = bool(termo) and ConsultaCatalogo.estruturada(termo)
+    if consulta_estruturada:
+        # autor:, kw:, n:5..8, AND/OR/NOT... compilados para facetas + índice invertido
+        try:
+            selecao_consulta = PersistenceModule.query(termo, versao=df.attrs.get('versao_dados'))
+            termo_relevancia = " ".join(ConsultaCatalogo.termos_livres(ConsultaCatalogo.analisar(termo)))
+        except ErroConsulta as e:
+            erro = str(e)
+            selecao_consulta, termo_relevancia = 0, ""
+        res = res[res['_id'].astype(str).isin(set(facetas.ids_de(selecao_consulta)))]
+        criterios.append(f"Consulta: {termo}")
+    ids = res['_id'].astype(str).tolist()
+    if termo_relevancia:
+        # Acertos ordenados por relevância (BM25); empates seguem a ordem do catálogo
+        relevancia = PersistenceModule.search_scores(termo_relevancia, restringir_a=set(ids))
+        if not consulta_estruturada:
+            ids = [i for i in ids if i in relevancia]
+            criterios.append(f"Termo livre: '{termo}'")
+        ids = sorted(ids, key=lambda i: -relevancia.get(i, 0.0))
+    return {
+        'ids': tuple(ids), 'relevancia': relevancia, 'termo_relevancia': termo_relevancia,
+        'criterios': tuple(criterios), 'erro': erro,
+    }
+
+def exibir_mais_relevantes(resultados, termo):
+    """Lista curta dos acertos mais relevantes (PersistenceModule.search) com o trecho do resumo."""
+    if not resultados:
+        return
+    with st.expander(f"🏆 Mais relevantes para '{termo}'", expanded=True):
+        for pos, r in enumerate(resultados, 1):
+            st.markdown(
+                f"**{pos}. {r['titulo'] or '[sem título]'}** — Revista {r['n']}, Reg. {r['registro']} "
+                f"· relevância {r['pontuacao']:.2f}"
+            )
+            if r['trecho']:
+                st.caption(r['trecho'])
+
+# --- Tabelas dos relatórios (compartilhadas pela tela e pela exportação em lote) ---
+
+COLUNAS_EXPORTACAO_OCORRENCIAS = ['n', 'registro', 'vocabulario_controlado', 'titulo_artigo', 'palavras_chave', 'onde_encontrado']
+
+def tabela_volume(df):
+    return AgregadosCatalogo.de(df).tabela_revistas({'itens': 'Quantidade de itens'}).rename(columns={'n': 'n.'})
+
+def tabela_bilinguismo(df):
+    return AgregadosCatalogo.de(df).tabela_revistas(
+        {'itens': 'total', 'bilingues': 'bil', 'pct_bilingue': '% bilíngue'}
+    )
+
+def tabela_iconografia(df):
+    # Número de itens na lista de iconografias, somado por revista
+    return AgregadosCatalogo.de(df).tabela_revistas({'imagens': 'total_imagens'})
+
+def tabela_tipos(df):
+    counts = AgregadosCatalogo.de(df).tipos()
+    total = counts['Num. Absoluto'].sum()
+    counts['Percentual'] = (counts['Num. Absoluto'] / total * 100).map(lambda x: f"{x:.2f}%")
+    return counts
+
+def tabela_palavras_chave(df):
+    return AgregadosCatalogo.de(df).contagens('palavras_chave').rename(
+        columns={'Termo': 'Palavra-chave', 'Qtd': 'Num. Absoluto', '%': 'Percentual'}
+    )
+
+def tabela_densidade(df):
+    # Por revista: soma dos itens de iconografia sobre a última página citada
+    # (imagens por página, em %; sem página conhecida, divide por 1)
+    return AgregadosCatalogo.de(df).tabela_revistas({
+        'imagens': 'Total de Imagens', 'paginas': 'Total Páginas Revista', 'densidade': 'Densidade (Img/Pág %)'
+    }).rename(columns={'n': 'n.'})
 
-# ==========================================
-# 4. FUNÇÕES DE RELATÓRIOS
-# ==========================================
+def tabela_cobertura_paginas(df):
+    return AgregadosCatalogo.de(df).cobertura_paginas()
+
+def tabela_faixas_paginas(df):
+    return AgregadosCatalogo.de(df).faixas_paginas()
 
 def relatorio_mapa_colaboracao(df):
     st.markdown("#### Volume de itens por revista")
-    def itens_por_revista(df_local):
-        rows = []
-        for rev, sub in df_local.groupby('n'):
-            rows.append({"n.": str(rev), "Quantidade de itens": len(sub)})
-        return pd.DataFrame(rows)
-    
-    df_rel = itens_por_revista(df)
+    df_rel = tabela_volume(df)
     # Garante ordenação correta no gráfico
-    if 'n.' in df_rel.columns:
-        df_rel['n.'] = pd.Categorical(df_rel['n.'], categories=ORDEM_SIBILA, ordered=True)
-        df_rel = df_rel.sort_values('n.')
-    
+    df_rel['n.'] = pd.Categorical(df_rel['n.'], categories=ORDEM_SIBILA, ordered=True)
     df_rel.index = df_rel.index + 1
     st.dataframe(df_rel, width='stretch')
     fig = px.bar(df_rel, x="n.", y="Quantidade de itens", text="Quantidade de itens")
@@ -1969,23 +5693,9 @@ def relatorio_mapa_colaboracao(df):
 
 def relatorio_bilinguismo(df):
     st.markdown("#### Índice de publicações bilíngues por número da revista")
-    df_local = df.copy()
-    df_local['bilingue'] = df_local.apply(UtilsModule.is_bilingue, axis=1)
-    resumo = (
-        df_local.groupby('n')['bilingue']
-        .agg(total='count', bil='sum')
-        .reset_index()
-    )
-    resumo['% bilíngue'] = resumo.apply(
-        lambda r: (r['bil'] / r['total'] * 100) if r['total'] > 0 else 0, axis=1
-    )
-    resumo['n'] = resumo['n'].astype(str)
-    
+    resumo = tabela_bilinguismo(df)
     # Garante ordenação correta no gráfico
-    if 'n' in resumo.columns:
-        resumo['n'] = pd.Categorical(resumo['n'], categories=ORDEM_SIBILA, ordered=True)
-        resumo = resumo.sort_values('n')
-
+    resumo['n'] = pd.Categorical(resumo['n'], categories=ORDEM_SIBILA, ordered=True)
     resumo.index = resumo.index + 1
     st.dataframe(resumo, width='stretch')
     fig = px.bar(
@@ -2031,26 +5741,9 @@ def relatorio_bilinguismo(df):
 
 def relatorio_iconografia(df):
     st.markdown("#### Iconografia por número da revista")
-    df_local = df.copy()
-    
-    # Nova Lógica: Contar número de itens na lista de iconografias
-    df_local['qtd_imagens'] = df_local['iconografias'].apply(
-        lambda x: len(x) if isinstance(x, list) else 0
-    )
-    
-    resumo = (
-        df_local.groupby('n')['qtd_imagens']
-        .agg(total_imagens='sum')
-        .reset_index()
-    )
-    
-    resumo['n'] = resumo['n'].astype(str)
-
+    resumo = tabela_iconografia(df)
     # Garante ordenação correta no gráfico
-    if 'n' in resumo.columns:
-        resumo['n'] = pd.Categorical(resumo['n'], categories=ORDEM_SIBILA, ordered=True)
-        resumo = resumo.sort_values('n')
-
+    resumo['n'] = pd.Categorical(resumo['n'], categories=ORDEM_SIBILA, ordered=True)
     resumo.index = resumo.index + 1
     
     # Renomear coluna para exibição
@@ -2101,10 +5794,9 @@ def relatorio_iconografia(df):
 
 def relatorio_autores_assunto_colab(df):
     st.markdown("#### Autores como assunto vs colaboradores")
-    s_colab = DataModule.get_normalized_series(df, 'autores_colaboradores')
-    s_ass = DataModule.get_normalized_series(df, 'nome_pessoal_como_assunto')
-    df_colab = UtilsModule.calculate_stats_with_percentage(s_colab)
-    df_ass = UtilsModule.calculate_stats_with_percentage(s_ass)
+    agregados = AgregadosCatalogo.de(df)
+    df_colab = agregados.contagens('colaboradores')
+    df_ass = agregados.contagens('assunto')
     
     # Ajuste visual do índice para começar em 1
     df_colab.index = df_colab.index + 1
@@ -2148,14 +5840,7 @@ def relatorio_autores_assunto_colab(df):
 
 def relatorio_tipos_textuais(df):
     st.markdown("#### Análise por tipos textuais")
-    df_local = df.copy()
-    df_local['tipo_base'] = df_local['vocabulario_controlado'].astype(str).apply(
-        lambda x: 'Manifesto' if 'manifesto' in x.lower() else x.split(' - ')[0]
-    )
-    counts = df_local['tipo_base'].value_counts().reset_index()
-    counts.columns = ['Tipo textual', 'Num. Absoluto']
-    total = counts['Num. Absoluto'].sum()
-    counts['Percentual'] = (counts['Num. Absoluto'] / total * 100).map(lambda x: f"{x:.2f}%")
+    counts = tabela_tipos(df)
     counts.index = counts.index + 1
     st.dataframe(counts, width='stretch')
     st.markdown("##### Exportar")
@@ -2185,161 +5870,107 @@ def relatorio_tipos_textuais(df):
         width='stretch'
     )
 
+def ocorrencias_termos(df, termos):
+    """
+    Linhas de `df` (na ordem dele) com algum dos `termos`, com a coluna
+    'onde_encontrado' ("termo (Campo, Campo); ..."; com um termo só, só os
+    campos), e o resumo por termo (registros e campos).
+    """
+    achados = PersistenceModule.term_report(termos)
+    ids = df['_id'].astype(str)
+    presentes = set(ids)
+    onde = {}
+    resumo = []
+    for termo, por_registro in achados.items():
+        por_registro = {reg_id: campos for reg_id, campos in por_registro.items() if reg_id in presentes}
+        linha = {'Termo': termo, 'Registros': len(por_registro)}
+        for rotulo, _ in RelatorioTermos.CAMPOS:
+            linha[rotulo] = sum(rotulo in campos for campos in por_registro.values())
+        resumo.append(linha)
+        for reg_id, campos in por_registro.items():
+            texto = ', '.join(campos) if len(achados) == 1 else f"{termo} ({', '.join(campos)})"
+            onde.setdefault(reg_id, []).append(texto)
+    linhas = df[ids.isin(onde)].copy()
+    linhas['onde_encontrado'] = linhas['_id'].astype(str).map(lambda reg_id: '; '.join(onde[reg_id]))
+    return linhas, pd.DataFrame(resumo, columns=['Termo', 'Registros'] + [r for r, _ in RelatorioTermos.CAMPOS])
+
+def exibir_ocorrencias(df, df_termo, rotulo, arquivo):
+    """Tabela, contagem e exportações de um relatório de ocorrências (linhas de ocorrencias_termos)."""
+    st.write(f"Registros encontrados: {len(df_termo)} de {len(df)} (total da base)")
+    if df_termo.empty:
+        st.info(f"Nenhum registro relacionado a '{rotulo}' foi encontrado na base.")
+        return
+    # Preparar dataframe para exibição com índice começando em 1
+    df_display = df_termo[['n', 'registro', 'vocabulario_controlado', 'titulo_artigo', 'onde_encontrado']].copy()
+    df_display.reset_index(drop=True, inplace=True)
+    df_display.index = df_display.index + 1
+
+    st.dataframe(
+        df_display,
+        column_config={
+            'n': 'Revista',
+            'registro': 'Registro',
+            'vocabulario_controlado': 'Tipo',
+            'titulo_artigo': 'Título',
+            'onde_encontrado': 'Encontrado em'
+        },
+        width='stretch'
+    )
+    st.markdown("##### Exportar")
+    col1, col2, col3 = st.columns(3)
+    df_export = df_termo[COLUNAS_EXPORTACAO_OCORRENCIAS].copy()
+    excel_rel = UtilsModule.converter_excel(df_export)
+    col1.download_button(
+        "📊 EXCEL",
+        excel_rel,
+        f"rel_{arquivo}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        width='stretch'
+    )
+    csv_rel = df_export.to_csv(index=False, encoding='utf-8-sig')
+    col2.download_button(
+        "📋 CSV",
+        csv_rel,
+        f"rel_{arquivo}_{datetime.now().strftime('%Y%m%d')}.csv",
+        "text/csv",
+        width='stretch'
+    )
+    pdf_rel = PDFModule.gerar_pdf_analitico(df_termo, len(df), rotulo)
+    col3.download_button(
+        "📄 PDF",
+        pdf_rel,
+        f"rel_{arquivo}_{datetime.now().strftime('%Y%m%d')}.pdf",
+        "application/pdf",
+        width='stretch'
+    )
+
 def relatorio_manifesto(df):
     st.markdown("#### Textos relacionados a 'Manifesto' (tipo textual, palavra-chave ou título)")
-    df_local = df.copy()
-    def verificar_manifesto(registro):
-        locais = []
-        tipo = str(registro.get('vocabulario_controlado', '')).lower()
-        if 'manifesto' in tipo:
-            locais.append('Tipo textual')
-        kw = registro.get('palavras_chave', [])
-        if isinstance(kw, list):
-            for palavra in kw:
-                if palavra and 'manifesto' in str(palavra).lower():
-                    locais.append('Palavra-chave')
-                    break
-        titulo = str(registro.get('titulo_artigo', '')).lower()
-        if 'manifesto' in titulo:
-            locais.append('Título')
-        resumo = str(registro.get('resumo', '')).lower()
-        if 'manifesto' in resumo:
-            locais.append('Resumo')
-        return locais
-
-    df_local['locais_manifesto'] = df_local.apply(verificar_manifesto, axis=1)
-    df_man = df_local[df_local['locais_manifesto'].apply(lambda x: len(x) > 0)].copy()
-    st.write(f"Registros encontrados: {len(df_man)} de {len(df)} (total da base)")
-    if not df_man.empty:
-        df_man['onde_encontrado'] = df_man['locais_manifesto'].apply(lambda x: ', '.join(x))
-        
-        # Preparar dataframe para exibição com índice começando em 1
-        df_display = df_man[['n', 'registro', 'vocabulario_controlado', 'titulo_artigo', 'onde_encontrado']].copy()
-        df_display.reset_index(drop=True, inplace=True)
-        df_display.index = df_display.index + 1
-        
-        st.dataframe(
-            df_display,
-            column_config={
-                'n': 'Revista',
-                'registro': 'Registro',
-                'vocabulario_controlado': 'Tipo',
-                'titulo_artigo': 'Título',
-                'onde_encontrado': 'Encontrado em'
-            },
-            width='stretch'
-        )
-        st.markdown("##### Exportar")
-        col1, col2, col3 = st.columns(3)
-        df_export = df_man[['n', 'registro', 'vocabulario_controlado', 'titulo_artigo', 'palavras_chave', 'onde_encontrado']].copy()
-        excel_rel = UtilsModule.converter_excel(df_export)
-        col1.download_button(
-            "📊 EXCEL",
-            excel_rel,
-            f"rel_manifesto_{datetime.now().strftime('%Y%m%d')}.xlsx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            width='stretch'
-        )
-        csv_rel = df_export.to_csv(index=False, encoding='utf-8-sig')
-        col2.download_button(
-            "📋 CSV",
-            csv_rel,
-            f"rel_manifesto_{datetime.now().strftime('%Y%m%d')}.csv",
-            "text/csv",
-            width='stretch'
-        )
-        pdf_rel = PDFModule.gerar_pdf_analitico(df_man, len(df), "Manifesto")
-        col3.download_button(
-            "📄 PDF",
-            pdf_rel,
-            f"rel_manifesto_{datetime.now().strftime('%Y%m%d')}.pdf",
-            "application/pdf",
-            width='stretch'
-        )
-    else:
-        st.info("Nenhum registro relacionado a 'Manifesto' foi encontrado na base.")
+    exibir_ocorrencias(df, ocorrencias_termos(df, ['manifesto'])[0], "Manifesto", "manifesto")
 
 def relatorio_sibila(df):
     st.markdown("#### Textos relacionados a 'Sibila' (tipo textual, palavra-chave ou título)")
-    df_local = df.copy()
-    def verificar_sibila(registro):
-        locais = []
-        tipo = str(registro.get('vocabulario_controlado', '')).lower()
-        if 'sibil' in tipo:
-            locais.append('Tipo textual')
-        kw = registro.get('palavras_chave', [])
-        if isinstance(kw, list):
-            for palavra in kw:
-                if palavra and 'sibil' in str(palavra).lower():
-                    locais.append('Palavra-chave')
-                    break
-        titulo = str(registro.get('titulo_artigo', '')).lower()
-        if 'sibil' in titulo:
-            locais.append('Título')
-        resumo = str(registro.get('resumo', '')).lower()
-        if 'sibil' in resumo:
-            locais.append('Resumo')
-        return locais
-
-    df_local['locais_sibila'] = df_local.apply(verificar_sibila, axis=1)
-    df_sib = df_local[df_local['locais_sibila'].apply(lambda x: len(x) > 0)].copy()
-    st.write(f"Registros encontrados: {len(df_sib)} de {len(df)} (total da base)")
-    if not df_sib.empty:
-        df_sib['onde_encontrado'] = df_sib['locais_sibila'].apply(lambda x: ', '.join(x))
-        
-        # Preparar dataframe para exibição com índice começando em 1
-        df_display = df_sib[['n', 'registro', 'vocabulario_controlado', 'titulo_artigo', 'onde_encontrado']].copy()
-        df_display.reset_index(drop=True, inplace=True)
-        df_display.index = df_display.index + 1
-        
-        st.dataframe(
-            df_display,
-            column_config={
-                'n': 'Revista',
-                'registro': 'Registro',
-                'vocabulario_controlado': 'Tipo',
-                'titulo_artigo': 'Título',
-                'onde_encontrado': 'Encontrado em'
-            },
-            width='stretch'
-        )
-        st.markdown("##### Exportar")
-        col1, col2, col3 = st.columns(3)
-        df_export = df_sib[['n', 'registro', 'vocabulario_controlado', 'titulo_artigo', 'palavras_chave', 'onde_encontrado']].copy()
-        excel_rel = UtilsModule.converter_excel(df_export)
-        col1.download_button(
-            "📊 EXCEL",
-            excel_rel,
-            f"rel_sibila_{datetime.now().strftime('%Y%m%d')}.xlsx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            width='stretch'
-        )
-        csv_rel = df_export.to_csv(index=False, encoding='utf-8-sig')
-        col2.download_button(
-            "📋 CSV",
-            csv_rel,
-            f"rel_sibila_{datetime.now().strftime('%Y%m%d')}.csv",
-            "text/csv",
-            width='stretch'
-        )
-        pdf_rel = PDFModule.gerar_pdf_analitico(df_sib, len(df), "Sibila")
-        col3.download_button(
-            "📄 PDF",
-            pdf_rel,
-            f"rel_sibila_{datetime.now().strftime('%Y%m%d')}.pdf",
-            "application/pdf",
-            width='stretch'
-        )
-    else:
-        st.info("Nenhum registro relacionado a 'Sibila' foi encontrado na base.")
+    exibir_ocorrencias(df, ocorrencias_termos(df, ['sibil'])[0], "Sibila", "sibila")
+
+def relatorio_ocorrencia_termos(df):
+    st.markdown("#### Ocorrência de termos (tipo textual, palavra-chave, título ou resumo)")
+    entrada = st.text_input(
+        "Termos ou frases, separados por vírgula:", value="vanguarda, tradução, concretismo",
+        key="relatorio_termos",
+        help="Sem distinção de caixa e acentos; cada termo vale também como parte de palavra (sibil → Sibila)"
+    )
+    termos = [t.strip() for t in entrada.split(',') if t.strip()]
+    if not termos:
+        st.info("Informe ao menos um termo.")
+        return
+    df_termos, resumo = ocorrencias_termos(df, termos)
+    resumo.index = resumo.index + 1
+    st.dataframe(resumo, width='stretch')
+    exibir_ocorrencias(df, df_termos, ", ".join(termos), "termos")
 
 def relatorio_palavras_chave(df):
     st.markdown("#### Estatísticas de palavras-chave (vocabulário controlado)")
-    s = DataModule.get_normalized_series(df, 'palavras_chave')
-    counts = UtilsModule.calculate_stats_with_percentage(s)
-    df_stats = counts.rename(
-        columns={'Termo': 'Palavra-chave', 'Qtd': 'Num. Absoluto', '%': 'Percentual'}
-    )
+    df_stats = tabela_palavras_chave(df)
     df_stats.index = df_stats.index + 1
     st.dataframe(df_stats, width='stretch')
     st.markdown("##### Exportar")
@@ -2372,60 +6003,9 @@ def relatorio_palavras_chave(df):
 def relatorio_densidade_paginas(df):
     st.markdown("#### Densidade de Imagens por Páginas")
     
-    def obter_ultima_pagina_revista(df_revista):
-        # Encontra o maior número de página citado em toda a edição
-        max_pag = 0
-        for pag in df_revista['paginas']:
-            try:
-                # Extrai todos os números e pega o último (ex: "10-25" -> 25)
-                nums = [int(n) for n in re.findall(r'\d+', str(pag))]
-                if nums:
-                    local_max = max(nums)
-                    if local_max > max_pag:
-                        max_pag = local_max
-            except:
-                continue
-        return max_pag if max_pag > 0 else 1 # Evita divisão por zero
-
-    def contar_imagens(row):
-        # Conta o número de itens na lista de iconografias
-        icons = row.get('iconografias', [])
-        if isinstance(icons, list):
-            return len(icons)
-        return 0
-
-    rows = []
-    # Agrupa por número da revista
-    for rev, sub in df.groupby('n'):
-        # Denominator: Última página física da revista
-        total_paginas_revista = obter_ultima_pagina_revista(sub)
-        
-        # Numerator: Soma da quantidade de itens de iconografia
-        soma_imagens = 0
-        for _, row in sub.iterrows():
-            soma_imagens += contar_imagens(row)
-            
-        # Densidade: Imagens por página (ou % de ocupação conforme solicitado, mas a lógica agora é Imagens / Páginas)
-        # O usuário pediu: "Numerador (Ocupação): Soma itens iconografia", "Denominador: Última página"
-        # O título original era "% da revista ocupada por ilustrações".
-        # Se tivermos 50 imagens em 100 páginas, a densidade é 0.5 imagens/página.
-        # Se multiplicarmos por 100, seria "50%".
-        # Vou manter a lógica de porcentagem/densidade mas com os novos valores.
-        
-        pct = (soma_imagens / total_paginas_revista * 100)
-        
-        rows.append({
-            "n.": str(rev),
-            "Total de Imagens": soma_imagens,
-            "Total Páginas Revista": total_paginas_revista,
-            "Densidade (Img/Pág %)": pct
-        })
-        
-    df_rel = pd.DataFrame(rows)
+    df_rel = tabela_densidade(df)
     # Garante ordenação correta no gráfico
-    if 'n.' in df_rel.columns:
-        df_rel['n.'] = pd.Categorical(df_rel['n.'], categories=ORDEM_SIBILA, ordered=True)
-        df_rel = df_rel.sort_values('n.')
+    df_rel['n.'] = pd.Categorical(df_rel['n.'], categories=ORDEM_SIBILA, ordered=True)
 
     df_rel.index = df_rel.index + 1
     
@@ -2478,6 +6058,255 @@ def relatorio_densidade_paginas(df):
         width='stretch'
     )
 
+def relatorio_cobertura_paginas(df):
+    st.markdown("#### Cobertura de páginas por revista")
+    # Intervalos de PÁGINAS já lidos em preparar_dataframe; ilegíveis ficam de fora (ver QUALIDADE DOS DADOS)
+    cobertura = tabela_cobertura_paginas(df)
+    faixas = tabela_faixas_paginas(df)
+    cobertura.index = cobertura.index + 1
+    faixas.index = faixas.index + 1
+    st.dataframe(cobertura, width='stretch')
+    if cobertura['Ilegíveis'].sum():
+        st.caption(f"⚠️ {cobertura['Ilegíveis'].sum()} registro(s) com PÁGINAS ilegível não entram na cobertura.")
+    fig = px.bar(
+        cobertura, x='n.', y='Cobertura (%)', text=cobertura['Cobertura (%)'].map(lambda x: f"{x:.1f}%")
+    )
+    fig.update_layout(height=380, title="Páginas cobertas por registros / última página citada", xaxis_title="n.")
+    fig.update_xaxes(type='category', tickmode='linear')
+    st.plotly_chart(fig, width='stretch')
+
+    st.markdown("#### Registros por faixa de extensão")
+    st.dataframe(faixas, width='stretch')
+
+    st.markdown("##### Exportar")
+    col1, col2, col3 = st.columns(3)
+    # Excel/CSV: uma linha por revista, com as faixas ao lado da cobertura
+    df_export = cobertura.merge(faixas, on='n.', how='left')
+    excel_rel = UtilsModule.converter_excel(df_export)
+    col1.download_button(
+        "📊 EXCEL",
+        excel_rel,
+        f"rel_cobertura_paginas_{datetime.now().strftime('%Y%m%d')}.xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        width='stretch'
+    )
+    csv_rel = df_export.to_csv(index=False, encoding='utf-8-sig')
+    col2.download_button(
+        "📋 CSV",
+        csv_rel,
+        f"rel_cobertura_paginas_{datetime.now().strftime('%Y%m%d')}.csv",
+        "text/csv",
+        width='stretch'
+    )
+    pdf_rel = PDFModule.gerar_pdf_duas_tabelas(
+        cobertura, "Cobertura de páginas por revista", faixas, "Registros por faixa de extensão", "Cobertura de páginas"
+    )
+    col3.download_button(
+        "📄 PDF",
+        pdf_rel,
+        f"rel_cobertura_paginas_{datetime.now().strftime('%Y%m%d')}.pdf",
+        "application/pdf",
+        width='stretch'
+    )
+
+# --- Exportação em lote (todos os relatórios, opcionalmente por revista) ---
+
+def _lote_tabela(tabela, titulo, pdf_lista=False):
+    """Relatório de uma tabela: Excel/CSV da tabela; PDF estatístico (ou a lista completa dos registros)."""
+    def construir(df):
+        t = tabela(df)
+        if pdf_lista:
+            return [('', t)], lambda: PDFModule.gerar_pdf_analitico(df, len(df), titulo)
+        return [('', t)], lambda: PDFModule.gerar_pdf_tabela_estatistica(t, titulo)
+    return construir
+
+def _lote_iconografia(df):
+    t = tabela_iconografia(df)
+    return [('', t)], lambda: PDFModule.gerar_pdf_tabela_estatistica(
+        t.rename(columns={'total_imagens': 'Total de Imagens'}), "Iconografia por revista"
+    )
+
+def _lote_autores(df):
+    agregados = AgregadosCatalogo.de(df)
+    df_colab, df_ass = agregados.contagens('colaboradores'), agregados.contagens('assunto')
+    return [('_colaboradores', df_colab), ('_assunto', df_ass)], lambda: PDFModule.gerar_pdf_duas_tabelas(
+        df_colab.head(20), "Autores Colaboradores (Top 20)",
+        df_ass.head(20), "Nomes Pessoais como Assunto (Top 20)",
+        "Autores como Assunto vs Colaboradores"
+    )
+
+def _lote_cobertura(df):
+    cobertura, faixas = tabela_cobertura_paginas(df), tabela_faixas_paginas(df)
+    return [('', cobertura), ('_faixas', faixas)], lambda: PDFModule.gerar_pdf_duas_tabelas(
+        cobertura, "Cobertura de páginas por revista", faixas, "Registros por faixa de extensão", "Cobertura de páginas"
+    )
+
+def _lote_ocorrencias(termos, rotulo):
+    def construir(df):
+        linhas, resumo = ocorrencias_termos(df, termos)
+        tabelas = [('', linhas[COLUNAS_EXPORTACAO_OCORRENCIAS])]
+        if len(termos) > 1:
+            tabelas.append(('_resumo', resumo))
+        return tabelas, lambda: PDFModule.gerar_pdf_analitico(linhas, len(df), rotulo)
+    return construir
+
+# chave: (nome base dos arquivos, construtor). O construtor recebe o recorte do
+# catálogo e devolve ([(sufixo, tabela)], gerar_pdf); "termos" só entra com termos informados.
+RELATORIOS_LOTE = {
+    "Volume de itens por revista": ('mapa_colaboracao', _lote_tabela(tabela_volume, "Volume de itens por revista", pdf_lista=True)),
+    "Índice de publicações bilíngues": ('bilinguismo', _lote_tabela(tabela_bilinguismo, "Índice de publicações bilíngues")),
+    "Iconografia por revista": ('iconografia', _lote_iconografia),
+    "Autores como assunto vs colaboradores": ('autores_assunto_colab', _lote_autores),
+    "Análise por tipos textuais": ('tipos', _lote_tabela(tabela_tipos, "Tipos textuais")),
+    "Manifesto": ('manifesto', _lote_ocorrencias(['manifesto'], "Manifesto")),
+    "Sibila": ('sibila', _lote_ocorrencias(['sibil'], "Sibila")),
+    "Palavras-chave": ('palavras_chave', _lote_tabela(tabela_palavras_chave, "Palavras-chave")),
+    "Densidade de Imagens por Páginas": ('densidade_imagens', _lote_tabela(tabela_densidade, "Densidade de Imagens por Páginas")),
+    "Cobertura de páginas": ('cobertura_paginas', _lote_cobertura),
+}
+
+_catalogo_lote = None
+
+def _exportar_relatorio(tarefa):
+    """
+    Trabalho de um processo do lote: gera Excel, CSV e PDF de um relatório
+    sobre o catálogo inteiro (revista None) ou uma revista. Devolve
+    (tarefa, [(caminho no ZIP, bytes)], erro).
+    """
+    global _catalogo_lote
+    revista, nome, termos = tarefa
+    try:
+        if _catalogo_lote is None:
+            _catalogo_lote = PersistenceModule.load_dataframe()
+        df = _catalogo_lote
+        if revista is not None:
+            df = df[df['n'].astype(str) == revista]
+        if nome == "Ocorrência de termos":
+            arquivo, construir = 'termos', _lote_ocorrencias(list(termos), ", ".join(termos))
+        else:
+            arquivo, construir = RELATORIOS_LOTE[nome]
+        pasta = 'catalogo' if revista is None else f"revista_{revista}"
+        tabelas, gerar_pdf = construir(df)
+        arquivos = []
+        for sufixo, tabela in tabelas:
+            base = f"{pasta}/rel_{arquivo}{sufixo}"
+            arquivos.append((f"{base}.xlsx", UtilsModule.converter_excel(tabela)))
+            arquivos.append((f"{base}.csv", tabela.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')))
+        arquivos.append((f"{pasta}/rel_{arquivo}.pdf", bytes(gerar_pdf())))
+        return tarefa, arquivos, None
+    except Exception as e:
+        return tarefa, [], f"{type(e).__name__}: {e}"
+
+def exportar_relatorios_lote(destino, por_revista=False, termos=(), processos=None, progresso=None):
+    """
+    Gera todos os relatórios de RELATÓRIOS em Excel, CSV e PDF num único ZIP
+    (`destino`): catálogo inteiro e, com `por_revista`, uma pasta por número.
+    As tarefas (relatório x recorte) rodam num pool de processos (`processos`
+    = 1 roda no próprio processo); `progresso(feitas, total, tarefa)` é chamado
+    a cada tarefa concluída. Falhas não interrompem o lote: vão para erros.txt.
+    Devolve (arquivos gravados, erros).
+    """
+    global _catalogo_lote
+    # Carregado antes do pool: com fork os processos herdam catálogo e índices prontos
+    _catalogo_lote = PersistenceModule.load_dataframe()
+    revistas = [None]
+    if por_revista:
+        presentes = set(_catalogo_lote['n'].astype(str))
+        revistas += [n for n in ORDEM_SIBILA if n in presentes]
+    nomes = list(RELATORIOS_LOTE) + (["Ocorrência de termos"] if termos else [])
+    tarefas = [(revista, nome, tuple(termos)) for revista in revistas for nome in nomes]
+
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    temporario = f"{destino}.tmp"
+    gravados, erros = 0, []
+    with zipfile.ZipFile(temporario, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        def receber(resultado, feitas):
+            nonlocal gravados
+            tarefa, arquivos, erro = resultado
+            for caminho, conteudo in arquivos:
+                zf.writestr(caminho, conteudo)
+            gravados += len(arquivos)
+            if erro:
+                erros.append(f"{tarefa[1]} ({'catálogo' if tarefa[0] is None else 'n. ' + tarefa[0]}): {erro}")
+            if progresso:
+                progresso(feitas, len(tarefas), tarefa)
+
+        if processos == 1:
+            for feitas, tarefa in enumerate(tarefas, 1):
+                receber(_exportar_relatorio(tarefa), feitas)
+        else:
+            with ProcessPoolExecutor(max_workers=processos) as pool:
+                futuros = [pool.submit(_exportar_relatorio, tarefa) for tarefa in tarefas]
+                for feitas, futuro in enumerate(as_completed(futuros), 1):
+                    receber(futuro.result(), feitas)
+        if erros:
+            zf.writestr('erros.txt', "\n".join(erros) + "\n")
+    os.replace(temporario, destino)
+    return gravados, erros
+
+def exportacao_lote_ui():
+    """
+    Dispara a exportação em lote como processo separado (o comando
+    exportar-relatorios da linha de comando), sem prender o script do
+    Streamlit, e acompanha o progresso pelo arquivo que o comando atualiza.
+    """
+    with st.expander("📦 Exportar todos os relatórios (ZIP)"):
+        st.caption("Excel, CSV e PDF de cada relatório, gerados em paralelo fora desta página.")
+        c1, c2 = st.columns(2)
+        por_revista = c1.checkbox("Também por número da revista", key="lote_por_revista")
+        termos = c2.text_input("Termos (opcional, para 'Ocorrência de termos'):", key="lote_termos")
+        trabalho = st.session_state.get('exportacao_lote')
+        em_andamento = trabalho is not None and trabalho['processo'].poll() is None
+        if st.button("▶️ Gerar ZIP", disabled=em_andamento, key="btn_lote_gerar"):
+            os.makedirs(EXPORTACOES_DIR, exist_ok=True)
+            destino = os.path.join(EXPORTACOES_DIR, f"relatorios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+            comando = [sys.executable, os.path.abspath(__file__), 'exportar-relatorios',
+                       '--saida', destino, '--progresso', f"{destino}.progresso.json"]
+            if por_revista:
+                comando.append('--por-revista')
+            if termos.strip():
+                comando += ['--termos', termos]
+            try:
+                processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except Exception as e:
+                st.error(f"Erro ao iniciar a exportação: {e}")
+                return
+            st.session_state.exportacao_lote = {'processo': processo, 'destino': destino}
+            st.rerun()
+        if trabalho is None:
+            return
+        arquivo_progresso = f"{trabalho['destino']}.progresso.json"
+        estado = trabalho.get('estado_final')
+        if estado is None:
+            estado = {}
+            try:
+                with open(arquivo_progresso, 'rb') as f:
+                    estado = JsonCodec.loads(f.read())
+            except (OSError, ValueError):
+                pass
+            if not em_andamento:
+                # Terminado: o estado final fica na sessão e o arquivo de progresso sai
+                trabalho['estado_final'] = estado
+                try:
+                    os.remove(arquivo_progresso)
+                except OSError:
+                    pass
+        feitas, total = estado.get('feitas', 0), estado.get('total', 0)
+        if em_andamento:
+            st.progress(feitas / total if total else 0.0, text=f"{feitas}/{total} relatórios gerados")
+            st.button("🔄 Atualizar progresso", key="btn_lote_atualizar")
+        elif estado.get('concluido') and os.path.exists(trabalho['destino']):
+            # Concluído com falhas parciais (EXPORTACAO_PARCIAL) também tem ZIP para baixar
+            if estado.get('erros'):
+                st.warning(f"{len(estado['erros'])} relatório(s) falharam; detalhes em erros.txt no ZIP.")
+            with open(trabalho['destino'], 'rb') as f:
+                st.download_button(
+                    "📥 Baixar ZIP", f.read(), os.path.basename(trabalho['destino']),
+                    "application/zip", width='stretch', key="btn_lote_baixar"
+                )
+        else:
+            st.error(f"Erro na exportação em lote (código {trabalho['processo'].returncode}).")
+
 # ==========================================
 # 5. MAIN APP LOGIC
 # ==========================================
@@ -2636,15 +6465,16 @@ def main():
         st.sidebar.markdown("👁️ **Modo Visitante**")
         st.sidebar.info("💡 Digite a senha acima para catalogar")
 
-    dados = PersistenceModule.load_data()
-    df = pd.DataFrame(dados)
-    df = UtilsModule.sanitizar_dataframe(df)
-
-    # --- CORREÇÃO ESTRUTURAL: ORDENAÇÃO DE REVISTAS ---
-    # Converte a coluna 'n' para categórica com ordem definida
-    if 'n' in df.columns:
-        df['n'] = df['n'].astype(str)
-        df['n'] = pd.Categorical(df['n'], categories=ORDEM_SIBILA, ordered=True)
+    # Cada página carrega só o que usa: a lista de registros serve à catalogação e ao diário;
+    # NELIC, METODOLOGIA e o diário não usam o DataFrame, e FICHAS & NOTAS lê uma revista
+    # por vez (no modo shards, só o fragmento dela)
+    dados = PersistenceModule.load_data() if menu in ("CATALOGAÇÃO", "DIÁRIO DE PESQUISA") else []
+    df = pd.DataFrame()
+    if menu not in ("NELIC", "FICHAS & NOTAS", "DIÁRIO DE PESQUISA", "METODOLOGIA"):
+        # DataFrame saneado, com 'n' categórico (ORDEM_SIBILA) e colunas derivadas, montado
+        # uma vez por versão dos dados. É o objeto compartilhado (somente leitura: recortes
+        # e cópias para alterar), o que permite aos relatórios reconhecê-lo (versao_canonica)
+        df = PersistenceModule.load_dataframe()
 
     # --- NELIC ---
     if menu == "NELIC":
@@ -2998,24 +6828,32 @@ def main():
             st.markdown("---")
             st.markdown("### 🔍 BUSCAR REGISTRO PARA EDITAR")
 
+            busca_aproximada = st.text_input(
+                "🔤 Título ou autor (tolera erros de digitação e acentos)",
+                key="busca_aproximada",
+                placeholder="Ex.: bonvicno, haroldo campos, poesia contemporanea..."
+            )
+
             # Campos de busca
             col1, col2, col3 = st.columns(3)
             with col1:
                 # Listar todas as revistas únicas
                 # Ordenação correta na lista de seleção manual
-                revs_existentes = list(set([str(d.get('n', '')) for d in dados if d.get('n')]))
-                revistas_disponiveis = sorted(
-                    revs_existentes,
-                    key=lambda x: ORDEM_SIBILA.index(x) if x in ORDEM_SIBILA else 999
-                )
+                revistas_disponiveis = [n for n in PersistenceModule.issue_stats() if n]
                 revista_busca = st.selectbox("Nº REVISTA", [""] + revistas_disponiveis, key="busca_revista")
 
             with col2:
                 # Filtrar registros por revista selecionada e criar lista com títulos
                 if revista_busca:
-                    registros_filtrados = [d for d in dados if str(d.get('n', '')) == revista_busca]
+                    registros_filtrados = PersistenceModule.load_issue(revista_busca)
                 else:
                     registros_filtrados = dados
+                if busca_aproximada:
+                    # Só os registros com título/autor próximo, do mais parecido ao menos
+                    por_id = {str(d.get('_id')): d for d in registros_filtrados}
+                    registros_filtrados = [
+                        por_id[i] for i in PersistenceModule.fuzzy_search(busca_aproximada, k=30, ids=por_id)
+                    ]
 
                 # Criar dicionário: "registro - título" -> dados completos
                 registros_opcoes = {}
@@ -3036,7 +6874,24 @@ def main():
                         return int(numero)
                     except:
                         return 0
-                opcoes_ordenadas = sorted(registros_opcoes.keys(), key=extrair_numero)
+                if busca_aproximada:
+                    opcoes_ordenadas = list(registros_opcoes)
+                else:
+                    opcoes_ordenadas = sorted(registros_opcoes.keys(), key=extrair_numero)
+                # Filtro digitado antes do corte: qualquer registro pode chegar à lista de opções
+                filtro_registro = st.text_input(
+                    "Filtrar registros (título ou registro):", key="busca_filtro_registro",
+                    placeholder="Digite parte do título..."
+                )
+                if filtro_registro:
+                    alvo = IndiceTextual.dobrar(filtro_registro.strip())
+                    opcoes_ordenadas = [o for o in opcoes_ordenadas if alvo in IndiceTextual.dobrar(o)]
+                if len(opcoes_ordenadas) > LIMITE_OPCOES_SELECAO:
+                    st.caption(
+                        f"Mostrando {LIMITE_OPCOES_SELECAO} de {len(opcoes_ordenadas)} — digite no filtro, "
+                        "escolha a revista ou use a busca aproximada para refinar."
+                    )
+                    opcoes_ordenadas = opcoes_ordenadas[:LIMITE_OPCOES_SELECAO]
 
                 registro_busca = st.selectbox("REGISTRO (título)", [""] + opcoes_ordenadas, key="busca_registro")
 
@@ -3068,7 +6923,7 @@ def main():
 
     # --- FICHAS & NOTAS ---
     elif menu == "FICHAS & NOTAS":
-        view = FichasNotasView(df, dados)
+        view = FichasNotasView()
         view.render()
 
     # --- EXPLORAR DADOS ---
@@ -3097,11 +6952,28 @@ def main():
                 key=lambda x: ORDEM_SIBILA.index(x) if x in ORDEM_SIBILA else 999
             )
 
+            # Bitsets por valor de faceta: filtros e contagens viram operações AND/OR (da mesma
+            # versão do df, mesmo que outra sessão grave no meio deste rerun)
+            versao_df = df.attrs.get('versao_dados')
+            facetas = PersistenceModule.facets(versao_df)
+            # Seleção de palavras-chave (já atualizada pelos callbacks) para as contagens de tipo
+            f_kw_atual = sorted(st.session_state.get("explorar_kw_selecao", ()))
+
             # FILTROS
             col_filtros1, col_filtros2 = st.columns(2)
 
             with col_filtros1:
-                termo = st.text_input("🔍 Busca Livre (Título/Resumo):", key="explorar_termo")
+                termo = st.text_input(
+                    "🔍 Busca Livre (Título/Resumo):",
+                    key="explorar_termo",
+                    help='Aceita também consultas estruturadas, ex.: autor:"BONVICINO, Régis" AND kw:Tradução '
+                         'AND n:5..8 AND NOT tipo:POEMA(S). Campos: ' + ", ".join(ConsultaCatalogo.CAMPOS)
+                )
+                autor_aprox = st.text_input(
+                    "👤 Autor (busca aproximada):",
+                    key="explorar_autor",
+                    help="Colaboradores, citados, tradutores e nomes como assunto; tolera erros de digitação e acentos"
+                )
 
             with col_filtros2:
                 # Selectbox para revista
@@ -3112,104 +6984,93 @@ def main():
                 )
                 f_rev = [revista_sel] if revista_sel != "Todas" else []
 
-            # Filtro de Tipo Textual - TODOS os tipos e subtipos!
+            f_idioma = st.multiselect(
+                "🌐 Idioma (1º ou 2º)",
+                sorted(facetas.valores('idioma'), key=lambda i: -facetas.contar('idioma', i)),
+                format_func=lambda i: f"{i} ({facetas.contar('idioma', i)})",
+                key="explorar_idioma"
+            )
+
+            # Filtro de Tipo Textual - TODOS os tipos e subtipos (só os visíveis viram widgets)
             with st.expander("📝 Tipo Textual (clique para expandir e selecionar)", expanded=False):
                 st.caption(f"💡 {len(tipos_clean)} tipos textuais disponíveis (incluindo todos os subtipos)")
-
-                # Campo de busca para filtrar tipos
-                busca_tipo = st.text_input(
-                    "🔍 Filtrar tipos:",
-                    key="busca_tipo_textual",
-                    placeholder="Digite para filtrar a lista..."
+                # Contagem de cada tipo dentro dos demais filtros
+                base_tipo = facetas.filtrar(revista=f_rev, idioma=f_idioma, palavra_chave=f_kw_atual)
+                f_tipo = seletor_facetado(
+                    tipos_clean, "explorar_tipo", lambda t: facetas.contar('tipo', t, base_tipo),
+                    rotulo_busca="🔍 Filtrar tipos:", colunas=3
                 )
 
-                # Filtrar tipos conforme a busca
-                if busca_tipo:
-                    tipos_exibir = [t for t in tipos_clean
-                                   if busca_tipo.lower() in t.lower()]
-                    st.caption(f"✅ {len(tipos_exibir)} tipos encontrados")
-                else:
-                    tipos_exibir = tipos_clean
-
-                # Mostrar TODOS os tipos (filtrados ou não)
-                f_tipo = []
-                cols_tipo = st.columns(3)
-                for idx, tipo in enumerate(tipos_exibir):
-                    with cols_tipo[idx % 3]:
-                        if st.checkbox(tipo, key=f"tipo_check_{tipo}"):
-                            f_tipo.append(tipo)
-
-            # Filtro de Palavras-chave - TODAS AS 461!
+            # Filtro de Palavras-chave - TODAS AS 461 (só as visíveis viram widgets)
             with st.expander("🏷️ Palavras-Chave (clique para expandir e selecionar)", expanded=False):
                 st.caption(f"💡 {len(DataModule.LISTA_PALAVRAS_CHAVE)} palavras-chave disponíveis")
-
-                # Campo de busca para filtrar palavras
-                busca_palavra = st.text_input(
-                    "🔍 Filtrar palavras:",
-                    key="busca_palavra_chave",
-                    placeholder="Digite para filtrar a lista..."
+                base_kw = facetas.filtrar(revista=f_rev, idioma=f_idioma, tipo=f_tipo)
+                f_kw = seletor_facetado(
+                    DataModule.LISTA_PALAVRAS_CHAVE, "explorar_kw",
+                    lambda p: facetas.contar('palavra_chave', p, base_kw),
+                    rotulo_busca="🔍 Filtrar palavras:", colunas=4
                 )
 
-                # Filtrar palavras conforme a busca
-                if busca_palavra:
-                    palavras_exibir = [p for p in DataModule.LISTA_PALAVRAS_CHAVE
-                                      if busca_palavra.lower() in p.lower()]
-                    st.caption(f"✅ {len(palavras_exibir)} palavras encontradas")
-                else:
-                    palavras_exibir = DataModule.LISTA_PALAVRAS_CHAVE
-
-                # Mostrar TODAS as palavras (filtradas ou não)
-                f_kw = []
-                cols_kw = st.columns(4)
-                for idx, palavra in enumerate(palavras_exibir):
-                    with cols_kw[idx % 4]:
-                        if st.checkbox(palavra, key=f"kw_check_{palavra}"):
-                            f_kw.append(palavra)
-
             # Botão de reset
             if st.button("🔄 Limpar Todos os Filtros", help="Desmarca todos os filtros e recarrega"):
                 # Limpar TODOS os checkboxes e filtros
                 for key in list(st.session_state.keys()):
-                    if key.startswith('tipo_check_') or key.startswith('kw_check_') or key.startswith('explorar_'):
+                    if key.startswith('explorar_'):
                         del st.session_state[key]
                 st.rerun()
 
-            # Aplicar filtros
-            res = df.copy()
-            criterios = []
-
-            if f_rev:
-                res = res[res['n'].astype(str).isin(f_rev)]
-                criterios.append(f"Revistas: {', '.join(f_rev)}")
-
-            if f_tipo:
-                # Filtro que compara o valor COMPLETO (tipo + subtipo) do vocabulario_controlado
-                def filtro_tipo(valor):
-                    if pd.isna(valor) or not valor:
-                        return False
-                    valor_completo = str(valor).strip()
-                    # Verificar se o valor completo está nos tipos selecionados
-                    return valor_completo in f_tipo
-
-                res = res[res['vocabulario_controlado'].apply(filtro_tipo)]
-                criterios.append(f"Tipos: {', '.join(f_tipo)}")
-
-            if f_kw:
-                res = res[
-                    res['palavras_chave'].apply(
-                        lambda x: any(
-                            k.lower() in [i.lower() for i in (x if isinstance(x, list) else [])]
-                            for k in f_kw
-                        )
-                    )
-                ]
-                criterios.append(f"Palavras-chave: {', '.join(f_kw)}")
+            # Buscas salvas: resultados mantidos a cada gravação, abertos sem recalcular os filtros
+            buscas_salvas = PersistenceModule.saved_searches()
+            with st.expander(f"💾 Buscas salvas ({len(buscas_salvas)})", expanded=False):
+                busca_salva = st.selectbox(
+                    "Abrir busca salva:", [""] + sorted(buscas_salvas, key=str.lower), key="explorar_busca_salva",
+                    format_func=lambda nome: nome and f"{nome} ({len(buscas_salvas[nome]['ids'])})"
+                )
+                c_salvar1, c_salvar2 = st.columns([1, 2])
+                nome_busca = c_salvar1.text_input("Nome da busca:", key="explorar_nome_busca")
+                consulta_busca = c_salvar2.text_input(
+                    "Consulta:", value=consulta_dos_filtros(f_rev, f_idioma, f_tipo, f_kw, termo),
+                    help="Preenchida com os filtros atuais (a busca aproximada de autor não entra); pode ser editada"
+                )
+                c_bt1, c_bt2 = st.columns(2)
+                if c_bt1.button("💾 Salvar busca", disabled=not (nome_busca.strip() and consulta_busca.strip())):
+                    if PersistenceModule.save_search(nome_busca.strip(), consulta_busca.strip()):
+                        st.success(f"✅ Busca '{nome_busca.strip()}' salva.")
+                        st.rerun()
+                if busca_salva and c_bt2.button(f"🗑️ Excluir '{busca_salva}'"):
+                    if PersistenceModule.delete_search(busca_salva):
+                        del st.session_state["explorar_busca_salva"]
+                        st.rerun()
 
-            if termo:
-                res = res[
-                    res.astype(str).apply(lambda x: x.str.contains(termo, case=False, na=False)).any(axis=1)
-                ]
-                criterios.append(f"Termo livre: '{termo}'")
+            # Estado normalizado dos filtros: chave do cache de resultados (sessão + compartilhado)
+            estado_busca = (
+                tuple(sorted(f_rev)), tuple(sorted(f_idioma)), tuple(sorted(f_tipo)),
+                tuple(sorted({k.lower() for k in f_kw})), " ".join(termo.split()),
+                IndiceTextual.dobrar(" ".join(autor_aprox.split())),
+            )
+            if busca_salva in buscas_salvas:
+                salva = buscas_salvas[busca_salva]
+                st.info(f"💾 Busca salva '{busca_salva}' aberta: os filtros acima não se aplicam.")
+                estado_busca = ('busca_salva', busca_salva, salva['consulta'])
+                busca = {
+                    'ids': tuple(UtilsModule.ordenar_catalogo(facetas.linhas(df, salva['ids']))['_id'].astype(str)),
+                    'relevancia': {}, 'termo_relevancia': "",
+                    'criterios': (f"Busca salva: {busca_salva} ({salva['consulta']})",), 'erro': None,
+                }
+            else:
+                busca = PersistenceModule.cached_results(
+                    estado_busca,
+                    lambda: filtrar_explorar(df, facetas, f_rev, f_idioma, f_tipo, f_kw, termo, autor_aprox),
+                    versao=versao_df,
+                )
+            if busca['erro']:
+                st.error(f"⚠️ {busca['erro']}")
+            res = facetas.linhas(df, busca['ids']).copy()
+            relevancia = busca['relevancia']
+            termo_relevancia = busca['termo_relevancia']
+            criterios = list(busca['criterios'])
+            if termo_relevancia:
+                res['__relevancia'] = res['_id'].astype(str).map(relevancia).fillna(0.0)
 
             # Estatísticas dos resultados
             str_criterios = " | ".join(criterios) if criterios else "Toda a base de dados"
@@ -3226,6 +7087,18 @@ def main():
                     st.info(f"🔍 Filtros ativos: {str_criterios}")
                 else:
                     st.info("📊 Mostrando todos os registros")
+            m_sessao = PersistenceModule.session_result_cache().metricas()
+            m_comp = PersistenceModule.result_cache().metricas()
+            st.caption(
+                f"⚡ Cache de buscas — sessão: {m_sessao['taxa']:.0f}% de acerto "
+                f"({m_sessao['itens']}/{m_sessao['capacidade']}) · compartilhado: {m_comp['taxa']:.0f}% "
+                f"({m_comp['itens']}/{m_comp['capacidade']}, {m_comp['descartes']} descartes)"
+            )
+
+            if relevancia and not res.empty:
+                exibir_mais_relevantes(
+                    PersistenceModule.search(termo_relevancia, k=5, restringir_a=relevancia), termo_relevancia
+                )
 
             # Tabela de resultados com configuração aprimorada
             st.markdown("### 📋 RESULTADOS")
@@ -3235,7 +7108,7 @@ def main():
                 st.session_state.colunas_visiveis = ['n', 'registro', 'titulo_artigo', 'autores_colaboradores', 'vocabulario_controlado']
 
             with st.expander("⚙️ Configurar Colunas Visíveis", expanded=False):
-                todas_colunas = list(res.columns)
+                todas_colunas = list(UtilsModule.colunas_visiveis(res).columns)
                 colunas_recomendadas = ['n', 'registro', 'titulo_artigo', 'autores_colaboradores', 'vocabulario_controlado', 'palavras_chave', 'paginas']
 
                 col_config1, col_config2 = st.columns([4, 1])
@@ -3251,8 +7124,14 @@ def main():
                         st.session_state.colunas_visiveis = colunas_recomendadas
                         st.rerun()
 
-            # Preparar DataFrame para exibição
-            res_prepared = res.copy()
+            # Paginação no servidor: só as linhas da página atual são formatadas e enviadas
+            res_pagina, inicio_pagina = UtilsModule.paginar(res, "explorar", assinatura=estado_busca)
+
+            # Preparar DataFrame para exibição (projeção: só as colunas visíveis)
+            colunas_projecao = [
+                c for c in (st.session_state.colunas_visiveis or UtilsModule.colunas_visiveis(res_pagina).columns) if c in res_pagina.columns
+            ]
+            res_prepared = res_pagina[colunas_projecao].copy()
 
             # Remover coluna _timestamp se existir
             if '_timestamp' in res_prepared.columns:
@@ -3297,10 +7176,10 @@ def main():
             else:
                 res_display = res_prepared
 
-            # Ajuste visual do índice para começar em 1
+            # Ajuste visual do índice: posição no resultado, começando em 1
             res_display = res_display.copy()
             res_display.reset_index(drop=True, inplace=True)
-            res_display.index = res_display.index + 1
+            res_display.index = res_display.index + inicio_pagina + 1
 
             st.dataframe(
                 res_display,
@@ -3362,7 +7241,9 @@ def main():
             col_export1, col_export2, col_export3 = st.columns([1, 1, 1])
 
             excel_busca = UtilsModule.converter_excel(res)
-            pdf_busca = PDFModule.gerar_pdf_busca_analitica(res, len(df), str_criterios, df_citados, df_colab)
+            pdf_busca = PDFModule.gerar_pdf_busca_analitica(
+                res, len(df), str_criterios, df_citados, df_colab, relevancia=relevancia or None
+            )
 
             with col_export1:
                 st.download_button(
@@ -3397,6 +7278,7 @@ def main():
         if df.empty:
             st.warning("Base vazia.")
         else:
+            exportacao_lote_ui()
             tipo_rel = st.selectbox(
                 "Selecione o relatório:",
                 [
@@ -3407,8 +7289,10 @@ def main():
                     "Análise por tipos textuais",
                     "Manifesto",
                     "Sibila",
+                    "Ocorrência de termos",
                     "Palavras-chave",
-                    "Densidade de Imagens por Páginas"
+                    "Densidade de Imagens por Páginas",
+                    "Cobertura de páginas"
                 ]
             )
             if tipo_rel == "Volume de itens por revista":
@@ -3425,10 +7309,14 @@ def main():
                 relatorio_manifesto(df)
             elif tipo_rel == "Sibila":
                 relatorio_sibila(df)
+            elif tipo_rel == "Ocorrência de termos":
+                relatorio_ocorrencia_termos(df)
             elif tipo_rel == "Palavras-chave":
                 relatorio_palavras_chave(df)
             elif tipo_rel == "Densidade de Imagens por Páginas":
                 relatorio_densidade_paginas(df)
+            elif tipo_rel == "Cobertura de páginas":
+                relatorio_cobertura_paginas(df)
 
     # --- ANÁLISE COMPARATIVA ---
     elif menu == "ANÁLISE COMPARATIVA":
@@ -3446,32 +7334,31 @@ def main():
                     key=lambda x: ORDEM_SIBILA.index(x) if x in ORDEM_SIBILA else 999
                 )
                 f_rev = c2.multiselect(f"{prefix} · revistas", revs_local, key=f"rev_{prefix}")
-                tipos_raw_local = df_base['vocabulario_controlado'].astype(str).unique()
-                tipos_clean_local = sorted(list(set([t.split(' - ')[0] for t in tipos_raw_local])))
+                tipos_clean_local = sorted(df_base['__tipo_base'].unique())
                 f_tipo = c3.multiselect(f"{prefix} · tipos textuais", tipos_clean_local, key=f"tipo_{prefix}")
                 f_bil = c4.selectbox(
                     f"{prefix} · bilíngue",
                     ["Todos", "Apenas bilíngues", "Apenas não bilíngues"],
                     key=f"bil_{prefix}"
                 )
-                res_local = df_base.copy()
-                if f_rev:
-                    res_local = res_local[res_local['n'].astype(str).isin(f_rev)]
-                if f_tipo:
-                    res_local = res_local[
-                        res_local['vocabulario_controlado'].apply(lambda x: str(x).split(' - ')[0] in f_tipo)
-                    ]
-                res_local = res_local.copy()
-                res_local['__bil'] = res_local.apply(UtilsModule.is_bilingue, axis=1)
-                if f_bil == "Apenas bilíngues":
-                    res_local = res_local[res_local['__bil']]
-                elif f_bil == "Apenas não bilíngues":
-                    res_local = res_local[~res_local['__bil']]
+                bilingue = {"Apenas bilíngues": [True], "Apenas não bilíngues": [False]}.get(f_bil, [])
+                facetas = PersistenceModule.facets(df_base.attrs.get('versao_dados'))
+                res_local = facetas.aplicar(
+                    df_base, facetas.filtrar(revista=f_rev, tipo_base=f_tipo, bilingue=bilingue)
+                ).copy()
                 if termo:
-                    res_local = res_local[
-                        res_local.astype(str).apply(lambda x: x.str.contains(termo, case=False)).any(axis=1)
-                    ]
-                return res_local.drop(columns=['__bil'], errors='ignore')
+                    relevancia_local = PersistenceModule.search_scores(
+                        termo, restringir_a=set(res_local['_id'].astype(str))
+                    )
+                    res_local = res_local[res_local['_id'].astype(str).isin(relevancia_local)]
+                    res_local = res_local.assign(
+                        __relevancia=res_local['_id'].astype(str).map(relevancia_local)
+                    ).sort_values('__relevancia', ascending=False, kind='stable')
+                    if not res_local.empty:
+                        exibir_mais_relevantes(
+                            PersistenceModule.search(termo, k=3, restringir_a=relevancia_local), termo
+                        )
+                return res_local
 
             st.markdown("#### Conjunto A")
             df_A = aplicar_filtros(df, "A")
@@ -3490,10 +7377,8 @@ def main():
                     ic = df_sub['iconografias'].apply(
                         lambda x: isinstance(x, list) and len(x) > 0
                     ).sum()
-                    df_tmp = df_sub.copy()
-                    df_tmp['__bil'] = df_tmp.apply(UtilsModule.is_bilingue, axis=1)
-                    bil = df_tmp['__bil'].sum()
-                    total = len(df_tmp)
+                    bil = df_sub['__bilingue'].sum()
+                    total = len(df_sub)
                     return {
                         "registros": total,
                         "colab_distintos": s_colab.nunique(),
@@ -3537,18 +7422,15 @@ def main():
                 "Monitoramento de consistência e lacunas conforme as exigências metodológicas do NELIC."
             )
             df_local = df.copy()
-            sem_pag = df_local[
-                df_local['paginas'].isna() |
-                (df_local['paginas'].astype(str).str.strip() == '')
-            ]
+            sem_pag = df_local[df_local['__pag_status'] == UtilsModule.PAGINAS_VAZIO]
+            pag_ilegivel = df_local[df_local['__pag_status'].isin(
+                [UtilsModule.PAGINAS_ILEGIVEL, UtilsModule.PAGINAS_INVERTIDO]
+            )]
             sem_tit = df_local[
                 df_local['titulo_artigo'].isna() |
                 (df_local['titulo_artigo'].astype(str).str.strip() == '')
             ]
-            df_local['tipo_base'] = df_local['vocabulario_controlado'].astype(str).apply(
-                lambda x: x.split(' - ')[0]
-            )
-            precisa_resumo = ~df_local['tipo_base'].isin(TIPOS_SEM_RESUMO)
+            precisa_resumo = ~df_local['__tipo_base'].isin(TIPOS_SEM_RESUMO)
             sem_resumo = df_local[
                 precisa_resumo &
                 (
@@ -3556,8 +7438,8 @@ def main():
                     (df_local['resumo'].astype(str).str.strip() == '')
                 )
             ]
-            t1, t2, t3, t4 = st.tabs(
-                ["Sem páginas", "Sem título", "Sem resumo (quando exigido)", "Duplicidade de registro"]
+            t1, t1b, t2, t3, t4 = st.tabs(
+                ["Sem páginas", "Páginas ilegíveis", "Sem título", "Sem resumo (quando exigido)", "Duplicidade de registro"]
             )
             with t1:
                 st.markdown("#### Registros sem informação de páginas")
@@ -3566,6 +7448,14 @@ def main():
                 df_sem_pag.reset_index(drop=True, inplace=True)
                 df_sem_pag.index = df_sem_pag.index + 1
                 st.dataframe(df_sem_pag, width='stretch')
+            with t1b:
+                st.markdown("#### Registros com PÁGINAS fora do formato (p.10, p.10-12, p.4-5, 9)")
+                st.write(f"Total: {len(pag_ilegivel)}")
+                df_pag_ilegivel = pag_ilegivel[['n', 'registro', 'titulo_artigo', 'paginas']].copy()
+                df_pag_ilegivel['situacao'] = pag_ilegivel['__pag_status'].map(UtilsModule.SITUACOES_PAGINAS)
+                df_pag_ilegivel.reset_index(drop=True, inplace=True)
+                df_pag_ilegivel.index = df_pag_ilegivel.index + 1
+                st.dataframe(df_pag_ilegivel, width='stretch')
             with t2:
                 st.markdown("#### Registros sem título")
                 st.write(f"Total: {len(sem_tit)}")
@@ -3614,8 +7504,7 @@ def main():
                                             st.rerun()
                                         else:
                                             # Excluir o registro
-                                            dados_novos = [d for d in dados if d.get('_id') != row['_id']]
-                                            if PersistenceModule.save_data(dados_novos):
+                                            if PersistenceModule.delete_record(row['_id']):
                                                 st.success(f"✅ Registro ID {row['_id']} excluído com sucesso!")
                                                 del st.session_state[f"confirm_delete_{row['_id']}"]
                                                 st.rerun()
@@ -3819,10 +7708,24 @@ def main():
 
                         # ========== CONTROLES SIMPLIFICADOS ==========
                         st.markdown("##### 🎯 Selecione um autor para destacar:")
-                        try:
-                            autor_options = ["(nenhum)"] + sorted(G.nodes())
-                        except Exception:
-                            autor_options = ["(nenhum)"] + [str(n) for n in G.nodes()]
+                        filtro_autor = st.text_input(
+                            "Filtrar autores (busca aproximada)",
+                            key="pyvis_autor_filtro",
+                            placeholder="Digite parte do nome; erros de digitação e acentos são tolerados"
+                        )
+                        if filtro_autor:
+                            # Só os nós com nome próximo, do mais parecido ao menos (sem ordenar o grafo inteiro);
+                            # os nomes gravados já estão no formato ABNT das chaves do índice
+                            autor_options = ["(nenhum)"] + [
+                                nome for nome, _, _, _ in
+                                PersistenceModule.fuzzy_index('nomes').buscar(filtro_autor, k=50)
+                                if G.has_node(nome)
+                            ]
+                        else:
+                            try:
+                                autor_options = ["(nenhum)"] + sorted(G.nodes())
+                            except Exception:
+                                autor_options = ["(nenhum)"] + [str(n) for n in G.nodes()]
 
                         autor_pref_label = st.selectbox(
                             "Autor",
@@ -4606,18 +8509,30 @@ def main():
                 try:
                     import plotly.graph_objects as go
                     
-                    # Preparar dados por edição
-                    revistas_unicas = sorted(list(set(df['n'].dropna().astype(str).unique())), 
-                                           key=lambda x: ORDEM_SIBILA.index(x) if x in ORDEM_SIBILA else 999)
+                    # Contagens por edição (no modo shards vêm do manifesto, sem abrir os fragmentos)
+                    estatisticas = PersistenceModule.issue_stats()
+                    revistas_unicas = [n for n in estatisticas if n]
                     
                     dados_radar = []
                     
-                    # Calcular métricas para todas as revistas para normalizar visualidade
-                    max_visualidade_dataset = 0
+                    # Visualidade é normalizada pela edição mais visual do acervo
+                    max_visualidade_dataset = max(
+                        (e['icones'] / e['registros'] for e in estatisticas.values() if e['registros']),
+                        default=0
+                    )
                     temp_metrics = {}
 
-                    for rev in revistas_unicas:
-                        df_rev = df[df['n'].astype(str) == rev]
+                    # Seletor de revistas
+                    opcoes_padrao = revistas_unicas[:3] if len(revistas_unicas) >= 3 else revistas_unicas
+                    revistas_selecionadas = st.multiselect(
+                        "Selecione as edições para comparar:",
+                        revistas_unicas,
+                        default=opcoes_padrao
+                    )
+
+                    # Demais métricas só das edições selecionadas, carregadas uma a uma
+                    for rev in revistas_selecionadas:
+                        df_rev = PersistenceModule.issue_dataframe(rev)
                         if df_rev.empty: continue
                         
                         total_items = len(df_rev)
@@ -4637,10 +8552,8 @@ def main():
                         
                         # 3. Visualidade (Densidade)
                         # Total de ícones / Total de artigos
-                        total_icones = df_rev['iconografias'].apply(lambda x: len(x) if isinstance(x, list) else 0).sum()
+                        total_icones = df_rev['__qtd_icones'].sum()
                         density_visual = total_icones / total_items
-                        if density_visual > max_visualidade_dataset:
-                            max_visualidade_dataset = density_visual
                             
                         # 4. Ensaísmo vs Poesia
                         # Contar 'Ensaio', 'Crítica', 'Resenha' vs Tudo
@@ -4655,14 +8568,6 @@ def main():
                             'Raw_Visualidade': density_visual,
                             'Ensaísmo': score_ensaismo
                         }
-                        
-                    # Seletor de revistas
-                    opcoes_padrao = revistas_unicas[:3] if len(revistas_unicas) >= 3 else revistas_unicas
-                    revistas_selecionadas = st.multiselect(
-                        "Selecione as edições para comparar:",
-                        revistas_unicas,
-                        default=opcoes_padrao
-                    )
                     
                     if not revistas_selecionadas:
                         st.warning("Selecione pelo menos uma revista.")
@@ -4866,7 +8771,7 @@ def main():
                     st.markdown("<br><span class='nelic-muted'>Registros vinculados:</span>", unsafe_allow_html=True)
                     labels = []
                     for reg_id in e.get('registros_relacionados', []):
-                        r = UtilsModule.get_registro_by_id(dados, reg_id)
+                        r = UtilsModule.get_registro_by_id(reg_id)
                         if r:
                             labels.append(
                                 f"{r.get('n','?')} | Reg: {r.get('registro','?')} | {r.get('titulo_artigo','[sem título]')}"
@@ -5115,9 +9020,9 @@ def main():
             selecionar "Ensaio" em "Tipo Textual", escolher "Cultura" (ou o termo temático mais próximo disponível) no campo de
             "Palavras-Chave" e inserir o sobrenome do teórico no campo de "Busca Livre (Título/Resumo)". Essa busca livre percorre
             também colunas textuais internas, de modo que registros em que o teórico apareça como autor citado tendem a ser recuperados.
-            Como não há filtro específico por idioma nessa tela, a etapa "em espanhol" exige um passo adicional: depois de obter o
-            conjunto de ensaios com aquele tema e aquele teórico, basta exportar os resultados para Excel e filtrar, na planilha,
-            a coluna de idioma pela sigla correspondente (por exemplo, "ESP" para espanhol).</p>
+            A etapa "em espanhol" se resolve no filtro "Idioma (1º ou 2º)", escolhendo a sigla correspondente (por exemplo,
+            "ESP" para espanhol). Ao lado de cada tipo textual e palavra-chave aparece quantos registros ela traria
+            combinada com os demais filtros já marcados.</p>
 
             <p>O resultado típico de uma busca é uma lista tabular de registros, em que cada linha corresponde a um texto e cada
             coluna a um campo relevante (título, autores, tipo textual, idiomas, páginas, palavras-chave, presença de iconografia).
@@ -5292,9 +9197,7 @@ def main():
             c2.metric("COLABORADORES", DataModule.get_normalized_series(df, 'autores_colaboradores').nunique())
             c3.metric("AUTORES CITADOS", DataModule.get_normalized_series(df, 'autores_citados').nunique())
             if 'iconografias' in df.columns:
-                n_icon = df['iconografias'].apply(
-                    lambda x: 1 if isinstance(x, list) and len(x) > 0 else 0
-                ).sum()
+                n_icon = (df['__qtd_icones'] > 0).sum()
                 p_icon = (n_icon / len(df)) * 100
                 c4.metric("ÍNDICE ICONOGRAFIA", f"{p_icon:.1f}%", help=f"{n_icon} registros contêm iconografia")
             else:
@@ -5305,7 +9208,7 @@ def main():
             col_exp1, col_exp2, col_exp3 = st.columns(3)
             excel_completo = UtilsModule.converter_excel(df)
             pdf_completo = PDFModule.gerar_pdf_analitico(df, len(df), "Base de dados completa")
-            json_completo = json.dumps(dados, ensure_ascii=False, indent=2)
+            json_completo = PersistenceModule.export_json_bytes()
             col_exp1.download_button(
                 "📊 EXCEL COMPLETO",
                 excel_completo,
@@ -5423,9 +9326,8 @@ def main():
                 try:
                     n = json.load(u)
                     if isinstance(n, list):
-                        dados.extend(n)
-                        un = {v.get('_id', str(i)): v for i, v in enumerate(dados)}.values()
-                        if PersistenceModule.save_data(list(un)):
+                        # Mescla por _id sobre o catálogo atual, relido sob a trava de escrita
+                        if PersistenceModule.import_records(n):
                             st.success("✅ Dados importados com sucesso!")
                             st.balloons()
                 except Exception as e:
@@ -5446,7 +9348,7 @@ def main():
         st.markdown("### 📥 EXPORTAÇÃO")
         if not df.empty:
             exp_row1_col1, exp_row1_col2, exp_row1_col3 = st.columns(3)
-            js = json.dumps(dados, ensure_ascii=False, indent=2)
+            js = PersistenceModule.export_json_bytes()
             exp_row1_col1.download_button(
                 "📥 BAIXAR JSON (CATÁLOGO)",
                 js,
@@ -5462,7 +9364,7 @@ def main():
                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 width='stretch'
             )
-            csv_data = df.astype(str).to_csv(index=False, encoding='utf-8-sig')
+            csv_data = UtilsModule.colunas_visiveis(df).astype(str).to_csv(index=False, encoding='utf-8-sig')
             exp_row1_col3.download_button(
                 "📄 BAIXAR CSV (CATÁLOGO)",
                 csv_data,
@@ -5470,13 +9372,19 @@ def main():
                 "text/csv",
                 width='stretch'
             )
+            if STORAGE_ENGINE != 'json':
+                # O banco/os fragmentos são a fonte dos dados; o JSON do catálogo é atualizado sob demanda
+                origem = "DO BANCO" if STORAGE_ENGINE == 'sqlite' else "DOS ARQUIVOS POR REVISTA"
+                if st.button(f"💾 ATUALIZAR catalogo_sibila.json A PARTIR {origem}", width='stretch'):
+                    if PersistenceModule.export_json():
+                        st.success(f"✅ {len(df)} registros gravados em {os.path.basename(FILE_PATH)}.")
         else:
             st.info("Nenhum dado para exportar (catálogo).")
 
         st.markdown("#### Diário de pesquisa")
         diario = PersistenceModule.load_diario()
         if diario:
-            js_d = json.dumps(diario, ensure_ascii=False, indent=2)
+            js_d = JsonCodec.dumps(diario, pretty=True)
             st.download_button(
                 "📥 BAIXAR JSON (DIÁRIO)",
                 js_d,
@@ -5490,35 +9398,230 @@ def main():
         st.markdown("---")
         st.markdown("### 📊 ESTATÍSTICAS DO SISTEMA")
         stat_col1, stat_col2 = st.columns(2)
-        if os.path.exists(BACKUP_DIR):
-            backups = sorted(os.listdir(BACKUP_DIR), reverse=True)
-            stat_col1.metric("Backups disponíveis", len(backups))
-        else:
-            backups = []
-            stat_col1.metric("Backups disponíveis", 0)
+        versoes = PersistenceModule.list_versions()
+        stat_col1.metric(
+            "Versões no histórico", len(versoes),
+            help=f"{BackupStore.uso_em_disco() / 1024:.0f} KB em disco (deltas comprimidos)"
+        )
         stat_col2.metric("Total de Registros", len(df))
         diario = PersistenceModule.load_diario()
         st.markdown(f"**Entradas no diário de pesquisa:** {len(diario)}")
-        if backups:
-            st.markdown("#### 📦 Backups salvos (últimos 5)")
-            backups_recentes = backups[:5]
-            for bkp in backups_recentes:
-                bkp_path = os.path.join(BACKUP_DIR, bkp)
+        cache_info = PersistenceModule.cache_stats()
+        hits = cache_info['chamadas'] - cache_info['misses']
+        taxa = (hits / cache_info['chamadas'] * 100) if cache_info['chamadas'] else 0
+        st.caption(
+            f"Cache do catálogo (desde o início do servidor): {cache_info['chamadas']} leituras · "
+            f"{hits} hits · {cache_info['misses']} misses ({taxa:.1f}% de acerto) · "
+            f"versão dos dados: {PersistenceModule.data_version()}"
+        )
+        m_busca = PersistenceModule.result_cache().metricas()
+        st.caption(
+            f"Cache de buscas compartilhado: {m_busca['itens']}/{m_busca['capacidade']} entradas · "
+            f"{m_busca['acertos']} acertos · {m_busca['faltas']} faltas ({m_busca['taxa']:.1f}%) · "
+            f"{m_busca['descartes']} descartes"
+        )
+        if versoes:
+            st.markdown("#### 📦 Histórico de versões")
+            df_versoes = pd.DataFrame(versoes)
+            df_versoes['versao'] = df_versoes['versao'].str[:12]
+            df_versoes.index = df_versoes.index + 1
+            st.dataframe(
+                df_versoes[['data', 'tipo', 'registros', 'alterados', 'excluidos', 'bytes', 'versao']].head(50),
+                column_config={
+                    "data": "Data", "tipo": "Tipo", "registros": "Registros", "alterados": "Alterados",
+                    "excluidos": "Excluídos", "bytes": "Bytes", "versao": "Versão",
+                },
+                width='stretch'
+            )
+            rotulos = {
+                v['versao']: f"{v['data']} · {v['registros']} registros · {v['versao'][:12]}" for v in versoes
+            }
+            versao_sel = st.selectbox(
+                "Versão", list(rotulos), format_func=lambda v: rotulos[v], key="sel_versao_historico"
+            )
+            col_v1, col_v2 = st.columns(2)
+            if col_v1.button("📂 PREPARAR DOWNLOAD DA VERSÃO", width='stretch'):
                 try:
-                    with open(bkp_path, 'r', encoding='utf-8') as f:
-                        conteudo = f.read()
-                    st.download_button(
-                        f"📥 Baixar {bkp}",
-                        conteudo,
-                        file_name=bkp,
-                        mime="application/json",
-                        width='stretch',
-                        key=f"btn_bkp_{bkp}"
+                    st.session_state.versao_download = (
+                        versao_sel,
+                        JsonCodec.dumps(PersistenceModule.load_version(versao_sel), pretty=True),
                     )
                 except Exception as e:
-                    st.warning(f"Não foi possível carregar o backup {bkp}: {e}")
-            if len(backups) > 5:
-                st.info(f"ℹ️ Existem mais {len(backups) - 5} backup(s) antigo(s) não exibido(s).")
+                    st.warning(f"Não foi possível carregar a versão {versao_sel[:12]}: {e}")
+            if st.session_state.get('versao_download', (None,))[0] == versao_sel:
+                col_v1.download_button(
+                    f"📥 Baixar versão {versao_sel[:12]}",
+                    st.session_state.versao_download[1],
+                    file_name=f"sibila_versao_{versao_sel[:12]}.json",
+                    mime="application/json",
+                    width='stretch',
+                    key="btn_download_versao"
+                )
+            if usuario_autenticado:
+                confirmar = col_v2.checkbox("Confirmo a restauração desta versão", key="chk_restaurar_versao")
+                if col_v2.button("⏪ RESTAURAR VERSÃO", width='stretch', disabled=not confirmar):
+                    if PersistenceModule.restore_version(versao_sel):
+                        st.success(f"✅ Catálogo restaurado para a versão {versao_sel[:12]}.")
+                        st.rerun()
+
+# ==========================================
+# LINHA DE COMANDO (manutenção e benchmarks)
+# ==========================================
+
+def catalogo_sintetico(tamanho, modelos=None):
+    """Catálogo artificial com `tamanho` registros, replicando registros-modelo com ids novos."""
+    if not modelos:
+        modelos = [{
+            "n": "1", "registro": "1 de 1", "ordem_exibicao": 1, "idioma_01": "POR", "idioma_02": "",
+            "vocabulario_controlado": "ENSAIO - Literatura", "titulo_artigo": "Título", "subtitulo_artigo": "",
+            "paginas": "p.10-12", "resumo": "Resumo analítico " * 20, "nota_edicao": "",
+            "autores_colaboradores": ["SILVA, Maria"], "entidade_coletiva": [], "tradutores": [],
+            "autores_citados": ["ANDRADE, Mário de", "BANDEIRA, Manuel"], "palavras_chave": ["poesia"],
+            "nome_pessoal_como_assunto": [], "iconografias": [{"tipo": "FOTOGRAFIA", "descricao": "Retrato"}],
+            "_timestamp": "2025-01-01T00:00:00", "notas_pesquisa": [],
+        }]
+    registros = []
+    for i in range(tamanho):
+        rec = dict(modelos[i % len(modelos)])
+        rec['_id'] = f"sint{i:07d}"
+        rec['n'] = ORDEM_SIBILA[i % len(ORDEM_SIBILA)]
+        rec['registro'] = f"{i // len(ORDEM_SIBILA) + 1}"
+        registros.append(rec)
+    return registros
+
+def benchmark_json(tamanhos=(1000, 10000, 100000), repeticoes=3):
+    """Compara os codecs JSON disponíveis (gravação compacta, indentada e leitura) em catálogos sintéticos."""
+    modelos = None
+    if os.path.exists(FILE_PATH):
+        with open(FILE_PATH, 'rb') as f:
+            modelos = JsonCodec.loads(f.read())
+    codecs = ['stdlib'] + (['orjson'] if ORJSON_AVAILABLE else [])
+
+    def melhor_tempo(funcao):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos) * 1000, resultado
+
+    print(f"{'registros':>10} {'codec':>8} {'grava compacto':>15} {'grava indentado':>16} {'leitura':>9} {'MB':>7}")
+    for tamanho in tamanhos:
+        dados = catalogo_sintetico(tamanho, modelos)
+        for codec in codecs:
+            t_compacto, bruto = melhor_tempo(lambda: JsonCodec.dumps(dados, codec=codec))
+            t_indentado, _ = melhor_tempo(lambda: JsonCodec.dumps(dados, pretty=True, codec=codec))
+            t_leitura, _ = melhor_tempo(lambda: JsonCodec.loads(bruto, codec=codec))
+            print(f"{tamanho:>10} {codec:>8} {t_compacto:>12.1f} ms {t_indentado:>13.1f} ms "
+                  f"{t_leitura:>6.1f} ms {len(bruto) / 1e6:>7.1f}")
+    if not ORJSON_AVAILABLE:
+        print("orjson não instalado (pip install orjson): apenas a biblioteca padrão foi medida.")
+
+def _cli_benchmark_json(args):
+    benchmark_json([int(a) for a in args] or (1000, 10000, 100000))
+    return 0
+
+def _cli_buscar(args):
+    opcoes = {a for a in args if a.startswith('--')}
+    consulta = " ".join(a for a in args if not a.startswith('--'))
+    if '--lote' in opcoes:
+        # Uma consulta por linha na entrada padrão; imprime quantidade e consulta
+        for linha in sys.stdin:
+            linha = linha.strip()
+            if not linha or linha.startswith('#'):
+                continue
+            try:
+                print(f"{PersistenceModule.query(linha).bit_count()}\t{linha}")
+            except ErroConsulta as e:
+                print(f"ERRO\t{linha}\t{e}")
+        return 0
+    if not consulta:
+        print("Uso: python sibila_code_21.py buscar <consulta> [--plano] [--json]\n"
+              "     python sibila_code_21.py buscar --lote < consultas.txt")
+        return 2
+    plano = []
+    try:
+        bits = PersistenceModule.query(consulta, plano)
+    except ErroConsulta as e:
+        print(f"Erro: {e}")
+        return 1
+    if '--plano' in opcoes:
+        print("Ordem de avaliação (registros por cláusula):")
+        for no, qtd in plano:
+            print(f"  {ConsultaCatalogo.descrever(no):<40} {qtd:>6}")
+    por_id = {str(r.get('_id')): r for r in PersistenceModule.load_data()}
+    registros = [por_id[i] for i in PersistenceModule.facets().ids_de(bits) if i in por_id]
+    if '--json' in opcoes:
+        print(JsonCodec.dumps(registros, pretty=True).decode('utf-8'))
+    else:
+        for r in registros:
+            print(f"{r.get('n', ''):>4} | {r.get('registro', ''):<10} | {r.get('titulo_artigo', '')}")
+        print(f"{len(registros)} registro(s)")
+    return 0
+
+def _cli_exportar_relatorios(args):
+    opcoes = {'--saida': None, '--processos': None, '--termos': '', '--progresso': None}
+    por_revista = False
+    i = 0
+    while i < len(args):
+        if args[i] == '--por-revista':
+            por_revista = True
+        elif args[i] in opcoes and i + 1 < len(args):
+            opcoes[args[i]] = args[i + 1]
+            i += 1
+        else:
+            print("Uso: python sibila_code_21.py exportar-relatorios [--por-revista] [--saida arquivo.zip]\n"
+                  "     [--processos N] [--termos \"termo, frase, ...\"] [--progresso arquivo.json]")
+            return 2
+        i += 1
+    destino = opcoes['--saida'] or os.path.join(
+        EXPORTACOES_DIR, f"relatorios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    )
+    termos = [t.strip() for t in opcoes['--termos'].split(',') if t.strip()]
+    arquivo_progresso = opcoes['--progresso']
+
+    estado = {'feitas': 0, 'total': 0}
+
+    def progresso(feitas, total, tarefa):
+        revista, nome, _ = tarefa
+        print(f"[{feitas:>3}/{total}] {'catálogo' if revista is None else 'n. ' + revista:<10} {nome}", flush=True)
+        estado.update(feitas=feitas, total=total)
+        if arquivo_progresso:
+            gravar_arquivo_atomico(arquivo_progresso, JsonCodec.dumps(estado))
+
+    inicio = time.perf_counter()
+    gravados, erros = exportar_relatorios_lote(
+        destino, por_revista=por_revista, termos=termos,
+        processos=int(opcoes['--processos']) if opcoes['--processos'] else None, progresso=progresso
+    )
+    if arquivo_progresso:
+        gravar_arquivo_atomico(arquivo_progresso, JsonCodec.dumps(dict(estado, erros=erros, concluido=True)))
+    for erro in erros:
+        print(f"ERRO  {erro}")
+    print(f"{gravados} arquivo(s) em {destino} ({time.perf_counter() - inicio:.1f} s)")
+    # O ZIP existe mesmo com falhas (listadas em erros.txt): código próprio, não o de erro
+    return EXPORTACAO_PARCIAL if erros else 0
+
+COMANDOS_CLI = {
+    'benchmark-json': (_cli_benchmark_json, "[tamanhos...]  compara os codecs JSON em catálogos sintéticos"),
+    'buscar': (_cli_buscar, "<consulta> [--plano] [--json] | --lote  consulta estruturada (autor:, kw:, n:5..8, AND/OR/NOT)"),
+    'exportar-relatorios': (_cli_exportar_relatorios, "[--por-revista] [--saida arquivo.zip] [--processos N] [--termos ...]  todos os relatórios em Excel/CSV/PDF num ZIP"),
+}
+
+def cli(argv):
+    """Despacha `python sibila_code_21.py <comando> [argumentos]` (fora do Streamlit)."""
+    comando = COMANDOS_CLI.get(argv[0]) if argv else None
+    if comando is None:
+        print("Uso: python sibila_code_21.py <comando> [argumentos]\n\nComandos:")
+        for nome, (_, ajuda) in COMANDOS_CLI.items():
+            print(f"  {nome} {ajuda}")
+        # Sem argumentos a lista é o que se pediu; comando desconhecido é erro de uso
+        return 2 if argv else 0
+    return comando[0](argv[1:])
 
 if __name__ == "__main__":
+    from streamlit import runtime
+    if not runtime.exists():
+        # `python sibila_code_21.py` sem comando lista os comandos; a interface é `streamlit run`
+        sys.exit(cli(sys.argv[1:]))
     main()
@@ -0,0 +1,61 @@
+"""
+Fixtures comuns: um catálogo pequeno num diretório temporário, com todos os
+caminhos do módulo desviados para lá e os caches do Streamlit limpos.
+"""
+import os
+
+import pytest
+import streamlit as st
+
+import sibila_code_21 as sibila
+
+CAMINHOS = {
+    'FILE_PATH': 'catalogo_sibila.json',
+    'DIARIO_PATH': 'diario_sibila.json',
+    'BACKUP_DIR': 'backups',
+    'JOURNAL_PATH': 'catalogo_sibila.journal.jsonl',
+    'DB_PATH': 'catalogo_sibila.db',
+    'SHARDS_DIR': 'catalogo_revistas',
+    'CACHE_COLUNAR_DIR': 'cache_colunar',
+    'INDICES_DIR': 'indices',
+    'INDICE_TEXTO_PATH': os.path.join('indices', 'texto.json'),
+    'BUSCAS_SALVAS_PATH': 'buscas_salvas.json',
+    'RELATORIOS_PATH': os.path.join('indices', 'relatorios.json'),
+    'EXPORTACOES_DIR': 'exportacoes',
+    'LOCK_PATH': 'catalogo_sibila.lock',
+    'LOCK_DERIVADOS_PATH': 'catalogo_sibila.derivados.lock',
+}
+
+
+def _registro(reg_id, titulo):
+    return {
+        'n': '1', 'registro': reg_id, 'titulo_artigo': titulo, 'autores_colaboradores': [],
+        'palavras_chave': [], 'iconografias': [], '_id': reg_id,
+    }
+
+
+@pytest.fixture
+def registro():
+    """Fábrica de registros mínimos: registro(_id, título)."""
+    return _registro
+
+
+@pytest.fixture
+def catalogo(tmp_path, monkeypatch, request):
+    """
+    Catálogo JSON de dois registros num diretório temporário. O motor de
+    armazenamento vem do parâmetro indireto (padrão: json); sqlite e shards
+    importam o JSON na primeira leitura, como numa instalação existente.
+    """
+    for nome, relativo in CAMINHOS.items():
+        monkeypatch.setattr(sibila, nome, str(tmp_path / relativo))
+    monkeypatch.setattr(sibila, 'STORAGE_ENGINE', getattr(request, 'param', 'json'))
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    sibila.PersistenceModule._sha1_arquivo.cache_clear()
+    sibila.gravar_arquivo_atomico(
+        sibila.FILE_PATH, sibila.JsonCodec.dumps([_registro('a', 'Primeiro'), _registro('b', 'Segundo')])
+    )
+    yield tmp_path
+    st.cache_data.clear()
+    st.cache_resource.clear()
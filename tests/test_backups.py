@@ -0,0 +1,44 @@
+"""
+Histórico de versões (BackupStore): a primeira gravação preserva o catálogo
+como estava antes dela, em todos os motores de armazenamento.
+"""
+import pytest
+import streamlit as st
+
+import sibila_code_21 as sibila
+
+MOTORES = ['json', 'sqlite', 'shards']
+
+
+def _titulos(registros):
+    return [(r['_id'], r['titulo_artigo']) for r in registros]
+
+
+def _restaurar_mais_antiga():
+    P = sibila.PersistenceModule
+    versoes = sibila.BackupStore.listar()
+    assert len(versoes) == 2
+    assert P.restore_version(versoes[-1]['versao'])
+    st.cache_data.clear()
+    return _titulos(P.load_data())
+
+
+@pytest.mark.parametrize('catalogo', MOTORES, indirect=True)
+def test_primeira_edicao_pode_ser_desfeita(catalogo, registro):
+    P = sibila.PersistenceModule
+    assert P.save_record(registro('a', 'Primeiro (revisto)'))
+    assert _restaurar_mais_antiga() == [('a', 'Primeiro'), ('b', 'Segundo')]
+
+
+@pytest.mark.parametrize('catalogo', MOTORES, indirect=True)
+def test_primeira_exclusao_pode_ser_desfeita(catalogo):
+    P = sibila.PersistenceModule
+    assert P.delete_record('b')
+    assert _restaurar_mais_antiga() == [('a', 'Primeiro'), ('b', 'Segundo')]
+
+
+@pytest.mark.parametrize('catalogo', MOTORES, indirect=True)
+def test_primeira_gravacao_em_lote_pode_ser_desfeita(catalogo, registro):
+    P = sibila.PersistenceModule
+    assert P.save_data([registro('c', 'Terceiro')])
+    assert _restaurar_mais_antiga() == [('a', 'Primeiro'), ('b', 'Segundo')]
@@ -0,0 +1,39 @@
+"""
+Filtro de revista da linguagem de consulta (ConsultaCatalogo): números
+soltos, intervalos e o número duplo "8-9".
+"""
+import pytest
+
+import sibila_code_21 as sibila
+
+
+@pytest.fixture
+def revistas(catalogo, registro):
+    """Um registro em cada uma das revistas 7, 8-9 e 10."""
+    registros = []
+    for reg_id, n in (('a', '7'), ('b', '8-9'), ('c', '10')):
+        rec = registro(reg_id, f"Título {reg_id}")
+        rec['n'] = n
+        registros.append(rec)
+    assert sibila.PersistenceModule.save_data(registros)
+    return registros
+
+
+def _ids(consulta):
+    P = sibila.PersistenceModule
+    df = P.load_dataframe()
+    return sorted(P.facets().aplicar(df, P.query(consulta))['_id'])
+
+
+@pytest.mark.parametrize('consulta, esperados', [
+    ('n:8', ['b']),
+    ('n:9', ['b']),
+    ('revista:8', ['b']),
+    ('n:8..8', ['b']),
+    ('n:8-9', ['b']),
+    ('n:7', ['a']),
+    ('n:1', []),
+    ('n:9..10', ['b', 'c']),
+])
+def test_numero_solto_vale_como_intervalo(revistas, consulta, esperados):
+    assert _ids(consulta) == esperados
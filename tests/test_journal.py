@@ -0,0 +1,51 @@
+"""
+Recuperação do journal do catálogo (modo json) após uma queda dentro de
+PersistenceModule._write_snapshot.
+"""
+import os
+
+import streamlit as st
+
+import sibila_code_21 as sibila
+
+
+def _queda_antes_de_apagar_o_journal(monkeypatch):
+    """Faz _write_snapshot regravar o snapshot e 'cair' antes de remover o journal."""
+    def write_snapshot(data):
+        sibila.gravar_arquivo_atomico(sibila.FILE_PATH, sibila.JsonCodec.dumps(data))
+    monkeypatch.setattr(sibila.PersistenceModule, '_write_snapshot', staticmethod(write_snapshot))
+
+
+def test_gravacao_apos_queda_na_compactacao_nao_se_perde(catalogo, registro, monkeypatch):
+    P = sibila.PersistenceModule
+    assert P.save_record(registro('c', 'Terceiro'))
+    assert os.path.exists(sibila.JOURNAL_PATH)
+
+    with monkeypatch.context() as m:
+        _queda_antes_de_apagar_o_journal(m)
+        P.compact()
+    # O journal velho sobrou, com o cabeçalho do snapshot anterior
+    assert os.path.exists(sibila.JOURNAL_PATH)
+
+    assert P.save_record(registro('d', 'Quarto'))
+    assert P.save_record(dict(registro('a', 'Primeiro (revisto)')))
+    assert P.delete_record('b')
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    registros = P._load_snapshot_and_journal()
+    assert [r['_id'] for r in registros] == ['a', 'c', 'd']
+    assert registros[0]['titulo_artigo'] == 'Primeiro (revisto)'
+    assert os.path.exists(sibila.JOURNAL_PATH + '.orfao')
+
+
+def test_journal_valido_continua_sendo_anexado(catalogo, registro):
+    P = sibila.PersistenceModule
+    assert P.save_record(registro('c', 'Terceiro'))
+    assert P.save_record(registro('d', 'Quarto'))
+
+    with open(sibila.JOURNAL_PATH, 'rb') as f:
+        linhas = [sibila.JsonCodec.loads(l) for l in f if l.strip()]
+    assert [l['op'] for l in linhas] == ['base', 'upsert', 'upsert']
+    assert not os.path.exists(sibila.JOURNAL_PATH + '.orfao')
+    assert [r['_id'] for r in P._load_snapshot_and_journal()] == ['a', 'b', 'c', 'd']